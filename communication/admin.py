@@ -2,6 +2,8 @@ from django.contrib import admin
 from django import forms
 from django.contrib import messages
 from django.contrib.admin.widgets import FilteredSelectMultiple
+from django.db import transaction
+from .conversations import register_message
 from .models import Message
 from users.models import User
 
@@ -64,21 +66,25 @@ class MessageAdmin(admin.ModelAdmin):
 
         recipient_list = list(recipients)
         
-        # Pierwsza wiadomość
-        obj.sender = request.user
-        obj.receiver = recipient_list[0]
-        super().save_model(request, obj, form, change)
-        
-        # Reszta wiadomości
-        count = 1
-        for parent in recipient_list[1:]:
-            Message.objects.create(
-                sender=request.user,
-                receiver=parent,
-                subject=obj.subject,
-                body=obj.body
-            )
-            count += 1
+        with transaction.atomic():
+            # Pierwsza wiadomość
+            obj.sender = request.user
+            obj.receiver = recipient_list[0]
+            super().save_model(request, obj, form, change)
+            if not change:
+                register_message(obj)
+
+            # Reszta wiadomości
+            count = 1
+            for parent in recipient_list[1:]:
+                message = Message.objects.create(
+                    sender=request.user,
+                    receiver=parent,
+                    subject=obj.subject,
+                    body=obj.body
+                )
+                register_message(message)
+                count += 1
             
         messages.success(request, f"✅ Wysłano wiadomość do {count} osób.")
 
@@ -1,6 +1,9 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
-from .models import Message
+from core.broadcast import channel_groups_for_user, user_channel_group
+
+from .conversations import unread_total_for_user
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -12,9 +15,12 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             return
 
         self.user = user
-        self.user_group_name = f'user_{self.user.id}'
+        self.user_group_name = user_channel_group(self.user.id)
+        # Poza kanałem użytkownika: wszyscy, dyrektorzy i grupy dzieci - powiadomienia idą raz na odbiorców
+        self.channel_groups = await database_sync_to_async(channel_groups_for_user)(self.user)
 
-        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        for channel_group in self.channel_groups:
+            await self.channel_layer.group_add(channel_group, self.channel_name)
         await self.accept()
 
         unread_count = await self.get_unread_count()
@@ -24,8 +30,8 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         })
 
     async def disconnect(self, close_code):
-        if hasattr(self, 'user_group_name'):
-            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+        for channel_group in getattr(self, 'channel_groups', []):
+            await self.channel_layer.group_discard(channel_group, self.channel_name)
 
     async def receive_json(self, content, **kwargs):
         event_type = content.get('type')
@@ -53,9 +59,11 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         })
 
     async def chat_notification_summary_changed(self, event):
-        await self.send_json({
-            'type': 'notification_summary_changed',
-        })
+        payload = {'type': 'notification_summary_changed'}
+        # Bez listy zmian klient pobiera pełne podsumowanie liczników
+        if 'changes' in event:
+            payload['changes'] = event['changes']
+        await self.send_json(payload)
 
     async def chat_error(self, event):
         await self.send_json({
@@ -64,4 +72,4 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         })
 
     async def get_unread_count(self):
-        return await Message.objects.filter(receiver=self.user, is_read=False).acount()
+        return await database_sync_to_async(unread_total_for_user)(self.user.id)
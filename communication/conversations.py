@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Conversation, Message
+
+
+def conversation_sides(sender, receiver):
+    """Zwraca (director_id, parent_id) dla pary użytkowników albo None, gdy to nie rozmowa z dyrektorem."""
+    if sender.is_director and not receiver.is_director:
+        return sender.id, receiver.id
+    if receiver.is_director and not sender.is_director:
+        return receiver.id, sender.id
+    return None
+
+
+def register_message(message):
+    """
+    Aktualizuje podsumowanie rozmowy po wysłaniu wiadomości.
+    Wywoływać w tej samej transakcji, w której zapisano wiadomość.
+    """
+    sides = conversation_sides(message.sender, message.receiver)
+    if sides is None:
+        return None
+
+    director_id, parent_id = sides
+    unread_field = 'director_unread_count' if message.receiver_id == director_id else 'parent_unread_count'
+
+    with transaction.atomic():
+        conversation, _ = Conversation.objects.get_or_create(director_id=director_id, parent_id=parent_id)
+        Conversation.objects.filter(pk=conversation.pk).update(**{
+            'last_message': message,
+            'last_message_at': message.created_at,
+            unread_field: F(unread_field) + 1,
+        })
+    return conversation
+
+
+def decrease_unread_count(reader_id, participant_id, count):
+    """
+    Odejmuje od licznika czytającego tyle wiadomości, ile faktycznie oznaczono jako przeczytane.
+    Wiadomość zarejestrowana w międzyczasie (register_message) zostaje w liczniku.
+    """
+    if count <= 0:
+        return
+    Conversation.objects.filter(director_id=reader_id, parent_id=participant_id).update(
+        director_unread_count=Greatest(F('director_unread_count') - count, Value(0)),
+    )
+    Conversation.objects.filter(director_id=participant_id, parent_id=reader_id).update(
+        parent_unread_count=Greatest(F('parent_unread_count') - count, Value(0)),
+    )
+
+
+def rebuild_conversation(director_id, parent_id):
+    """Przelicza podsumowanie od zera (np. po usunięciu wiadomości)."""
+    pair_filter = (
+        Q(sender_id=director_id, receiver_id=parent_id)
+        | Q(sender_id=parent_id, receiver_id=director_id)
+    )
+    last_message = Message.objects.filter(pair_filter).order_by('-created_at', '-id').first()
+
+    if last_message is None:
+        Conversation.objects.filter(director_id=director_id, parent_id=parent_id).delete()
+        return
+
+    unread = Message.objects.filter(pair_filter, is_read=False)
+    Conversation.objects.update_or_create(
+        director_id=director_id,
+        parent_id=parent_id,
+        defaults={
+            'last_message': last_message,
+            'last_message_at': last_message.created_at,
+            'director_unread_count': unread.filter(receiver_id=director_id).count(),
+            'parent_unread_count': unread.filter(receiver_id=parent_id).count(),
+        },
+    )
+
+
+def unread_total_for_user(user_id):
+    """
+    Suma nieprzeczytanych wiadomości użytkownika ze wszystkich jego rozmów.
+    Wiadomości spoza par dyrektor-rodzic (np. między dyrektorami) nie mają podsumowania
+    w Conversation (conversation_sides) - te liczymy wprost z tabeli wiadomości.
+    """
+    totals = Conversation.objects.filter(Q(director_id=user_id) | Q(parent_id=user_id)).aggregate(
+        total=Sum(Case(
+            When(director_id=user_id, then=F('director_unread_count')),
+            default=F('parent_unread_count'),
+            output_field=IntegerField(),
+        ))
+    )
+    without_conversation = Message.objects.filter(
+        receiver_id=user_id,
+        is_read=False,
+        sender__is_director=F('receiver__is_director'),
+    ).count()
+    return int(totals['total'] or 0) + without_conversation
+
+
+def conversations_for_user(user):
+    queryset = Conversation.objects.select_related('director', 'parent', 'last_message')
+    if user.is_director:
+        return queryset.filter(director=user)
+    return queryset.filter(parent=user)
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_conversations(apps, schema_editor):
+    Message = apps.get_model('communication', 'Message')
+    Conversation = apps.get_model('communication', 'Conversation')
+    User = apps.get_model('users', 'User')
+
+    director_ids = set(User.objects.filter(is_director=True).values_list('id', flat=True))
+    summaries = {}
+
+    messages = Message.objects.order_by('created_at', 'id').values_list(
+        'id', 'sender_id', 'receiver_id', 'created_at', 'is_read'
+    )
+    for message_id, sender_id, receiver_id, created_at, is_read in messages.iterator():
+        if sender_id in director_ids and receiver_id not in director_ids:
+            key = (sender_id, receiver_id)
+            unread_field = 'parent_unread_count'
+        elif receiver_id in director_ids and sender_id not in director_ids:
+            key = (receiver_id, sender_id)
+            unread_field = 'director_unread_count'
+        else:
+            continue
+
+        summary = summaries.setdefault(key, {
+            'director_unread_count': 0,
+            'parent_unread_count': 0,
+        })
+        summary['last_message_id'] = message_id
+        summary['last_message_at'] = created_at
+        if not is_read:
+            summary[unread_field] += 1
+
+    Conversation.objects.bulk_create([
+        Conversation(director_id=director_id, parent_id=parent_id, **summary)
+        for (director_id, parent_id), summary in summaries.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('communication', '0004_remove_legacy_conversationfollowupstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True, verbose_name='Data ostatniej wiadomości')),
+                ('director_unread_count', models.PositiveIntegerField(default=0, verbose_name='Nieprzeczytane (dyrektor)')),
+                ('parent_unread_count', models.PositiveIntegerField(default=0, verbose_name='Nieprzeczytane (rodzic)')),
+                ('director', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='director_conversations', to=settings.AUTH_USER_MODEL, verbose_name='Dyrektor')),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='communication.message', verbose_name='Ostatnia wiadomość')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parent_conversations', to=settings.AUTH_USER_MODEL, verbose_name='Rodzic')),
+            ],
+            options={
+                'verbose_name': 'Rozmowa',
+                'verbose_name_plural': 'Rozmowy',
+                'ordering': ['-last_message_at'],
+                'indexes': [models.Index(fields=['director', '-last_message_at'], name='conversation_director_recent'), models.Index(fields=['parent', '-last_message_at'], name='conversation_parent_recent')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('director', 'parent'), name='unique_conversation_per_director_parent'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
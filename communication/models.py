@@ -17,10 +17,50 @@ class Message(models.Model):
         ordering = ['-created_at'] # Najnowsze na górze
         verbose_name = "Wiadomość"
         verbose_name_plural = "Wiadomości"
+        indexes = [
+            # Stronicowanie historii czatu kursorem (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='message_created_at_id'),
+        ]
 
     def __str__(self):
         return f"Od: {self.sender} | Do: {self.receiver} | {self.subject}"
 
+
+class Conversation(models.Model):
+    """
+    Podsumowanie rozmowy dyrektor–rodzic: ostatnia wiadomość i liczniki
+    nieprzeczytanych po obu stronach. Skrzynka czatu czyta te wiersze
+    zamiast przeliczać całą historię wiadomości.
+    """
+    director = models.ForeignKey(User, on_delete=models.CASCADE, related_name='director_conversations', verbose_name="Dyrektor")
+    parent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='parent_conversations', verbose_name="Rodzic")
+    last_message = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Ostatnia wiadomość"
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True, verbose_name="Data ostatniej wiadomości")
+    director_unread_count = models.PositiveIntegerField(default=0, verbose_name="Nieprzeczytane (dyrektor)")
+    parent_unread_count = models.PositiveIntegerField(default=0, verbose_name="Nieprzeczytane (rodzic)")
+
+    class Meta:
+        ordering = ['-last_message_at']
+        verbose_name = "Rozmowa"
+        verbose_name_plural = "Rozmowy"
+        constraints = [
+            models.UniqueConstraint(fields=['director', 'parent'], name='unique_conversation_per_director_parent'),
+        ]
+        indexes = [
+            models.Index(fields=['director', '-last_message_at'], name='conversation_director_recent'),
+            models.Index(fields=['parent', '-last_message_at'], name='conversation_parent_recent'),
+        ]
+
+    def __str__(self):
+        return f"{self.director} ↔ {self.parent}"
+
 # --- SYGNAŁ (Automatyczny E-mail) ---
 @receiver(post_save, sender=Message)
 def send_email_notification(sender, instance, created, **kwargs):
@@ -0,0 +1,47 @@
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Window, When
+from django.db.models.functions import RowNumber
+
+from .models import Message
+
+
+def _participant_expression(user):
+    return Case(
+        When(sender=user, then=F('receiver_id')),
+        default=F('sender_id'),
+        output_field=IntegerField(),
+    )
+
+
+def latest_messages_per_participant(user):
+    """
+    Zwraca ostatnią wiadomość z każdej rozmowy użytkownika (po jednej na rozmówcę).
+    Na bazach z funkcjami okna wybór robi ROW_NUMBER() w SQL, więc do Pythona
+    trafia tyle wierszy, ile jest rozmów, a nie cała historia wiadomości.
+    """
+    participant = _participant_expression(user)
+    queryset = Message.objects.filter(
+        Q(sender=user) | Q(receiver=user)
+    ).exclude(
+        sender=user,
+        receiver=user,
+    ).annotate(
+        participant_id=participant,
+    ).select_related('sender', 'receiver')
+
+    if connection.features.supports_over_clause:
+        return list(
+            queryset.annotate(
+                position=Window(
+                    expression=RowNumber(),
+                    partition_by=[participant],
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            ).filter(position=1).order_by('participant_id')
+        )
+
+    # Starsze SQLite (< 3.25) nie mają funkcji okna
+    latest_by_participant = {}
+    for message in queryset.order_by('participant_id', '-created_at', '-id'):
+        latest_by_participant.setdefault(int(message.participant_id), message)
+    return list(latest_by_participant.values())
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Message
+from .models import Conversation, Message
 from users.models import User
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -42,4 +42,57 @@ class MessageSerializer(serializers.ModelSerializer):
         # is_read zmienia się osobnym endpointem (lub automatycznie przy otwarciu).
         extra_kwargs = {
             'receiver': {'required': False} 
-        }
\ No newline at end of file
+        }
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    participant_id = serializers.SerializerMethodField()
+    participant_name = serializers.SerializerMethodField()
+    participant_avatar_url = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    last_message_preview = serializers.SerializerMethodField()
+    last_message_sender = serializers.IntegerField(source='last_message.sender_id', read_only=True, default=None)
+
+    def _viewer_is_director(self, obj):
+        request = self.context.get('request')
+        return bool(request and request.user.id == obj.director_id)
+
+    def _participant(self, obj):
+        return obj.parent if self._viewer_is_director(obj) else obj.director
+
+    def get_participant_id(self, obj):
+        return self._participant(obj).id
+
+    def get_participant_name(self, obj):
+        participant = self._participant(obj)
+        return f"{participant.first_name} {participant.last_name}".strip() or participant.username
+
+    def get_participant_avatar_url(self, obj):
+        participant = self._participant(obj)
+        if not participant.avatar:
+            return None
+        request = self.context.get('request')
+        avatar_url = participant.avatar.url
+        return request.build_absolute_uri(avatar_url) if request else avatar_url
+
+    def get_unread_count(self, obj):
+        return obj.director_unread_count if self._viewer_is_director(obj) else obj.parent_unread_count
+
+    def get_last_message_preview(self, obj):
+        if not obj.last_message:
+            return ''
+        return (obj.last_message.body or '')[:100]
+
+    class Meta:
+        model = Conversation
+        fields = [
+            'id',
+            'participant_id',
+            'participant_name',
+            'participant_avatar_url',
+            'last_message',
+            'last_message_at',
+            'last_message_sender',
+            'last_message_preview',
+            'unread_count',
+        ]
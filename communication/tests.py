@@ -1,3 +1,258 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch
+from rest_framework.test import APIClient
+
+from communication.conversations import decrease_unread_count, register_message
+from communication.models import Conversation, Message
+from communication.queries import latest_messages_per_participant
+from communication.views import MessageHistoryPagination
+
+
+class LatestMessagePerParticipantTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.director = User.objects.create_user(
+			username='director',
+			password='secret123',
+			is_director=True,
+			is_parent=False,
+		)
+		self.parent_a = User.objects.create_user(username='parent_a', password='secret123')
+		self.parent_b = User.objects.create_user(username='parent_b', password='secret123')
+
+		now = timezone.now()
+		self.create_message(self.parent_a, self.director, 'A1', now - timedelta(hours=50))
+		self.create_message(self.director, self.parent_a, 'A2', now - timedelta(hours=40))
+		self.create_message(self.parent_a, self.director, 'A3', now - timedelta(hours=30))
+		self.create_message(self.parent_b, self.director, 'B1', now - timedelta(hours=30))
+		self.create_message(self.director, self.parent_b, 'B2', now - timedelta(hours=2))
+
+	def create_message(self, sender, receiver, body, created_at):
+		message = Message.objects.create(sender=sender, receiver=receiver, subject='Temat', body=body)
+		Message.objects.filter(pk=message.pk).update(created_at=created_at)
+		return message
+
+	def assert_latest_bodies(self):
+		latest = latest_messages_per_participant(self.director)
+		self.assertEqual(
+			sorted((int(message.participant_id), message.body) for message in latest),
+			sorted([(self.parent_a.id, 'A3'), (self.parent_b.id, 'B2')]),
+		)
+
+	def test_returns_one_latest_message_per_conversation(self):
+		self.assert_latest_bodies()
+
+	def test_python_fallback_matches_window_query(self):
+		with patch.object(connection.features, 'supports_over_clause', False):
+			self.assert_latest_bodies()
+
+	def test_director_stats_lists_only_pending_conversations(self):
+		self.client.force_login(self.director)
+
+		response = self.client.get('/api/director/stats/')
+
+		pending = response.json()['unanswered_over_24h']
+		self.assertEqual([item['participant_id'] for item in pending], [self.parent_a.id])
+		self.assertEqual(pending[0]['last_message_preview'], 'A3')
+
+
+class ConversationSummaryTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.director = User.objects.create_user(
+			username='director',
+			password='secret123',
+			is_director=True,
+			is_parent=False,
+		)
+		self.parent = User.objects.create_user(
+			username='parent',
+			password='secret123',
+			first_name='Anna',
+			last_name='Lis',
+		)
+		self.parent_client = APIClient()
+		self.parent_client.force_authenticate(self.parent)
+		self.director_client = APIClient()
+		self.director_client.force_authenticate(self.director)
+
+	def test_sending_and_reading_updates_conversation_counters(self):
+		for body in ['Dzień dobry', 'Pytanie o zebranie']:
+			response = self.parent_client.post(
+				'/api/communication/messages/',
+				{'subject': 'Temat', 'body': body},
+				format='json',
+			)
+			self.assertEqual(response.status_code, 201)
+
+		conversation = Conversation.objects.get(director=self.director, parent=self.parent)
+		self.assertEqual(conversation.director_unread_count, 2)
+		self.assertEqual(conversation.parent_unread_count, 0)
+		self.assertEqual(conversation.last_message.body, 'Pytanie o zebranie')
+
+		response = self.director_client.get('/api/communication/messages/unread_count/')
+		self.assertEqual(response.data['count'], 2)
+
+		self.director_client.post(
+			'/api/communication/messages/mark_conversation_read/',
+			{'participant_id': self.parent.id},
+			format='json',
+		)
+		conversation.refresh_from_db()
+		self.assertEqual(conversation.director_unread_count, 0)
+
+		self.director_client.post(
+			'/api/communication/messages/',
+			{'subject': 'Re', 'body': 'Odpowiedź', 'receiver': self.parent.id},
+			format='json',
+		)
+		conversation.refresh_from_db()
+		self.assertEqual(conversation.parent_unread_count, 1)
+
+	def test_message_arriving_while_marking_read_stays_unread(self):
+		self.parent_client.post(
+			'/api/communication/messages/',
+			{'subject': 'Temat', 'body': 'Pierwsza'},
+			format='json',
+		)
+		late_messages = []
+
+		def arrive_then_decrease(*args):
+			# Nowa wiadomość zapisana między pobraniem listy a aktualizacją licznika
+			message = Message.objects.create(sender=self.parent, receiver=self.director, subject='Temat', body='Spóźniona')
+			register_message(message)
+			late_messages.append(message)
+			decrease_unread_count(*args)
+
+		with patch('communication.views.decrease_unread_count', side_effect=arrive_then_decrease):
+			self.director_client.post(
+				'/api/communication/messages/mark_conversation_read/',
+				{'participant_id': self.parent.id},
+				format='json',
+			)
+
+		late_messages[0].refresh_from_db()
+		self.assertFalse(late_messages[0].is_read)
+		conversation = Conversation.objects.get(director=self.director, parent=self.parent)
+		self.assertEqual(conversation.director_unread_count, 1)
+
+	def test_conversation_list_shows_viewer_side(self):
+		self.parent_client.post(
+			'/api/communication/messages/',
+			{'subject': 'Temat', 'body': 'Wiadomość od rodzica'},
+			format='json',
+		)
+
+		response = self.director_client.get('/api/communication/conversations/')
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.data), 1)
+		entry = response.data[0]
+		self.assertEqual(entry['participant_id'], self.parent.id)
+		self.assertEqual(entry['participant_name'], 'Anna Lis')
+		self.assertEqual(entry['unread_count'], 1)
+		self.assertEqual(entry['last_message_preview'], 'Wiadomość od rodzica')
+
+		response = self.parent_client.get('/api/communication/conversations/')
+		self.assertEqual(response.data[0]['participant_id'], self.director.id)
+		self.assertEqual(response.data[0]['unread_count'], 0)
+
+	def test_unread_count_includes_messages_outside_director_parent_pairs(self):
+		other_director = get_user_model().objects.create_user(
+			username='director_2',
+			password='secret123',
+			is_director=True,
+			is_parent=False,
+		)
+		self.director_client.post(
+			'/api/communication/messages/',
+			{'subject': 'Grafik', 'body': 'Zastępstwo w piątek', 'receiver': other_director.id},
+			format='json',
+		)
+		self.parent_client.post(
+			'/api/communication/messages/',
+			{'subject': 'Temat', 'body': 'Pytanie'},
+			format='json',
+		)
+
+		client = APIClient()
+		client.force_authenticate(other_director)
+		self.assertEqual(client.get('/api/communication/messages/unread_count/').data['count'], 1)
+		self.assertEqual(self.director_client.get('/api/communication/messages/unread_count/').data['count'], 1)
+
+
+class MessageCursorPaginationTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.director = User.objects.create_user(
+			username='director',
+			password='secret123',
+			is_director=True,
+			is_parent=False,
+		)
+		self.parent = User.objects.create_user(username='parent', password='secret123')
+		self.other_parent = User.objects.create_user(username='other', password='secret123')
+
+		start = timezone.now() - timedelta(days=1)
+		for index in range(5):
+			message = Message.objects.create(
+				sender=self.parent,
+				receiver=self.director,
+				subject='Temat',
+				body=f'M{index}',
+			)
+			Message.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=index))
+		Message.objects.create(sender=self.other_parent, receiver=self.director, subject='Temat', body='Inna rozmowa')
+
+		self.client = APIClient()
+		self.client.force_authenticate(self.director)
+
+	def bodies(self, response):
+		return [item['body'] for item in response.data['results']]
+
+	def test_latest_page_then_scroll_back_with_before_cursor(self):
+		url = '/api/communication/messages/'
+		response = self.client.get(url, {'participant_id': self.parent.id, 'limit': 2})
+
+		self.assertEqual(self.bodies(response), ['M3', 'M4'])
+		self.assertTrue(response.data['has_more_before'])
+
+		response = self.client.get(url, {
+			'participant_id': self.parent.id,
+			'limit': 2,
+			'before': response.data['before_cursor'],
+		})
+		self.assertEqual(self.bodies(response), ['M1', 'M2'])
+
+		response = self.client.get(url, {
+			'participant_id': self.parent.id,
+			'limit': 2,
+			'before': response.data['before_cursor'],
+		})
+		self.assertEqual(self.bodies(response), ['M0'])
+		self.assertFalse(response.data['has_more_before'])
+		self.assertIsNone(response.data['before_cursor'])
+
+	def test_after_cursor_returns_only_newer_messages(self):
+		url = '/api/communication/messages/'
+		response = self.client.get(url, {'participant_id': self.parent.id, 'limit': 10})
+		after_cursor = response.data['after_cursor']
+
+		Message.objects.create(sender=self.parent, receiver=self.director, subject='Temat', body='Nowa')
+
+		response = self.client.get(url, {'participant_id': self.parent.id, 'after': after_cursor})
+		self.assertEqual(self.bodies(response), ['Nowa'])
+
+	def test_without_cursor_parameters_returns_latest_page(self):
+		with patch.object(MessageHistoryPagination, 'page_size', 4):
+			response = self.client.get('/api/communication/messages/')
 
-# Create your tests here.
+		self.assertEqual(self.bodies(response), ['M2', 'M3', 'M4', 'Inna rozmowa'])
+		self.assertTrue(response.data['has_more_before'])
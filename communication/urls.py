@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MessageViewSet
+from .views import ConversationViewSet, MessageViewSet
 
 router = DefaultRouter()
 router.register(r'messages', MessageViewSet, basename='messages')
+router.register(r'conversations', ConversationViewSet, basename='conversations')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,35 +1,62 @@
 from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.db.models import Q
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from .conversations import conversation_sides, conversations_for_user, decrease_unread_count, rebuild_conversation, register_message, unread_total_for_user
 from .models import Message
-from .serializers import MessageSerializer
+from .serializers import ConversationSerializer, MessageSerializer
 from users.models import User
+from core.broadcast import user_channel_group
+from core.dashboard_cache import invalidate_dashboard_sections
+from core.dispatch import dispatch
+from core.pagination import KeysetPagination
+
+class MessageHistoryPagination(KeysetPagination):
+    """
+    Historia czatu: zawsze strona najnowszych wiadomości (?limit=N, domyślnie 50),
+    before/after doczytują starsze/nowsze. Pełnej listy nie zwracamy - dyrektor widzi
+    całą korespondencję placówki.
+    """
+    page_size = 50
+    newest_first = False
+    always_paginate = True
+
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageHistoryPagination
 
     def get_queryset(self):
         """
         Zaktualizowana logika widoczności:
         1. Rodzic: Widzi tylko swoją rozmowę z Dyrektorem.
         2. Dyrektor: Widzi WSZYSTKIE wiadomości w systemie.
+        Opcjonalnie ?participant_id=<id> zawęża listę do jednej rozmowy.
         """
         user = self.request.user
 
         # A. DYREKTOR widzi całą korespondencję
         if user.is_director:
             # Sortujemy tak, aby najnowsze wiadomości były na dole (jak w czacie)
-            return Message.objects.all().order_by('created_at')
+            queryset = Message.objects.all()
 
         # B. RODZIC widzi tylko swoje wiadomości
         else:
-            return Message.objects.filter(
+            queryset = Message.objects.filter(
                 Q(sender=user) | Q(receiver=user)
-            ).order_by('created_at')
+            )
+
+        participant_id = self.request.query_params.get('participant_id')
+        if participant_id:
+            try:
+                participant_id = int(participant_id)
+            except (TypeError, ValueError):
+                return Message.objects.none()
+            queryset = queryset.filter(Q(sender_id=participant_id) | Q(receiver_id=participant_id))
+
+        return queryset.select_related('sender', 'receiver').order_by('created_at', 'id')
 
     def perform_create(self, serializer):
         """
@@ -50,7 +77,9 @@ class MessageViewSet(viewsets.ModelViewSet):
                 )
 
             # Zapisujemy wiadomość z automatycznie przypisanym odbiorcą
-            message = serializer.save(sender=sender, receiver=director)
+            with transaction.atomic():
+                message = serializer.save(sender=sender, receiver=director)
+                register_message(message)
             self._broadcast_new_message(message)
             self._send_unread_count_update(message.receiver_id)
 
@@ -60,7 +89,9 @@ class MessageViewSet(viewsets.ModelViewSet):
             if 'receiver' not in serializer.validated_data:
                  raise serializers.ValidationError({"receiver": "Jako Dyrektor musisz wybrać odbiorcę wiadomości."})
             
-            message = serializer.save(sender=sender)
+            with transaction.atomic():
+                message = serializer.save(sender=sender)
+                register_message(message)
             self._broadcast_new_message(message)
             self._send_unread_count_update(message.receiver_id)
         
@@ -68,21 +99,22 @@ class MessageViewSet(viewsets.ModelViewSet):
         else:
             raise permissions.PermissionDenied("Nie masz uprawnień do wysyłania wiadomości.")
 
+    def perform_destroy(self, instance):
+        sides = conversation_sides(instance.sender, instance.receiver)
+        with transaction.atomic():
+            instance.delete()
+            if sides is not None:
+                rebuild_conversation(*sides)
+
     def _send_ws_event(self, user_id, event_type, payload):
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
-
-        async_to_sync(channel_layer.group_send)(
-            f'user_{user_id}',
-            {
-                'type': event_type,
-                **payload,
-            }
-        )
+        # Wysyłka przez kolejkę w tle - odpowiedź nie czeka na warstwę kanałów
+        dispatch([user_channel_group(user_id)], {
+            'type': event_type,
+            **payload,
+        })
 
     def _send_unread_count_update(self, user_id):
-        count = Message.objects.filter(receiver_id=user_id, is_read=False).count()
+        count = unread_total_for_user(user_id)
         self._send_ws_event(user_id, 'chat.unread_count', {'count': count})
 
     def _broadcast_new_message(self, message):
@@ -103,7 +135,12 @@ class MessageViewSet(viewsets.ModelViewSet):
         if not read_message_ids:
             return 0
 
-        unread_qs.update(is_read=True)
+        with transaction.atomic():
+            # Tylko wiadomości z listy - nowsze trafią do licznika i kolejnego oznaczenia
+            marked = Message.objects.filter(id__in=read_message_ids, is_read=False).update(is_read=True)
+            decrease_unread_count(reader_id, participant_id, marked)
+        # update() nie wysyła sygnałów, więc sekcję wiadomości pulpitu unieważniamy ręcznie
+        invalidate_dashboard_sections('messages')
 
         payload = {
             'reader_id': reader_id,
@@ -122,8 +159,7 @@ class MessageViewSet(viewsets.ModelViewSet):
         """
         Zwraca liczbę nieprzeczytanych wiadomości dla zalogowanego użytkownika.
         """
-        user = request.user
-        count = Message.objects.filter(receiver=user, is_read=False).count()
+        count = unread_total_for_user(request.user.id)
         return Response({'count': count})
 
     @action(detail=False, methods=['post'])
@@ -198,4 +234,16 @@ class MessageViewSet(viewsets.ModelViewSet):
                 for participant in sender_ids:
                     updated += self._mark_messages_read(user.id, participant)
 
-        return Response({'status': 'marked', 'updated_count': updated})
\ No newline at end of file
+        return Response({'status': 'marked', 'updated_count': updated})
+
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Lista rozmów (skrzynka czatu) z ostatnią wiadomością i licznikiem nieprzeczytanych.
+    Dyrektor widzi swoje rozmowy z rodzicami, rodzic - rozmowę z dyrektorem.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return conversations_for_user(self.request.user)
@@ -22,3 +22,8 @@ application = ProtocolTypeRouter({
 	'http': django_asgi_app,
 	'websocket': websocket_application,
 })
+
+# Naliczanie płatności według harmonogramu (SCHEDULER_ENABLED) - kontener nie ma crona
+from core.scheduler import start_scheduler
+
+start_scheduler()
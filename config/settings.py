@@ -98,6 +98,11 @@ else:
         }
     }
 
+# Kolejka zdarzeń WebSocket (core.dispatch): domyślnie w pamięci procesu, opcjonalnie w Redisie
+NOTIFICATION_DISPATCH_REDIS_URL = os.getenv('NOTIFICATION_DISPATCH_REDIS_URL')
+# Okno (w sekundach), w którym powtórzone powiadomienia do tych samych odbiorców są sklejane
+NOTIFICATION_DISPATCH_WINDOW = float(os.getenv('NOTIFICATION_DISPATCH_WINDOW', '0.25'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',  # <--- To jest kluczowe dla Reacta
@@ -248,6 +253,26 @@ if USE_CLOUDINARY:
     }
     DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Obróbka zdjęć (core.images): zdjęcie zmniejszamy w żądaniu przed pierwszym zapisem,
+# pula wątków po commicie robi tylko kopie WebP (renditions).
+# IMAGE_PROCESSING_SYNC=true robi kopie od razu po commicie (testy, proste wdrożenia)
+IMAGE_PROCESSING_SYNC = get_bool_env('IMAGE_PROCESSING_SYNC', False)
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', '2'))
+# Albumy (core.gallery_uploads): procesy do obróbki Pillow (0 = liczba rdzeni) i wątki zapisu plików
+IMAGE_INGEST_PROCESSES = int(os.getenv('IMAGE_INGEST_PROCESSES', '0'))
+IMAGE_STORAGE_WRITE_THREADS = int(os.getenv('IMAGE_STORAGE_WRITE_THREADS', '4'))
+
+# Harmonogram zadań (core.scheduler) uruchamiany razem z aplikacją ASGI - domyślnie poza trybem DEBUG.
+# Terminy: "<dzień miesiąca|*> <GG:MM>" w TIME_ZONE, "off" wyłącza zadanie
+SCHEDULER_ENABLED = get_bool_env('SCHEDULER_ENABLED', not DEBUG)
+SCHEDULER_INTERVAL = int(os.getenv('SCHEDULER_INTERVAL', '60'))
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', '1800'))
+SCHEDULER_RETRY_SECONDS = int(os.getenv('SCHEDULER_RETRY_SECONDS', '900'))
+SCHEDULER_JOBS = {
+    'meal_payments': os.getenv('SCHEDULE_MEAL_PAYMENTS', '1 02:00'),
+    'recurring_payments': os.getenv('SCHEDULE_RECURRING_PAYMENTS', '* 02:30'),
+}
+
 DJANGO_REST_PASSWORDRESET_SERIALIZER_CLASS = 'users.serializers.CustomPasswordResetSerializer'
 
 # USTAWIENIA EMAIL (Testowe - wyświetla w konsoli)
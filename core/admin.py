@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django import forms
-from .models import Group, Child, Payment, Post, Attendance, FacilityClosure, SpecialActivity, DailyMenu, PostComment, RecurringPayment, GalleryItem, GalleryImage
+from .models import Group, Child, Payment, Post, Attendance, FacilityClosure, SpecialActivity, DailyMenu, PostComment, RecurringPayment, GalleryItem, GalleryImage, JobRun
 
 
 # Prosta rejestracja - pozwoli dodawać/edytować elementy
@@ -136,6 +136,21 @@ class RecurringPaymentAdmin(admin.ModelAdmin):
 
 admin.site.register(RecurringPayment, RecurringPaymentAdmin)
 
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job_name', 'scheduled_for', 'started_at', 'duration', 'rows', 'status', 'owner')
+    list_filter = ('job_name', 'status')
+    date_hierarchy = 'started_at'
+    readonly_fields = ('job_name', 'scheduled_for', 'owner', 'status', 'started_at', 'finished_at', 'duration', 'rows', 'error')
+
+    # Historię zapisuje harmonogram (core/scheduler.py) - w panelu tylko podgląd
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(JobRun, JobRunAdmin)
+
 # To pozwala dodawać zdjęcia BEZPOŚREDNIO w widoku Albumu
 class GalleryImageInline(admin.TabularInline):
     model = GalleryImage
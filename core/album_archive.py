@@ -0,0 +1,94 @@
+import os
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+
+
+# Tyle bajtów zdjęcia czytamy naraz - tyle mniej więcej trzyma w pamięci jedno pobieranie
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """Plik tylko do zapisu, z którego generator zabiera to, co zipfile zdążył dopisać."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _archive_names(image_names):
+    # Pliki w storage nazywają się skrótem treści, więc w archiwum numerujemy je po kolei
+    width = max(3, len(str(len(image_names))))
+    return [f'{index:0{width}d}{os.path.splitext(name)[1]}' for index, name in enumerate(image_names, start=1)]
+
+
+def iter_zip_archive(storage, image_names):
+    """
+    Generator ZIP-a ze zdjęciami czytanymi po kawałku ze storage.
+    Nic nie jest buforowane w całości: zipfile pisze do strumienia bez seek
+    (rozmiary trafiają do deskryptorów danych), a my oddajemy bajty od razu.
+    Zdjęcia są już skompresowane, więc pliki tylko pakujemy (ZIP_STORED).
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for image_name, archive_name in zip(image_names, _archive_names(image_names)):
+            with storage.open(image_name, 'rb') as source, archive.open(archive_name, mode='w', force_zip64=True) as target:
+                while True:
+                    chunk = source.read(ARCHIVE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.pop()
+                    if data:
+                        yield data
+    # Koniec ostatniego pliku i katalog centralny dopisywane przy zamknięciu archiwum
+    data = sink.pop()
+    if data:
+        yield data
+
+
+async def _iterate_async(iterator):
+    sentinel = object()
+    while True:
+        chunk = await sync_to_async(next)(iterator, sentinel)
+        if chunk is sentinel:
+            return
+        yield chunk
+
+
+def album_zip_response(request, album):
+    """
+    StreamingHttpResponse z ZIP-em albumu. Pod ASGI (daphne) oddajemy iterator asynchroniczny -
+    Django 4.2 iterator synchroniczny zebrałby tam w liście całe archiwum przed wysłaniem.
+    """
+    image_names = [name for name in album.images.order_by('id').values_list('image', flat=True) if name]
+    storage = album.images.model._meta.get_field('image').storage
+
+    content = iter_zip_archive(storage, image_names)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = _iterate_async(content)
+
+    response = StreamingHttpResponse(content, content_type='application/zip')
+    filename = f'{slugify(album.title) or "album"}-{album.pk}.zip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
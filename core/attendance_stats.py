@@ -0,0 +1,105 @@
+import datetime
+
+from django.db.models import Count
+from django.utils import timezone
+
+from core.business_days import is_school_day
+from core.models import Attendance, AttendanceDailyAggregate, Child
+
+
+def refresh_attendance_aggregate(day, group_id):
+    """Przelicza licznik nieobecności dla jednej pary (dzień, grupa)."""
+    if day is None or group_id is None:
+        return
+
+    absent_count = Attendance.objects.filter(
+        date=day,
+        child__group_id=group_id,
+        status='absent',
+    ).count()
+
+    if absent_count:
+        AttendanceDailyAggregate.objects.update_or_create(
+            date=day,
+            group_id=group_id,
+            defaults={'absent_count': absent_count},
+        )
+    else:
+        AttendanceDailyAggregate.objects.filter(date=day, group_id=group_id).delete()
+
+
+def refresh_attendance_aggregates_for_child(child_id, group_ids):
+    """Po zmianie grupy dziecka przelicza wszystkie dni, w których zgłoszono jego nieobecność."""
+    absence_dates = set(
+        Attendance.objects.filter(child_id=child_id).values_list('date', flat=True)
+    )
+    for day in absence_dates:
+        for group_id in set(group_ids):
+            refresh_attendance_aggregate(day, group_id)
+
+
+def _series_point(current_date, absent_count, total_children):
+    present_count = max(total_children - absent_count, 0)
+    attendance_rate = round((present_count / total_children) * 100, 1) if total_children else 0.0
+
+    return {
+        'date': current_date.isoformat(),
+        'label': current_date.strftime('%d.%m'),
+        'present': present_count,
+        'absent': absent_count,
+        'total': total_children,
+        'attendance_rate': attendance_rate,
+        'is_school_day': is_school_day(current_date),
+    }
+
+
+def build_attendance_series(group_ids, periods=(7, 30)):
+    """
+    Zwraca serie frekwencji dla całej placówki ('all') i każdej grupy,
+    osobno dla każdego okresu (liczba dni wstecz, łącznie z dzisiaj).
+
+    Wszystkie okresy i grupy są liczone z jednego odczytu zakresu
+    AttendanceDailyAggregate oraz jednego zapytania o liczbę dzieci w grupach.
+    """
+    today = timezone.localdate()
+    longest_period = max(periods)
+    start_date = today - datetime.timedelta(days=longest_period - 1)
+
+    totals_by_group = {
+        int(entry['group_id']): entry['total']
+        for entry in Child.objects.values('group_id').annotate(total=Count('id'))
+    }
+    total_children = sum(totals_by_group.values())
+
+    absences = {}
+    absences_all = {}
+    aggregate_rows = AttendanceDailyAggregate.objects.filter(
+        date__range=(start_date, today),
+    ).values_list('date', 'group_id', 'absent_count')
+
+    for day, group_id, absent_count in aggregate_rows:
+        absences[(day, int(group_id))] = absent_count
+        absences_all[day] = absences_all.get(day, 0) + absent_count
+
+    result = {}
+    for days in periods:
+        period_start = today - datetime.timedelta(days=days - 1)
+        dates = [period_start + datetime.timedelta(days=day_index) for day_index in range(days)]
+
+        period_series = {
+            'all': [
+                _series_point(current_date, int(absences_all.get(current_date, 0)), total_children)
+                for current_date in dates
+            ],
+        }
+        for group_id in group_ids:
+            group_id = int(group_id)
+            group_total = int(totals_by_group.get(group_id, 0))
+            period_series[str(group_id)] = [
+                _series_point(current_date, int(absences.get((current_date, group_id), 0)), group_total)
+                for current_date in dates
+            ]
+
+        result[days] = period_series
+
+    return result
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Child, SpecialActivity
+
+
+# Mapa dziecko -> grupa rodzica rzadko się zmienia, a czyta ją każdy widok tablicy, galerii i planu
+AUDIENCE_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'audience_child_groups_{int(user_id)}'
+
+
+def _is_staff(user):
+    return user.is_director or user.is_teacher
+
+
+def child_groups_for_user(user):
+    """
+    {child_id: group_id} dzieci rodzica.
+    Liczone raz na żądanie (zapamiętane na obiekcie użytkownika) i trzymane w cache
+    do zmiany dziecka (sygnały w core/signals.py wołają invalidate_audience).
+    """
+    memo = getattr(user, '_audience_child_groups', None)
+    if memo is not None:
+        return memo
+
+    child_groups = cache.get(_cache_key(user.id))
+    if child_groups is None:
+        child_groups = dict(user.child.values_list('id', 'group_id'))
+        cache.set(_cache_key(user.id), child_groups, timeout=AUDIENCE_CACHE_TIMEOUT)
+
+    user._audience_child_groups = child_groups
+    return child_groups
+
+
+def visible_group_ids(user):
+    return set(child_groups_for_user(user).values())
+
+
+def invalidate_audience(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in set(user_ids)])
+
+
+def _parse_child_id(child_id):
+    try:
+        return int(child_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def audience_group_ids(user, child_id=None):
+    """
+    Grupy, których treści widzi użytkownik:
+    - None - wszystkie (personel bez wybranego dziecka),
+    - zbiór id grup (pusty = tylko treści ogólne).
+    child_id zawęża widok do grupy jednego dziecka; cudze lub nieistniejące dziecko
+    daje False - użytkownik nie widzi wtedy niczego. Wyjątek: rodzic bez przypisanych
+    dzieci zawsze widzi treści ogólne, niezależnie od child_id.
+    """
+    if child_id:
+        if not _is_staff(user) and not child_groups_for_user(user):
+            return set()
+
+        parsed_child_id = _parse_child_id(child_id)
+        if parsed_child_id is None:
+            return False
+
+        if _is_staff(user):
+            group_id = Child.objects.filter(id=parsed_child_id).values_list('group_id', flat=True).first()
+        else:
+            group_id = child_groups_for_user(user).get(parsed_child_id)
+        return {group_id} if group_id is not None else False
+
+    if _is_staff(user):
+        return None
+    return visible_group_ids(user)
+
+
+def filter_targeted_content(queryset, user, child_id=None, field='target_group'):
+    """Treści z polem "dla grupy (puste = dla wszystkich)" - posty, albumy."""
+    group_ids = audience_group_ids(user, child_id)
+    if group_ids is None:
+        return queryset
+    if group_ids is False:
+        return queryset.none()
+
+    # Klucz obcy nie mnoży wierszy, więc distinct() nie jest potrzebne
+    global_content = Q(**{f'{field}__isnull': True})
+    if not group_ids:
+        return queryset.filter(global_content)
+    return queryset.filter(global_content | Q(**{f'{field}_id__in': group_ids}))
+
+
+def filter_group_activities(queryset, user, child_id=None):
+    """Zajęcia dodatkowe (M2M z grupami) - EXISTS zamiast JOIN + distinct()."""
+    group_ids = audience_group_ids(user, child_id)
+    if group_ids is None:
+        return queryset
+    if not group_ids:
+        return queryset.none()
+
+    return queryset.filter(Exists(
+        SpecialActivity.groups.through.objects.filter(specialactivity_id=OuterRef('pk'), group_id__in=group_ids)
+    ))
@@ -0,0 +1,100 @@
+import uuid
+
+from .audience import visible_group_ids
+from .dispatch import dispatch
+
+
+# Grupy kanałów WebSocket, do których ChatConsumer dopisuje połączenie przy connect()
+ALL_USERS_GROUP = 'all_users'
+DIRECTORS_GROUP = 'directors'
+TEACHERS_GROUP = 'teachers'
+
+# Liczniki z NotificationSummaryView, które klient może przesunąć o deltę bez pobierania podsumowania
+NOTIFICATION_SECTIONS = ('schedule', 'gallery', 'calendar', 'payments')
+
+def user_channel_group(user_id):
+    return f'user_{int(user_id)}'
+
+
+def group_channel_group(group_id):
+    return f'group_{int(group_id)}'
+
+
+def channel_groups_for_user(user):
+    """Lista grup kanałów, do których należy połączenie danego użytkownika."""
+    channel_groups = [user_channel_group(user.id), ALL_USERS_GROUP]
+
+    if user.is_director:
+        channel_groups.append(DIRECTORS_GROUP)
+    if user.is_teacher:
+        channel_groups.append(TEACHERS_GROUP)
+
+    channel_groups.extend(group_channel_group(group_id) for group_id in sorted(visible_group_ids(user)))
+    return channel_groups
+
+
+def send_to_channel_groups(channel_groups, event):
+    """Wysyła zdarzenie raz na każdą grupę kanałów - przez kolejkę w tle, po zatwierdzeniu transakcji."""
+    dispatch(channel_groups, event)
+
+
+def notification_audience(user_ids=None, group_ids=None, include_directors=True, include_teachers=False):
+    """
+    Zamienia odbiorców na grupy kanałów.
+    Brak user_ids i group_ids oznacza wszystkich użytkowników.
+    """
+    if user_ids is None and group_ids is None:
+        return [ALL_USERS_GROUP]
+
+    channel_groups = [group_channel_group(group_id) for group_id in set(group_ids or [])]
+    channel_groups.extend(user_channel_group(user_id) for user_id in set(user_ids or []))
+    if include_directors:
+        channel_groups.append(DIRECTORS_GROUP)
+    if include_teachers:
+        channel_groups.append(TEACHERS_GROUP)
+    return channel_groups
+
+
+def notification_change(deltas, child_id=None):
+    """
+    Opis jednej zmiany liczników powiadomień wysyłany klientom.
+    id pozwala klientowi pominąć tę samą zmianę, gdy dotrze kilkoma grupami kanałów
+    (np. rodzic z dziećmi w dwóch grupach), a child_id zawęża zmianę do widoku jednego dziecka.
+    """
+    unknown = set(deltas) - set(NOTIFICATION_SECTIONS)
+    if unknown:
+        raise ValueError(f'Nieznane sekcje powiadomień: {sorted(unknown)}')
+
+    return {
+        'id': uuid.uuid4().hex,
+        'deltas': {section: int(delta) for section, delta in deltas.items()},
+        'child_id': int(child_id) if child_id is not None else None,
+    }
+
+
+def broadcast_notification_summary_changed(
+    user_ids=None,
+    group_ids=None,
+    include_directors=True,
+    include_teachers=False,
+    deltas=None,
+    child_id=None,
+):
+    """
+    Powiadamia klientów o zmianie liczników.
+    Z deltas klient przesuwa liczniki sam; bez nich (zmiana nie jest jednakowa dla wszystkich
+    odbiorców, np. usunięcie zajęć) pobiera pełne podsumowanie.
+    """
+    event = {'type': 'chat.notification_summary_changed'}
+    if deltas:
+        event['changes'] = [notification_change(deltas, child_id=child_id)]
+
+    send_to_channel_groups(
+        notification_audience(
+            user_ids=user_ids,
+            group_ids=group_ids,
+            include_directors=include_directors,
+            include_teachers=include_teachers,
+        ),
+        event,
+    )
@@ -0,0 +1,85 @@
+import datetime
+from itertools import accumulate
+
+from django.core.cache import cache
+
+from .models import FacilityClosure
+
+
+# Kalendarz roku zmienia się tylko przy dodaniu/usunięciu dnia wolnego (sygnały w core/signals.py)
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(year):
+    return f'business_days_calendar_{int(year)}'
+
+
+class YearCalendar:
+    """
+    Dni zajęć jednego roku: bitmapa (1 = dzień roboczy bez zamknięcia placówki)
+    i sumy prefiksowe, więc "ile dni zajęć w przedziale" to jedno odejmowanie.
+    """
+
+    def __init__(self, year, closed_dates):
+        self.year = year
+        self.first_day = datetime.date(year, 1, 1)
+        days_in_year = (datetime.date(year + 1, 1, 1) - self.first_day).days
+        self.closed_dates = frozenset(closed_dates)
+
+        self.school_days = bytes(
+            1 if day.isoweekday() <= 5 and day not in self.closed_dates else 0
+            for day in (self.first_day + datetime.timedelta(days=offset) for offset in range(days_in_year))
+        )
+        # prefix[i] = liczba dni zajęć przed i-tym dniem roku
+        self.prefix = [0, *accumulate(self.school_days)]
+
+    def _offset(self, day):
+        return (day - self.first_day).days
+
+    def is_school_day(self, day):
+        return bool(self.school_days[self._offset(day)])
+
+    def count(self, first_day, last_day):
+        """Dni zajęć w [first_day, last_day] - oba dni w tym samym roku."""
+        return self.prefix[self._offset(last_day) + 1] - self.prefix[self._offset(first_day)]
+
+
+def get_year_calendar(year):
+    calendar = cache.get(_cache_key(year))
+    if calendar is None:
+        closed_dates = FacilityClosure.objects.filter(date__year=year).values_list('date', flat=True)
+        calendar = YearCalendar(year, closed_dates)
+        cache.set(_cache_key(year), calendar, timeout=CALENDAR_CACHE_TIMEOUT)
+    return calendar
+
+
+def invalidate_calendar(*days):
+    cache.delete_many([_cache_key(day.year) for day in days if day is not None])
+
+
+def is_school_day(day):
+    """Dzień roboczy, w który placówka jest otwarta."""
+    return get_year_calendar(day.year).is_school_day(day)
+
+
+def business_days_between(first_day, last_day):
+    """Liczba dni zajęć w przedziale [first_day, last_day] (także na przełomie lat)."""
+    if first_day > last_day:
+        return 0
+
+    total = 0
+    for year in range(first_day.year, last_day.year + 1):
+        year_first_day = max(first_day, datetime.date(year, 1, 1))
+        year_last_day = min(last_day, datetime.date(year, 12, 31))
+        total += get_year_calendar(year).count(year_first_day, year_last_day)
+    return total
+
+
+def closed_dates_between(first_day, last_day):
+    """Dni zamknięcia placówki w przedziale - z kalendarza w cache, bez zapytania."""
+    return {
+        closed_date
+        for year in range(first_day.year, last_day.year + 1)
+        for closed_date in get_year_calendar(year).closed_dates
+        if first_day <= closed_date <= last_day
+    }
@@ -0,0 +1,33 @@
+import os
+
+import cloudinary.uploader
+from cloudinary_storage.storage import MediaCloudinaryStorage
+
+
+class ContentAddressedCloudinaryStorage(MediaCloudinaryStorage):
+    """
+    Cloudinary dla plików nazwanych skrótem treści (core.image_store).
+    Domyślny MediaCloudinaryStorage wysyła z use_filename i losowym sufiksem public_id,
+    więc ta sama treść nigdy nie trafiłaby w istniejący plik. Tu public_id to nazwa
+    bez rozszerzenia, bez sufiksu i bez nadpisywania.
+    """
+
+    def stored_name(self, name):
+        """public_id, pod którym _save() zapisze plik o tej nazwie."""
+        return self._prepend_prefix(self._normalise_name(os.path.splitext(name)[0]))
+
+    def _upload(self, name, content):
+        folder, filename = os.path.split(name)
+        options = {
+            'public_id': os.path.splitext(filename)[0],
+            'unique_filename': False,
+            'overwrite': False,
+            'resource_type': self._get_resource_type(name),
+            'tags': self.TAG,
+        }
+        if folder:
+            options['folder'] = folder
+        return cloudinary.uploader.upload(content, **options)
+
+
+content_addressed_cloudinary_storage = ContentAddressedCloudinaryStorage()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+# Sekcje pulpitu dyrektora cache'owane niezależnie od siebie
+DASHBOARD_SECTIONS = ('attendance', 'debts', 'messages')
+
+# Zabezpieczenie na wypadek zmian, których nie widzą sygnały (np. zmiana nazwiska rodzica)
+DEFAULT_SECTION_TIMEOUT = 60 * 60
+
+
+def _version_key(section):
+    return f'director_dashboard_version_{section}'
+
+
+def _section_version(section):
+    version = cache.get(_version_key(section))
+    if version is None:
+        version = 1
+        cache.add(_version_key(section), version, timeout=None)
+    return version
+
+
+def _bump_section_versions(sections):
+    for section in sections:
+        key = _version_key(section)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+
+def invalidate_dashboard_sections(*sections):
+    """
+    Unieważnia wskazane sekcje pulpitu po zatwierdzeniu transakcji,
+    żeby równoległe żądanie nie zapisało w cache danych sprzed zmiany.
+    """
+    unknown = set(sections) - set(DASHBOARD_SECTIONS)
+    if unknown:
+        raise ValueError(f'Nieznane sekcje pulpitu: {sorted(unknown)}')
+
+    transaction.on_commit(lambda: _bump_section_versions(sections))
+
+
+def get_dashboard_section(section, builder, scope=None, timeout=DEFAULT_SECTION_TIMEOUT):
+    """
+    Zwraca sekcję pulpitu z cache albo buduje ją wywołując builder().
+    scope rozróżnia warianty tej samej sekcji (np. dzień albo konto dyrektora).
+    """
+    cache_key = f'director_dashboard_{section}_v{_section_version(section)}'
+    if scope is not None:
+        cache_key = f'{cache_key}_{scope}'
+
+    data = cache.get(cache_key)
+    if data is None:
+        data = builder()
+        cache.set(cache_key, data, timeout=timeout)
+    return data
+
+
+def compute_dashboard_etag(payload):
+    serialized = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder)
+    return '"{}"'.format(hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:32])
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    candidates = {value.strip() for value in if_none_match.split(',') if value.strip()}
+    return etag in candidates or f'W/{etag}' in candidates or '*' in candidates
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from core.models import Payment
+
+
+def _unpaid_payments():
+    return Payment.objects.filter(is_paid=False)
+
+
+def _parent_display_name(first_name, last_name, username):
+    return f"{first_name or ''} {last_name or ''}".strip() or username
+
+
+def build_debt_summary():
+    """
+    Zestawienie zaległości liczone po stronie bazy (GROUP BY / SUM).
+    Szczegóły pojedynczych płatności są dostępne osobno, przez
+    unpaid_payments_for_parent (stronicowany endpoint dla dyrektora).
+    """
+    totals = _unpaid_payments().aggregate(total_amount=Sum('amount'), unpaid_items=Count('id'))
+
+    by_group = [
+        {
+            'group_id': int(row['child__group_id']),
+            'group_name': row['child__group__name'],
+            'amount': float(row['total_amount'] or Decimal('0.00')),
+            'unpaid_items': row['unpaid_items'],
+        }
+        for row in _unpaid_payments()
+        .values('child__group_id', 'child__group__name')
+        .annotate(total_amount=Sum('amount'), unpaid_items=Count('id'))
+        .order_by('-total_amount', 'child__group__name')
+    ]
+
+    parent_payments = _unpaid_payments().filter(child__parents__isnull=False)
+
+    groups_by_parent = {}
+    for parent_id, group_id, group_name in (
+        parent_payments.values_list('child__parents__id', 'child__group_id', 'child__group__name')
+        .distinct()
+        .order_by()
+    ):
+        groups_by_parent.setdefault(int(parent_id), {})[int(group_id)] = group_name
+
+    debtors = []
+    for row in (
+        parent_payments.values(
+            'child__parents__id',
+            'child__parents__first_name',
+            'child__parents__last_name',
+            'child__parents__username',
+        )
+        .annotate(total_amount=Sum('amount'), unpaid_items=Count('id'))
+        .order_by('-total_amount', 'child__parents__id')
+    ):
+        parent_id = int(row['child__parents__id'])
+        parent_groups = groups_by_parent.get(parent_id, {})
+        debtors.append({
+            'parent_id': parent_id,
+            'parent_name': _parent_display_name(
+                row['child__parents__first_name'],
+                row['child__parents__last_name'],
+                row['child__parents__username'],
+            ),
+            'amount': float(row['total_amount'] or Decimal('0.00')),
+            'unpaid_items': row['unpaid_items'],
+            'group_ids': sorted(parent_groups.keys()),
+            'group_names': sorted(parent_groups.values()),
+        })
+
+    return {
+        'total_outstanding': float(totals['total_amount'] or Decimal('0.00')),
+        'total_unpaid_items': totals['unpaid_items'] or 0,
+        'by_group': by_group,
+        'debtors': debtors,
+        'top_debtor': debtors[0] if debtors else None,
+    }
+
+
+def unpaid_payments_for_parent(parent_id, group_id=None):
+    """Nieopłacone płatności dzieci danego rodzica (do stronicowania)."""
+    queryset = _unpaid_payments().filter(child__parents__id=parent_id)
+    if group_id is not None:
+        queryset = queryset.filter(child__group_id=group_id)
+
+    return queryset.select_related('child', 'child__group').order_by('created_at', 'id')
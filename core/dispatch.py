@@ -0,0 +1,174 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+# Zdarzenia, które niosą tylko informację "coś się zmieniło" - kilka takich samych w oknie wysyłamy raz
+COALESCED_EVENT_TYPES = frozenset({'chat.notification_summary_changed'})
+
+
+def coalesce_events(items):
+    """
+    Skleja powtórzone zdarzenia z COALESCED_EVENT_TYPES skierowane do tej samej grupy kanałów.
+    items to lista par (grupa kanałów, zdarzenie); kolejność pierwszych wystąpień zostaje zachowana.
+    Listy zmian liczników (changes) są łączone; jeśli choć jedno zdarzenie ich nie ma,
+    wynikiem jest samo "odśwież", bo klient i tak pobierze pełne podsumowanie.
+    """
+    coalesced = []
+    positions = {}
+
+    for channel_group, event in items:
+        event_type = event.get('type')
+        if event_type not in COALESCED_EVENT_TYPES:
+            coalesced.append((channel_group, event))
+            continue
+
+        key = (channel_group, event_type)
+        if key not in positions:
+            positions[key] = len(coalesced)
+            coalesced.append((channel_group, dict(event)))
+            continue
+
+        merged = coalesced[positions[key]][1]
+        if 'changes' in merged and 'changes' in event:
+            merged['changes'] = [*merged['changes'], *event['changes']]
+        else:
+            merged.pop('changes', None)
+
+    return coalesced
+
+
+class InProcessDispatchQueue:
+    """Kolejka w pamięci procesu - wystarcza przy jednym procesie daphne."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put_many(self, items):
+        for item in items:
+            self._queue.put(item)
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+
+class RedisDispatchQueue:
+    """Kolejka w liście Redisa - zdarzenia z wielu procesów trafiają do wspólnego workera."""
+
+    def __init__(self, url, key='notification_dispatch_queue'):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._key = key
+
+    def put_many(self, items):
+        if items:
+            self._client.rpush(self._key, *(json.dumps(item, cls=DjangoJSONEncoder) for item in items))
+
+    def get(self, timeout=None):
+        result = self._client.blpop([self._key], timeout=int(timeout or 0))
+        if result is None:
+            return None
+        return tuple(json.loads(result[1]))
+
+    def drain(self):
+        with self._client.pipeline() as pipe:
+            pipe.lrange(self._key, 0, -1)
+            pipe.delete(self._key)
+            raw_items, _ = pipe.execute()
+        return [tuple(json.loads(raw)) for raw in raw_items]
+
+
+class NotificationDispatcher:
+    """
+    Wysyła zdarzenia WebSocket w wątku w tle, więc żądanie HTTP nie czeka na warstwę kanałów.
+    Worker po odebraniu pierwszego zdarzenia czeka `window` sekund, zbiera resztę
+    i skleja duplikaty - seria edycji kończy się jednym powiadomieniem na klienta.
+    """
+
+    def __init__(self, dispatch_queue, window):
+        self.queue = dispatch_queue
+        self.window = window
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, channel_groups, event):
+        self.queue.put_many([(channel_group, dict(event)) for channel_group in channel_groups])
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='notification-dispatch', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                first_item = self.queue.get(timeout=30)
+                if first_item is None:
+                    continue
+                if self.window:
+                    time.sleep(self.window)
+                self.send_batch([first_item, *self.queue.drain()])
+            except Exception:
+                logger.exception('Nie udało się wysłać zdarzeń WebSocket')
+
+    def send_batch(self, items):
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+
+        for channel_group, event in coalesce_events(items):
+            async_to_sync(channel_layer.group_send)(channel_group, event)
+
+
+def _build_dispatcher():
+    redis_url = getattr(settings, 'NOTIFICATION_DISPATCH_REDIS_URL', None)
+    dispatch_queue = RedisDispatchQueue(redis_url) if redis_url else InProcessDispatchQueue()
+    return NotificationDispatcher(dispatch_queue, getattr(settings, 'NOTIFICATION_DISPATCH_WINDOW', 0.25))
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = _build_dispatcher()
+    return _dispatcher
+
+
+def dispatch(channel_groups, event):
+    """Kolejkuje zdarzenie do grup kanałów po zatwierdzeniu transakcji (raz na grupę)."""
+    channel_groups = list(dict.fromkeys(channel_groups))
+    if not channel_groups:
+        return
+
+    transaction.on_commit(lambda: get_dispatcher().enqueue(channel_groups, event))
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.db.models import BooleanField, Count, Exists, F, IntegerField, OuterRef, Prefetch, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from users.models import User
+
+from .models import Post, PostComment
+
+
+def _liked_by_user(through_model, owner_field, user):
+    """Podzapytanie EXISTS "czy użytkownik polubił" - zamiast osobnego zapytania na każdy obiekt."""
+    if user is None or not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(through_model.objects.filter(**{owner_field: OuterRef('pk')}, user_id=user.id))
+
+
+def comments_with_like_data(user, queryset=None):
+    """Komentarze z autorem i flagą polubienia przez użytkownika."""
+    if queryset is None:
+        queryset = PostComment.objects.all()
+
+    return queryset.select_related('author').annotate(
+        liked_by_me=_liked_by_user(PostComment.likes.through, 'postcomment_id', user),
+    )
+
+
+def _latest_comments(user, per_post):
+    """Ostatnie per_post komentarzy każdego posta (ROW_NUMBER w SQL, gdy baza to obsługuje)."""
+    queryset = comments_with_like_data(user)
+    if not connection.features.supports_over_clause:
+        return queryset
+
+    return queryset.annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('post_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        )
+    ).filter(position__lte=per_post).order_by('created_at', 'id')
+
+
+def feed_queryset(queryset, user, comments_preview=None):
+    """
+    Dokleja do postów wszystko, czego potrzebuje PostSerializer, w stałej liczbie zapytań:
+    jedno na posty (z flagą "lubię to"; liczba polubień to kolumna like_count), jedno na komentarze
+    i jedno na polubiających - niezależnie od liczby postów na tablicy.
+
+    Z comments_preview=N każdy post dostaje tylko liczbę komentarzy i N ostatnich
+    (w atrybucie latest_comments); resztę doczytuje endpoint /api/newsfeed/{id}/comments/.
+    """
+    queryset = queryset.annotate(
+        liked_by_me=_liked_by_user(Post.likes.through, 'post_id', user),
+    ).prefetch_related(
+        Prefetch('likes', queryset=User.objects.only('id', 'username', 'first_name', 'last_name')),
+    )
+
+    if comments_preview is None:
+        return queryset.prefetch_related(Prefetch('comments', queryset=comments_with_like_data(user)))
+
+    comments_count = PostComment.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+        total=Count('id'),
+    ).values('total')
+    return queryset.annotate(
+        comments_total=Coalesce(Subquery(comments_count, output_field=IntegerField()), 0),
+    ).prefetch_related(
+        Prefetch('comments', queryset=_latest_comments(user, comments_preview), to_attr='latest_comments'),
+    )
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from .image_store import acquire, release, reserved_name, save_derived_file
+from .images import prepare_upload, rendition_name
+from .models import GalleryImage
+
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn zamiast fork - fork procesu z wątkami (daphne, dispatcher) potrafi się zakleszczyć
+        _process_pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_INGEST_PROCESSES', None) or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _process_pool
+
+
+def _reset_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = None
+
+
+def _prepare_all_inline(uploads):
+    results = []
+    for content, name in uploads:
+        try:
+            results.append(prepare_upload(content, name))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def _prepare_all(uploads):
+    """Obróbka Pillow równolegle w puli procesów; wynik albo wyjątek dla każdego pliku."""
+    if getattr(settings, 'IMAGE_PROCESSING_SYNC', False) or len(uploads) < 2:
+        return _prepare_all_inline(uploads)
+
+    try:
+        futures = [_get_process_pool().submit(prepare_upload, content, name) for content, name in uploads]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                raise
+            except Exception as exc:
+                results.append(exc)
+        return results
+    except BrokenProcessPool:
+        # Padł proces roboczy (np. brak pamięci) - odtwarzamy pulę i robimy to w tym procesie
+        logger.exception('Pula procesów do obróbki zdjęć przestała działać')
+        _reset_process_pool()
+        return _prepare_all_inline(uploads)
+
+
+def _storage_name(upload_name):
+    return GalleryImage._meta.get_field('image').generate_filename(None, upload_name)
+
+
+def _write_files(prepared):
+    """Zapisuje zdjęcie i jego kopie WebP (odwołanie do pliku jest już zarezerwowane)."""
+    upload_name, image_bytes, renditions = prepared
+    storage = GalleryImage._meta.get_field('image').storage
+    image_name = storage.save(_storage_name(upload_name), ContentFile(image_bytes))
+    rendition_names = {
+        rendition: save_derived_file(storage, rendition_name(image_name, rendition), ContentFile(content))
+        for rendition, content in renditions.items()
+    }
+    return image_name, rendition_names
+
+
+def ingest_gallery_images(album, files):
+    """
+    Dodaje wiele zdjęć do albumu naraz:
+    1. obróbka (zmniejszenie + kopie WebP) w puli procesów,
+    2. równoległy zapis plików do storage,
+    3. jeden bulk_create dla wszystkich wierszy GalleryImage.
+    Zwraca listę wyników w kolejności plików: {'file', 'status': 'ok'|'error', 'id' | 'error'}.
+    Zdjęcia są od razu gotowe (image_ready=True), więc nie trafiają do kolejki w tle.
+    """
+    if not files:
+        return []
+
+    names = [uploaded.name for uploaded in files]
+    results = [{'file': name} for name in names]
+
+    prepared = _prepare_all([(uploaded.read(), uploaded.name) for uploaded in files])
+    to_write = []
+    for index, item in enumerate(prepared):
+        if isinstance(item, Exception):
+            results[index].update(status='error', error='Plik nie jest poprawnym zdjęciem.')
+        else:
+            to_write.append((index, item))
+
+    # Odwołania rezerwujemy przed zapisem - równoległe usunięcie tej samej treści nie skasuje pliku.
+    # bulk_create omija sygnały core.image_store, więc liczniki prowadzimy tu sami.
+    storage = GalleryImage._meta.get_field('image').storage
+    reserved = {
+        index: reserved_name(storage, _storage_name(item[0]), ContentFile(item[1]))
+        for index, item in to_write
+    }
+    acquire(*reserved.values())
+
+    written = []
+    workers = getattr(settings, 'IMAGE_STORAGE_WRITE_THREADS', 4)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-write') as pool:
+        futures = [(index, pool.submit(_write_files, item)) for index, item in to_write]
+        for index, future in futures:
+            try:
+                image_name, renditions = future.result()
+            except Exception:
+                logger.exception('Nie udało się zapisać zdjęcia %s', names[index])
+                results[index].update(status='error', error='Nie udało się zapisać pliku.')
+                release(reserved[index])
+                continue
+            if image_name != reserved[index]:
+                acquire(image_name)
+                release(reserved[index])
+            written.append((index, image_name, renditions))
+
+    rows = [
+        GalleryImage(gallery_item=album, image=image_name, renditions=renditions, image_ready=True)
+        for _, image_name, renditions in written
+    ]
+    try:
+        with transaction.atomic():
+            created = GalleryImage.objects.bulk_create(rows)
+    except Exception:
+        for _, image_name, renditions in written:
+            release(image_name, derived=renditions.values())
+        raise
+
+    for (index, _, _), image in zip(written, created):
+        results[index].update(status='ok', id=image.pk)
+    return results
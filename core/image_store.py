@@ -0,0 +1,292 @@
+import hashlib
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils.deconstruct import deconstructible
+
+
+logger = logging.getLogger(__name__)
+
+# Wspólny katalog dla wszystkich modeli - to samo zdjęcie w poście, albumie i jadłospisie to jeden plik
+CONTENT_ADDRESSED_PREFIX = 'images'
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def _stored_image_model():
+    # Leniwie - moduł importują models.py obu aplikacji
+    return apps.get_model('core', 'StoredImage')
+
+
+def sha256_of(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(sha256, original_name):
+    extension = os.path.splitext(original_name or '')[1].lower()
+    return f'{CONTENT_ADDRESSED_PREFIX}/{sha256[:2]}/{sha256}{extension}'
+
+
+def derived_names(name, storage=None):
+    """Pliki pochodne zdjęcia (kopie WebP z core.images) - usuwane razem z nim."""
+    from .images import RENDITIONS, rendition_name
+
+    storage = storage or content_addressed_storage
+    return [storage.stored_name(rendition_name(name, rendition)) for rendition in RENDITIONS]
+
+
+def _default_backend():
+    if getattr(settings, 'USE_CLOUDINARY', False):
+        # Domyślny storage Cloudinary dokleja losowy sufiks do public_id - tu potrzebna stała nazwa
+        from .cloudinary_images import content_addressed_cloudinary_storage
+
+        return content_addressed_cloudinary_storage
+    return default_storage
+
+
+@deconstructible(path='core.image_store.ContentAddressedStorage')
+class ContentAddressedStorage(Storage):
+    """
+    Nakładka na domyślny storage (dysk albo Cloudinary), która zapisuje pliki pod nazwą
+    z ich skrótu SHA-256. Identyczna treść trafia do storage raz - kolejne zapisy
+    zwracają istniejącą nazwę bez ponownego wysyłania pliku.
+    Plik usuwa release() po zwolnieniu ostatniego odwołania, a nie bezpośrednie delete().
+    Odwołanie rezerwujemy (acquire) przed save(), więc równoległe zwolnienie tej samej
+    treści nie usunie pliku, który właśnie uznaliśmy za istniejący.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or _default_backend()
+
+    def stored_name(self, name):
+        """Nazwa, pod którą backend zapisze plik (Cloudinary: public_id bez rozszerzenia)."""
+        stored_name = getattr(self.backend, 'stored_name', None)
+        return stored_name(name) if stored_name is not None else name
+
+    def _save_once(self, name, content, max_length=None):
+        stored_name = self.stored_name(name)
+        # Bez zapytań do bazy - save() bywa wołane z wątków zapisu (core.gallery_uploads)
+        if self.backend.exists(stored_name):
+            return stored_name
+        return self.backend.save(name, content, max_length=max_length)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return self._save_once(content_addressed_name(sha256_of(content), name), content, max_length)
+
+    def content_name(self, name, content):
+        """Nazwa, którą zwróci save() dla tej treści - pozwala zarezerwować odwołanie przed zapisem."""
+        return self.stored_name(content_addressed_name(sha256_of(content), name))
+
+    def save_derived(self, name, content):
+        """Plik pochodny pod stałą nazwą - tylko jeśli jeszcze go nie ma."""
+        return self._save_once(name, content)
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return content_addressed_storage
+
+
+def reserved_name(storage, name, content):
+    """Nazwa docelowa pliku w storage adresowanym treścią (None dla innego storage)."""
+    content_name = getattr(storage, 'content_name', None)
+    if content_name is None:
+        return None
+    return content_name(name, content)
+
+
+def save_derived_file(storage, name, content):
+    save = getattr(storage, 'save_derived', None)
+    if save is not None:
+        return save(name, content)
+    return storage.save(name, content)
+
+
+# --- Liczniki odwołań ---
+
+def _names(names):
+    return [name for name in names if name]
+
+
+def acquire(*names):
+    """Każde pole modelu wskazujące plik to jedno odwołanie."""
+    StoredImage = _stored_image_model()
+    for name in _names(names):
+        if StoredImage.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                StoredImage.objects.create(name=name, ref_count=1)
+        except IntegrityError:
+            StoredImage.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release(*names, derived=()):
+    """
+    Zwalnia odwołania; ostatnie usuwa plik (z kopiami WebP) po zatwierdzeniu transakcji.
+    Wiersz z licznikiem 0 zostaje do czasu usunięcia pliku - na nim blokuje się acquire().
+    derived - nazwy kopii zapisane w wierszu (renditions), usuwane razem z plikiem.
+    """
+    derived = tuple(derived)
+    StoredImage = _stored_image_model()
+    for name in _names(names):
+        with transaction.atomic():
+            stored = StoredImage.objects.select_for_update().filter(name=name).first()
+            if stored is not None and stored.ref_count > 1:
+                StoredImage.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') - 1)
+                continue
+            if stored is not None:
+                StoredImage.objects.filter(pk=stored.pk).update(ref_count=0)
+        # Brak wiersza = plik sprzed liczników albo ostatnie odwołanie
+        transaction.on_commit(lambda name=name: delete_if_unreferenced(name, derived=derived))
+
+
+def delete_if_unreferenced(name, storage=None, derived=()):
+    """
+    Usuwa plik i jego kopie, o ile w międzyczasie nikt nie zarezerwował tej samej treści.
+    Sprawdzenie i usunięcie odbywają się pod blokadą wiersza licznika, więc acquire()
+    trafia albo przed nimi (plik zostaje), albo po nich (save() zapisze plik od nowa).
+    Kopie to nazwy zapisane w wierszu (derived) i - dla wierszy bez nich - nazwy wyliczone.
+    """
+    if not name:
+        return
+    storage = storage or content_addressed_storage
+    StoredImage = _stored_image_model()
+
+    with transaction.atomic():
+        stored = StoredImage.objects.select_for_update().filter(name=name).first()
+        if stored is not None and stored.ref_count > 0:
+            return
+        for file_name in dict.fromkeys((name, *derived, *derived_names(name))):
+            try:
+                storage.delete(file_name)
+            except Exception:
+                logger.exception('Nie udało się usunąć pliku %s', file_name)
+        if stored is not None:
+            stored.delete()
+
+
+# --- Śledzenie pól modeli ---
+
+def _previous_name_key(field_name):
+    return f'_previous_{field_name}_name'
+
+
+def _reserved_name_key(field_name):
+    return f'_reserved_{field_name}_name'
+
+
+def _previous_renditions_key(field_name):
+    return f'_previous_{field_name}_renditions'
+
+
+def _has_renditions(model):
+    return any(field.name == 'renditions' for field in model._meta.concrete_fields)
+
+
+def track_file_field(model, field_name):
+    """
+    Podpina liczniki odwołań pod pole pliku modelu: zapis nowego pliku dodaje odwołanie,
+    podmiana albo usunięcie wiersza zwalnia stare. Zastępuje ręczne sprzątanie plików w sygnałach.
+    Odwołanie do nowego pliku rezerwujemy w pre_save, zanim storage sprawdzi, czy plik już jest;
+    wycofanie transakcji cofa też rezerwację.
+    Zapisy omijające save() (bulk_create, update()) muszą wołać acquire/release same.
+    """
+    uid = f'{model._meta.label}.{field_name}'
+    # Kopie WebP (core.images) mają tylko modele z polem renditions
+    columns = (field_name, 'renditions') if _has_renditions(model) else (field_name,)
+
+    def remember_previous_name(sender, instance, update_fields=None, **kwargs):
+        previous_name = None
+        previous_renditions = {}
+        reserved = None
+        if update_fields is None or field_name in update_fields:
+            if instance.pk:
+                previous = sender._base_manager.filter(pk=instance.pk).values_list(*columns).first()
+                if previous is not None:
+                    previous_name = previous[0]
+                    previous_renditions = previous[1] if len(previous) > 1 else {}
+            field_file = getattr(instance, field_name)
+            if field_file and not field_file._committed:
+                reserved = reserved_name(field_file.storage, field_file.name, field_file.file)
+                acquire(reserved)
+        setattr(instance, _previous_name_key(field_name), previous_name)
+        setattr(instance, _previous_renditions_key(field_name), previous_renditions or {})
+        setattr(instance, _reserved_name_key(field_name), reserved)
+
+    def update_references(sender, instance, created, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        previous_name = getattr(instance, _previous_name_key(field_name), None) or None
+        reserved = getattr(instance, _reserved_name_key(field_name), None)
+        setattr(instance, _reserved_name_key(field_name), None)
+        current_name = getattr(instance, field_name).name or None
+
+        if reserved is None and previous_name == current_name:
+            return
+        # Ten sam plik wgrany ponownie: rezerwacja i zwolnienie poprzedniego się znoszą
+        if reserved != current_name:
+            acquire(current_name)
+            release(reserved)
+        release(previous_name, derived=getattr(instance, _previous_renditions_key(field_name), {}).values())
+
+    def release_deleted(sender, instance, **kwargs):
+        renditions = getattr(instance, 'renditions', None) or {}
+        release(getattr(instance, field_name).name, derived=renditions.values())
+
+    pre_save.connect(remember_previous_name, sender=model, weak=False, dispatch_uid=f'image_store_pre_{uid}')
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=f'image_store_post_{uid}')
+    post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=f'image_store_delete_{uid}')
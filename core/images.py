@@ -0,0 +1,239 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from .image_store import delete_if_unreferenced, save_derived_file
+
+
+logger = logging.getLogger(__name__)
+
+# Zdjęcia na tablicy i w galerii nie muszą być większe niż 1200 px
+IMAGE_MAX_SIZE = (1200, 1200)
+JPEG_QUALITY = 80
+
+# Formaty, które zapisujemy bez ponownego kodowania, jeśli zdjęcie mieści się w limicie
+OPTIMIZED_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2),
+            thread_name_prefix='image-processing',
+        )
+    return _executor
+
+
+# Mniejsze kopie w WebP - siatka galerii i tablica nie potrzebują pełnych 1200 px
+RENDITIONS = {
+    'thumb': (300, 300),
+    'medium': (800, 800),
+    'full': IMAGE_MAX_SIZE,
+}
+RENDITION_FORMAT = 'WEBP'
+RENDITION_QUALITY = 75
+RENDITIONS_DIR = 'renditions'
+
+
+def _load_image(field_file):
+    field_file.open('rb')
+    try:
+        img = Image.open(field_file)
+        img.load()
+        return img
+    finally:
+        field_file.close()
+
+
+def needs_processing(img):
+    """Decyzja na podstawie samego nagłówka (Image.open nie dekoduje pikseli)."""
+    too_large = img.width > IMAGE_MAX_SIZE[0] or img.height > IMAGE_MAX_SIZE[1]
+    return too_large or (img.format or '').upper() not in OPTIMIZED_FORMATS
+
+
+def compress_image(img):
+    """
+    Zmniejsza zdjęcie do IMAGE_MAX_SIZE i kompresuje je w tym samym formacie
+    (BMP, TIFF i inne nieskompresowane formaty zamienia na JPEG).
+    Zwraca (bajty, format) albo None, gdy zdjęcie można zapisać bez zmian.
+    """
+    if not needs_processing(img):
+        return None
+
+    image_format = (img.format or 'JPEG').upper()
+    if image_format not in OPTIMIZED_FORMATS:
+        image_format = 'JPEG'
+
+    img = img.copy()
+    img.thumbnail(IMAGE_MAX_SIZE)  # Zmniejsz zachowując proporcje
+
+    buffer = BytesIO()
+    if image_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    save_kwargs = {'optimize': True}
+    if image_format == 'JPEG':
+        save_kwargs['quality'] = JPEG_QUALITY
+
+    img.save(buffer, format=image_format, **save_kwargs)
+    return buffer.getvalue(), image_format
+
+
+def with_format_extension(name, image_format):
+    stem, extension = os.path.splitext(name)
+    if image_format == 'JPEG' and extension.lower() in ('.jpg', '.jpeg'):
+        return name
+    return f'{stem}{OPTIMIZED_FORMATS[image_format]}'
+
+
+def optimize_upload(instance, field_name='image'):
+    """
+    Przed pierwszym zapisem: sprawdza wymiary i format z nagłówka wgranego pliku
+    i tylko w razie potrzeby zmniejsza zdjęcie w pamięci. Do storage trafia więc
+    od razu wersja docelowa - jeden zapis na zdjęcie, bez ponownego otwierania pliku.
+    """
+    upload = getattr(instance, field_name).file
+    upload.seek(0)
+    try:
+        img = Image.open(upload)
+    except Exception:
+        # Nie zdjęcie albo uszkodzony plik - zapisujemy bez zmian, jak wcześniej
+        upload.seek(0)
+        return
+
+    try:
+        result = compress_image(img)
+    finally:
+        upload.seek(0)
+
+    if result is not None:
+        data, image_format = result
+        setattr(instance, field_name, ContentFile(data, name=with_format_extension(upload.name, image_format)))
+
+
+def build_renditions(img):
+    """Bajty kopii WebP dla każdego rozmiaru z RENDITIONS (bez powiększania małych zdjęć)."""
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+    renditions = {}
+    for name, size in RENDITIONS.items():
+        resized = img.copy()
+        resized.thumbnail(size)
+        buffer = BytesIO()
+        resized.save(buffer, format=RENDITION_FORMAT, quality=RENDITION_QUALITY, method=4)
+        renditions[name] = buffer.getvalue()
+    return renditions
+
+
+def prepare_upload(content, name):
+    """
+    Cała obróbka Pillow dla jednego wgranego pliku, bez dostępu do bazy i storage -
+    dzięki temu może działać w osobnym procesie (core.gallery_uploads).
+    Zwraca (nazwa, bajty zdjęcia do zapisu, {rozmiar: bajty WebP}).
+    """
+    img = Image.open(BytesIO(content))
+    result = compress_image(img)
+    if result is not None:
+        content, image_format = result
+        name = with_format_extension(name, image_format)
+    return name, content, build_renditions(img)
+
+
+def rendition_name(image_name, rendition):
+    stem = os.path.splitext(image_name)[0]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{RENDITION_FORMAT.lower()}'
+
+
+def rendition_urls(instance, request=None, field_name='image'):
+    """Adresy kopii WebP (jak ImageField w DRF - bezwzględne, gdy jest request)."""
+    storage = getattr(instance, field_name).storage
+    urls = {}
+    for rendition, name in (instance.renditions or {}).items():
+        url = storage.url(name)
+        urls[rendition] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def process_image(model_label, pk, field_name='image'):
+    """
+    Zapisuje kopie WebP (renditions) zdjęcia i oznacza je jako gotowe (image_ready).
+    Samo zdjęcie jest już zmniejszone przed pierwszym zapisem (optimize_upload).
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+
+    field_file = getattr(instance, field_name)
+    updates = {'image_ready': True}
+    if field_file:
+        img = _load_image(field_file)
+        updates['renditions'] = {
+            rendition: save_derived_file(field_file.storage, rendition_name(field_file.name, rendition), ContentFile(content))
+            for rendition, content in build_renditions(img).items()
+        }
+
+    # update() zamiast save() - bez ponownego wejścia w Model.save; warunek na nazwie pliku
+    # chroni przed nadpisaniem zdjęcia podmienionego w międzyczasie
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**updates)
+
+    if not updated:
+        # Zdjęcie zdążyło się zmienić - kopie są potrzebne tylko, jeśli ktoś inny ma tę samą treść
+        delete_if_unreferenced(field_file.name, derived=updates.get('renditions', {}).values())
+
+
+def _process_in_worker(model_label, pk, field_name):
+    try:
+        process_image(model_label, pk, field_name)
+    except Exception:
+        logger.exception('Nie udało się przetworzyć zdjęcia %s #%s', model_label, pk)
+    finally:
+        # Wątek roboczy ma własne połączenie z bazą - nie zostawiamy go otwartego
+        close_old_connections()
+
+
+def schedule_image_processing(instance, field_name='image'):
+    """
+    Kolejkuje obróbkę zdjęcia po zatwierdzeniu transakcji, więc żądanie z uploadem nie czeka na Pillow.
+    Z IMAGE_PROCESSING_SYNC (np. w testach) obróbka dzieje się od razu w tym samym wątku.
+    """
+    model_label = instance._meta.label
+    pk = instance.pk
+
+    if getattr(settings, 'IMAGE_PROCESSING_SYNC', False):
+        transaction.on_commit(lambda: process_image(model_label, pk, field_name))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_process_in_worker, model_label, pk, field_name))
+
+
+def has_new_upload(field_file):
+    # Świeżo przypisany plik (UploadedFile) nie jest jeszcze zapisany w storage
+    return bool(field_file) and not field_file._committed
+
+
+def prepare_image_save(instance, field_name='image'):
+    """
+    Wołane w Model.save przed zapisem. Przy nowym zdjęciu (albo jego usunięciu) zapomina
+    nieaktualne kopie WebP (pliki sprząta core.image_store razem z oryginałem)
+    i zwraca True, gdy po zapisie trzeba zlecić obróbkę.
+    """
+    field_file = getattr(instance, field_name)
+    image_uploaded = has_new_upload(field_file)
+
+    if image_uploaded or not field_file:
+        instance.renditions = {}
+    if image_uploaded:
+        optimize_upload(instance, field_name)
+        instance.image_ready = False
+    return image_uploaded
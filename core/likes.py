@@ -0,0 +1,80 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework import serializers
+
+from .models import GalleryItem, Post, PostComment
+
+
+# Modele z polem likes (M2M) i zdenormalizowanym licznikiem like_count
+LIKEABLE_MODELS = (Post, PostComment, GalleryItem)
+
+
+def _owner_field(model):
+    # Kolumna obiektu w automatycznej tabeli pośredniej, np. post_id, postcomment_id
+    return f'{model._meta.model_name}_id'
+
+
+def parse_liked_param(data):
+    """
+    Opcjonalny parametr liked (true/false) akcji like.
+    Podany - ustawia stan wprost (powtórzone żądanie nic nie zmienia), brak - przełącza.
+    """
+    raw_value = data.get('liked')
+    if raw_value in (None, ''):
+        return None
+    try:
+        return serializers.BooleanField().to_internal_value(raw_value)
+    except serializers.ValidationError:
+        raise serializers.ValidationError({'liked': 'Wartość musi być true albo false.'})
+
+
+def set_like(obj, user, liked=None):
+    """
+    Ustawia (albo przełącza, gdy liked=None) polubienie obiektu przez użytkownika.
+    O tym, czy wiersz powstał lub zniknął, decyduje unikalność tabeli pośredniej,
+    a like_count zmienia się F() w tej samej transakcji - równoległe kliknięcia nie rozjadą licznika.
+    Zwraca (liked, like_count).
+    """
+    model = type(obj)
+    through = model.likes.through
+    owner_field = _owner_field(model)
+    link = {owner_field: obj.pk, 'user_id': user.id}
+
+    with transaction.atomic():
+        if liked is None:
+            liked = not through.objects.filter(**link).exists()
+
+        if liked:
+            try:
+                with transaction.atomic():
+                    through.objects.create(**link)
+                change = 1
+            except IntegrityError:
+                change = 0
+        else:
+            deleted, _ = through.objects.filter(**link).delete()
+            change = -deleted
+
+        if change:
+            model.objects.filter(pk=obj.pk).update(like_count=F('like_count') + change)
+
+    like_count = model.objects.filter(pk=obj.pk).values_list('like_count', flat=True).get()
+    return liked, like_count
+
+
+def recount_like_counts(model, pks):
+    """Przelicza like_count od nowa - po zmianach przez menedżera likes (np. admin, testy)."""
+    through = model.likes.through
+    owner_field = _owner_field(model)
+    for pk in pks:
+        model.objects.filter(pk=pk).update(like_count=through.objects.filter(**{owner_field: pk}).count())
+
+
+def forget_user_likes(user):
+    """
+    Odejmuje polubienia usuwanego użytkownika od like_count. Kaskada usuwa wiersze
+    tabel pośrednich bez m2m_changed, więc licznik trzeba poprawić przed usunięciem.
+    """
+    for model in LIKEABLE_MODELS:
+        liked_pks = model.likes.through.objects.filter(user_id=user.pk).values(_owner_field(model))
+        model.objects.filter(pk__in=liked_pks, like_count__gte=1).update(like_count=F('like_count') - 1)
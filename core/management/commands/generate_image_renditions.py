@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core.images import process_image
+from core.models import GalleryImage, Post
+
+class Command(BaseCommand):
+    help = 'Tworzy kopie WebP (thumb/medium/full) dla zdjęć wgranych przed ich wprowadzeniem'
+
+    def handle(self, *args, **kwargs):
+        count = 0
+        for model in (Post, GalleryImage):
+            pending = model.objects.exclude(image='').exclude(image__isnull=True).filter(renditions={})
+            for pk in pending.values_list('pk', flat=True).iterator():
+                process_image(model._meta.label, pk)
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Przetworzono {count} zdjęć.'))
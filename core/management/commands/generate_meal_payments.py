@@ -1,7 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.meal_payments import ensure_meal_payment_for_period
-from core.models import Child
+from core.meal_payments import generate_meal_payments
 
 class Command(BaseCommand):
     help = 'Generuje płatności za wyżywienie za BIEŻĄCY miesiąc i odejmuje nieobecności z poprzedniego miesiąca'
@@ -14,21 +13,8 @@ class Command(BaseCommand):
             f"Obliczam należności za bieżący miesiąc: {first_day_of_current} (korekta o nieobecności z poprzedniego miesiąca)"
         )
 
-        children = Child.objects.filter(uses_meals=True)
-        count = 0
-        skipped = 0
-
-        for child in children:
-            _, created = ensure_meal_payment_for_period(
-                child=child,
-                meal_period=first_day_of_current,
-                include_previous_month_absences=True,
-            )
-
-            if created:
-                count += 1
-            else:
-                skipped += 1
+        # Wszystkie dzieci naraz - stała liczba zapytań niezależnie od liczby dzieci
+        count, skipped = generate_meal_payments(first_day_of_current, include_previous_month_absences=True)
 
         self.stdout.write(self.style.SUCCESS(
             f'Wygenerowano {count} płatności za posiłki. Pominięto {skipped} istniejących.'
@@ -1,30 +1,22 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import RecurringPayment, Payment
+from core.recurring_payments import process_recurring_payments
 
 class Command(BaseCommand):
-    help = 'Generuje płatności z aktywnych szablonów cyklicznych'
+    help = 'Generuje płatności z aktywnych szablonów cyklicznych (wszystkie zaległe okresy)'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Liczba procesów, między które dzielimy szablony (domyślnie 1)',
+        )
+
+    def handle(self, *args, **options):
         today = timezone.now().date()
-        
-        # Pobierz wszystkie aktywne szablony, których data nadeszła (lub minęła)
-        templates = RecurringPayment.objects.filter(is_active=True, next_payment_date__lte=today)
-        
-        count = 0
-        for template in templates:
-            # 1. Stwórz realne płatności dla wszystkich przypisanych dzieci
-            for child in template.children.all():
-                Payment.objects.create(
-                    child=child,
-                    amount=template.amount,
-                    description=template.description, # np. "Czesne"
-                    is_paid=False
-                    # payment_title wygeneruje się sam w modelu Payment
-                )
-                count += 1
-            
-            # 2. Zaktualizuj datę następnej płatności (np. na marzec)
-            template.update_next_date()
 
-        self.stdout.write(self.style.SUCCESS(f'Wygenerowano {count} płatności cyklicznych.'))
\ No newline at end of file
+        # Każdy szablon nadrabia wszystkie okresy do dziś; ponowne uruchomienie niczego nie dubluje
+        count = process_recurring_payments(today, workers=max(options['workers'], 1))
+
+        self.stdout.write(self.style.SUCCESS(f'Wygenerowano {count} płatności cyklicznych.'))
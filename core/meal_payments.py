@@ -1,7 +1,15 @@
 import datetime
+from collections import Counter
 from decimal import Decimal
 
-from core.models import Attendance, Child, FacilityClosure, Payment
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from core.broadcast import broadcast_notification_summary_changed
+from core.business_days import business_days_between, closed_dates_between, is_school_day
+from core.dashboard_cache import invalidate_dashboard_sections
+from core.models import Attendance, Child, Payment
+from core.notification_counters import count_new_payments
 
 
 POLISH_MONTH_NAMES = {
@@ -28,36 +36,14 @@ def _month_bounds(any_date):
     return first_day, last_day
 
 
-def _get_closed_dates(first_day, last_day):
-    return set(
-        FacilityClosure.objects.filter(
-            date__range=[first_day, last_day]
-        ).values_list('date', flat=True)
-    )
-
-
-def _count_business_days(first_day, last_day, closed_dates):
-    days = 0
-    current_date = first_day
-    while current_date <= last_day:
-        if current_date.isoweekday() <= 5 and current_date not in closed_dates:
-            days += 1
-        current_date += datetime.timedelta(days=1)
-    return days
-
-
-def _count_billable_absences(child, first_day, last_day, closed_dates):
+def _count_billable_absences(child, first_day, last_day):
     absence_dates = Attendance.objects.filter(
         child=child,
         date__range=[first_day, last_day],
         status='absent',
     ).values_list('date', flat=True)
 
-    return sum(
-        1
-        for absence_date in absence_dates
-        if absence_date.isoweekday() <= 5 and absence_date not in closed_dates
-    )
+    return sum(1 for absence_date in absence_dates if is_school_day(absence_date))
 
 
 def _active_period_start(child, month_first_day):
@@ -73,8 +59,7 @@ def _calculate_period_amount(child, meal_period, include_previous_month_absences
     if active_start_date > period_last_day:
         return None
 
-    current_month_closed = _get_closed_dates(period_first_day, period_last_day)
-    current_month_days = _count_business_days(active_start_date, period_last_day, current_month_closed)
+    current_month_days = business_days_between(active_start_date, period_last_day)
 
     previous_month_absences = 0
     if include_previous_month_absences:
@@ -83,17 +68,19 @@ def _calculate_period_amount(child, meal_period, include_previous_month_absences
         previous_active_start = _active_period_start(child, previous_month_first_day)
 
         if previous_active_start <= previous_month_last_day:
-            previous_month_closed = _get_closed_dates(previous_month_first_day, previous_month_last_day)
             previous_month_absences = _count_billable_absences(
                 child,
                 previous_active_start,
                 previous_month_last_day,
-                previous_month_closed,
             )
 
+    return _build_period_payment(child, period_first_day, current_month_days, previous_month_absences)
+
+
+def _build_period_payment(child, period_first_day, current_month_days, previous_month_absences):
     billable_days = max(current_month_days - previous_month_absences, 0)
     amount = (Decimal(billable_days) * child.meal_rate).quantize(Decimal('0.01'))
-    month_name = f"{POLISH_MONTH_NAMES[period_first_day.month]} {period_first_day.year}"
+    month_name = _month_name(period_first_day)
 
     if previous_month_absences:
         description = (
@@ -111,6 +98,10 @@ def _calculate_period_amount(child, meal_period, include_previous_month_absences
     }
 
 
+def _month_name(period_first_day):
+    return f"{POLISH_MONTH_NAMES[period_first_day.month]} {period_first_day.year}"
+
+
 def ensure_meal_payment_for_period(child: Child, meal_period, include_previous_month_absences=True):
     meal_period_first_day = meal_period.replace(day=1)
 
@@ -121,7 +112,7 @@ def ensure_meal_payment_for_period(child: Child, meal_period, include_previous_m
     if existing_payment:
         return existing_payment, False
 
-    month_name = f"{POLISH_MONTH_NAMES[meal_period_first_day.month]} {meal_period_first_day.year}"
+    month_name = _month_name(meal_period_first_day)
     legacy_payment = Payment.objects.filter(
         child=child,
         description__startswith=f"Wyżywienie: {month_name}",
@@ -148,4 +139,139 @@ def ensure_meal_payment_for_period(child: Child, meal_period, include_previous_m
         is_paid=False,
         meal_period=calculated['meal_period'],
     )
-    return payment, True
\ No newline at end of file
+    return payment, True
+
+
+# --- Rozliczenie miesiąca dla wszystkich dzieci naraz ---
+
+def _claim_legacy_payments(child_ids, meal_period_first_day):
+    """
+    Płatności sprzed pola meal_period rozpoznajemy po opisie (jak w ensure_meal_payment_for_period).
+    Zwraca id dzieci, które już mają płatność za ten miesiąc.
+    """
+    legacy_payments = Payment.objects.filter(
+        child_id__in=child_ids,
+        description__startswith=f"Wyżywienie: {_month_name(meal_period_first_day)}",
+    ).order_by('child_id', 'created_at').values_list('id', 'child_id', 'meal_period')
+
+    first_per_child = {}
+    for payment_id, child_id, meal_period in legacy_payments:
+        first_per_child.setdefault(child_id, (payment_id, meal_period))
+
+    unassigned_ids = [payment_id for payment_id, meal_period in first_per_child.values() if meal_period is None]
+    if unassigned_ids:
+        Payment.objects.filter(id__in=unassigned_ids).update(meal_period=meal_period_first_day)
+
+    return set(first_per_child)
+
+
+def _billable_absence_counts(child_ids, first_day, last_day, closed_dates):
+    """Nieobecności w dni robocze od początku naliczania każdego dziecka - jedno zapytanie z GROUP BY."""
+    absences = Attendance.objects.filter(
+        child_id__in=child_ids,
+        date__range=[first_day, last_day],
+        date__iso_week_day__lte=5,
+        status='absent',
+    ).filter(
+        Q(child__meal_start_date__isnull=True) | Q(date__gte=F('child__meal_start_date'))
+    ).exclude(date__in=closed_dates)
+
+    return dict(absences.order_by().values('child_id').annotate(total=Count('id')).values_list('child_id', 'total'))
+
+
+def generate_meal_payments(meal_period, include_previous_month_absences=True, children=None):
+    """
+    Nalicza wyżywienie za miesiąc wszystkim dzieciom (domyślnie: korzystającym z posiłków)
+    w stałej liczbie zapytań: dni zajęć daje kalendarz (core.business_days), nieobecności
+    pobieramy jednym zapytaniem dla całego miesiąca,
+    kwoty liczymy w pamięci, a płatności zapisujemy jednym bulk_create.
+    Zwraca (liczba utworzonych, liczba pominiętych).
+    """
+    period_first_day, period_last_day = _month_bounds(meal_period)
+    previous_month_last_day = period_first_day - datetime.timedelta(days=1)
+    previous_month_first_day = previous_month_last_day.replace(day=1)
+
+    if children is None:
+        children = Child.objects.filter(uses_meals=True)
+    children = list(children.only('id', 'first_name', 'last_name', 'meal_rate', 'meal_start_date'))
+    child_ids = [child.id for child in children]
+
+    already_billed = set(
+        Payment.objects.filter(child_id__in=child_ids, meal_period=period_first_day).values_list('child_id', flat=True)
+    )
+    already_billed |= _claim_legacy_payments(
+        [child_id for child_id in child_ids if child_id not in already_billed],
+        period_first_day,
+    )
+
+    to_bill = [
+        child for child in children
+        if child.id not in already_billed and _active_period_start(child, period_first_day) <= period_last_day
+    ]
+    if not to_bill:
+        return 0, len(children)
+
+    absence_counts = {}
+    if include_previous_month_absences:
+        absence_counts = _billable_absence_counts(
+            [child.id for child in to_bill],
+            previous_month_first_day,
+            previous_month_last_day,
+            closed_dates_between(previous_month_first_day, previous_month_last_day),
+        )
+
+    payments = []
+    for child in to_bill:
+        calculated = _build_period_payment(
+            child,
+            period_first_day,
+            business_days_between(_active_period_start(child, period_first_day), period_last_day),
+            absence_counts.get(child.id, 0),
+        )
+        if calculated['amount'] <= 0:
+            continue
+        payments.append(Payment(child=child, is_paid=False, **calculated))
+
+    if not payments:
+        return 0, len(children)
+
+    try:
+        with transaction.atomic():
+            # Numery tytułów rezerwujemy w tej samej transakcji - wycofanie zwraca je do puli
+            for payment, title in zip(payments, Payment.generate_unique_titles([payment.child for payment in payments])):
+                payment.payment_title = title
+            Payment.objects.bulk_create(payments)
+    except IntegrityError:
+        # Równoległe naliczanie zdążyło dodać część płatności - dokończ bezpiecznie dziecko po dziecku
+        created = 0
+        for payment in payments:
+            _, was_created = ensure_meal_payment_for_period(
+                payment.child,
+                period_first_day,
+                include_previous_month_absences=include_previous_month_absences,
+            )
+            created += int(was_created)
+        return created, len(children) - created
+
+    announce_new_payments([payment.child_id for payment in payments])
+
+    return len(payments), len(children) - len(payments)
+
+
+def announce_new_payments(child_ids):
+    """
+    bulk_create omija sygnały - liczniki, cache pulpitu i powiadomienia aktualizujemy sami.
+    child_ids: dziecko raz na każdą nową płatność (może się powtarzać).
+    """
+    # count_new_payments liczy każde dziecko raz - powtórzenia przekazujemy kolejnymi warstwami
+    remaining = Counter(child_ids)
+    while remaining:
+        layer = list(remaining)
+        count_new_payments(layer)
+        remaining -= Counter(layer)
+
+    invalidate_dashboard_sections('debts')
+    broadcast_notification_summary_changed(
+        user_ids=list(Child.parents.through.objects.filter(child_id__in=set(child_ids)).values_list('user_id', flat=True)),
+        include_directors=True,
+    )
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_attendance_aggregates(apps, schema_editor):
+    Attendance = apps.get_model('core', 'Attendance')
+    AttendanceDailyAggregate = apps.get_model('core', 'AttendanceDailyAggregate')
+
+    rows = (
+        Attendance.objects.filter(status='absent')
+        .values('date', 'child__group_id')
+        .annotate(absent_count=Count('id'))
+    )
+    AttendanceDailyAggregate.objects.bulk_create([
+        AttendanceDailyAggregate(
+            date=row['date'],
+            group_id=row['child__group_id'],
+            absent_count=row['absent_count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_remove_dailymenu_week_end_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('absent_count', models.PositiveIntegerField(default=0, verbose_name='Liczba nieobecności')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_aggregates', to='core.group', verbose_name='Grupa')),
+            ],
+            options={
+                'verbose_name': 'Podsumowanie obecności',
+                'verbose_name_plural': 'Podsumowania obecności',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancedailyaggregate',
+            constraint=models.UniqueConstraint(fields=('date', 'group'), name='unique_attendance_aggregate_per_day_group'),
+        ),
+        migrations.RunPython(backfill_attendance_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0030_attendancedailyaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schedule', models.PositiveIntegerField(default=0, verbose_name='Nowe zajęcia')),
+                ('schedule_changes', models.PositiveIntegerField(default=0, verbose_name='Zmiany w zajęciach')),
+                ('gallery', models.PositiveIntegerField(default=0, verbose_name='Nowe albumy')),
+                ('calendar', models.PositiveIntegerField(default=0, verbose_name='Nowe dni wolne')),
+                ('payments', models.PositiveIntegerField(default=0, verbose_name='Nowe płatności')),
+                ('child', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notification_counters', to='core.child', verbose_name='Dziecko')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_counters', to=settings.AUTH_USER_MODEL, verbose_name='Użytkownik')),
+            ],
+            options={
+                'verbose_name': 'Licznik powiadomień',
+                'verbose_name_plural': 'Liczniki powiadomień',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notificationcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('child__isnull', True)), fields=('user',), name='unique_notification_counter_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('child__isnull', False)), fields=('user', 'child'), name='unique_notification_counter_per_user_child'),
+        ),
+    ]
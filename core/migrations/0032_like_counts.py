@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_counts(apps, schema_editor):
+    for model_name in ('Post', 'PostComment', 'GalleryItem'):
+        model = apps.get_model('core', model_name)
+        through = model.likes.through
+        owner_field = f'{model._meta.model_name}_id'
+
+        likes = through.objects.filter(**{owner_field: OuterRef('pk')}).order_by().values(owner_field).annotate(
+            total=Count('id'),
+        ).values('total')
+        model.objects.update(like_count=Coalesce(Subquery(likes, output_field=models.IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryitem',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba polubień'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba polubień'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba polubień'),
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_like_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryimage',
+            name='image_ready',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Zdjęcie przetworzone'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_ready',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Zdjęcie przetworzone'),
+        ),
+    ]
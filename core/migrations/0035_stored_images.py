@@ -0,0 +1,67 @@
+from collections import Counter
+
+import core.image_store
+from django.db import migrations, models
+
+
+IMAGE_FIELDS = (
+    ('core', 'Post', 'image'),
+    ('core', 'GalleryImage', 'image'),
+    ('core', 'DailyMenu', 'image'),
+    ('users', 'User', 'avatar'),
+)
+
+
+def count_existing_references(apps, schema_editor):
+    # Istniejące pliki dostają liczniki od razu - inaczej pierwsze zwolnienie usunęłoby plik
+    references = Counter()
+    for app_label, model_name, field_name in IMAGE_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        names = model.objects.order_by().exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        references.update(names.values_list(field_name, flat=True))
+
+    StoredImage = apps.get_model('core', 'StoredImage')
+    StoredImage.objects.bulk_create(
+        [StoredImage(name=name, ref_count=count) for name, count in references.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_image_renditions'),
+        ('users', '0007_avatar_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Plik')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Liczba odwołań')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Plik zdjęcia',
+                'verbose_name_plural': 'Pliki zdjęć',
+            },
+        ),
+        migrations.AlterField(
+            model_name='dailymenu',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.image_store.get_image_storage, upload_to='menu/%Y/%m/', verbose_name='Zdjęcie jadłospisu'),
+        ),
+        migrations.AlterField(
+            model_name='galleryimage',
+            name='image',
+            field=models.ImageField(storage=core.image_store.get_image_storage, upload_to='gallery_albums/%Y/%m/', verbose_name='Zdjęcie'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.image_store.get_image_storage, upload_to='gallery/%Y/%m/', verbose_name='Zdjęcie'),
+        ),
+        migrations.RunPython(count_existing_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def seed_title_sequences(apps, schema_editor):
+    # Liczniki startują od najwyższego istniejącego numeru - nowe tytuły nie powtórzą starych
+    Payment = apps.get_model('core', 'Payment')
+    PaymentTitleSequence = apps.get_model('core', 'PaymentTitleSequence')
+
+    last_values = {}
+    for title in Payment.objects.order_by().exclude(payment_title='').values_list('payment_title', flat=True).iterator():
+        prefix, _, suffix = title.rpartition('/')
+        if prefix and suffix.isdigit():
+            last_values[prefix] = max(last_values.get(prefix, 0), int(suffix))
+
+    PaymentTitleSequence.objects.bulk_create(
+        [PaymentTitleSequence(prefix=prefix, last_value=last_value) for prefix, last_value in last_values.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_stored_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentTitleSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=100, unique=True, verbose_name='Prefiks tytułu')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Ostatni numer')),
+            ],
+            options={
+                'verbose_name': 'Numeracja tytułów płatności',
+                'verbose_name_plural': 'Numeracja tytułów płatności',
+            },
+        ),
+        migrations.RunPython(seed_title_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_payment_title_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='recurring_period',
+            field=models.DateField(blank=True, null=True, verbose_name='Okres płatności cyklicznej (data z szablonu)'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='recurring_template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_payments', to='core.recurringpayment', verbose_name='Szablon płatności cyklicznej'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring_template__isnull', False)), fields=('recurring_template', 'child', 'recurring_period'), name='unique_recurring_payment_per_child_period'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_recurring_payment_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Zadanie')),
+                ('owner', models.CharField(max_length=200, verbose_name='Właściciel')),
+                ('expires_at', models.DateTimeField(verbose_name='Ważna do')),
+            ],
+            options={
+                'verbose_name': 'Dzierżawa zadania',
+                'verbose_name_plural': 'Dzierżawy zadań',
+            },
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_name', models.CharField(max_length=100, verbose_name='Zadanie')),
+                ('scheduled_for', models.DateTimeField(verbose_name='Termin z harmonogramu')),
+                ('owner', models.CharField(max_length=200, verbose_name='Uruchomione przez')),
+                ('status', models.CharField(choices=[('running', 'W toku'), ('success', 'Zakończone'), ('error', 'Błąd')], default='running', max_length=10, verbose_name='Status')),
+                ('started_at', models.DateTimeField(verbose_name='Start')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Koniec')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Czas trwania (s)')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Utworzone wiersze')),
+                ('error', models.TextField(blank=True, verbose_name='Błąd')),
+            ],
+            options={
+                'verbose_name': 'Uruchomienie zadania',
+                'verbose_name_plural': 'Uruchomienia zadań',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job_name', 'scheduled_for'], name='job_run_name_scheduled_idx')],
+            },
+        ),
+    ]
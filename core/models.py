@@ -1,14 +1,14 @@
-from django.db import models
+from collections import Counter
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from users.models import User
 from django_cryptography.fields import encrypt # Szyfrowanie RODO
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
-from PIL import Image
 import os
-from io import BytesIO
-from django.core.files.base import ContentFile
+from .image_store import get_image_storage
+from .images import prepare_image_save, schedule_image_processing
 
 class Group(models.Model):
     GROUP_COLOR_CHOICES = [
@@ -119,6 +119,27 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.child} - {self.date} ({self.status})"
 
+
+class AttendanceDailyAggregate(models.Model):
+    """
+    Dzienne podsumowanie nieobecności w grupie (statystyki pulpitu dyrektora).
+    Aktualizowane sygnałami Attendance oraz przy zapisie FacilityClosure,
+    więc wykresy frekwencji nie muszą skanować surowych wpisów obecności.
+    """
+    date = models.DateField(verbose_name="Data")
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='attendance_aggregates', verbose_name="Grupa")
+    absent_count = models.PositiveIntegerField(default=0, verbose_name="Liczba nieobecności")
+
+    class Meta:
+        verbose_name = "Podsumowanie obecności"
+        verbose_name_plural = "Podsumowania obecności"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'group'], name='unique_attendance_aggregate_per_day_group'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} - {self.date}: {self.absent_count}"
+
 import datetime
 
 class Payment(models.Model):
@@ -139,6 +160,19 @@ class Payment(models.Model):
         blank=True,
         verbose_name="Okres rozliczeniowy wyżywienia (1. dzień miesiąca)"
     )
+    recurring_template = models.ForeignKey(
+        'RecurringPayment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='generated_payments',
+        verbose_name="Szablon płatności cyklicznej"
+    )
+    recurring_period = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Okres płatności cyklicznej (data z szablonu)"
+    )
 
     def save(self, *args, **kwargs):
         if not self.payment_title:
@@ -152,35 +186,44 @@ class Payment(models.Model):
             self.payment_date = None
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def title_prefix(child, day=None):
+        # Format tytułu: Imie/Nazwisko/MMRRRR/CCC
+        date_str = (day or datetime.date.today()).strftime("%m%Y")  # Format MMRRRR (np. 122025)
+        return f"{child.first_name}/{child.last_name}/{date_str}"
+
     def generate_unique_title(self):
-        # Format: Imie/Nazwisko/MMRRRR/CCC
-        first_name = self.child.first_name
-        last_name = self.child.last_name
-
-        today = datetime.date.today()
-        date_str = today.strftime("%m%Y")  # Format MMRRRR (np. 122025)
-        prefix = f"{first_name}/{last_name}/{date_str}/"
-
-        # Zamiast count()+1 (które po usunięciu rekordów może dać duplikat),
-        # znajdujemy najwyższy istniejący numer sekwencji dla danego prefiksu.
-        existing_titles = Payment.objects.filter(
-            payment_title__startswith=prefix
-        ).values_list('payment_title', flat=True)
-
-        max_code = 0
-        for title in existing_titles:
-            suffix = title.rsplit('/', 1)[-1]
-            if suffix.isdigit():
-                max_code = max(max_code, int(suffix))
-
-        next_code = max_code + 1
-        candidate = f"{prefix}{next_code:03d}"
-
-        while Payment.objects.filter(payment_title=candidate).exists():
-            next_code += 1
-            candidate = f"{prefix}{next_code:03d}"
-
-        return candidate
+        return self.generate_unique_titles([self.child])[0]
+
+    @classmethod
+    def generate_unique_titles(cls, children):
+        """
+        Tytuły dla nowych płatności (także całej paczki do bulk_create). Numery rezerwujemy
+        w PaymentTitleSequence, więc równoległe naliczanie nie dostanie tego samego numeru.
+        Kolejne płatności tego samego dziecka w paczce dostają kolejne numery.
+        """
+        prefixes = [cls.title_prefix(child) for child in children]
+        titles = [None] * len(prefixes)
+        pending = list(range(len(prefixes)))
+
+        while pending:
+            next_codes = PaymentTitleSequence.reserve(Counter(prefixes[index] for index in pending))
+            candidates = {}
+            for index in pending:
+                prefix = prefixes[index]
+                candidates[index] = f"{prefix}/{next_codes[prefix]:03d}"
+                next_codes[prefix] += 1
+
+            # Tytuł wpisany ręcznie (admin, import) mógł zająć zarezerwowany numer - bierzemy kolejny
+            taken = set(
+                cls.objects.filter(payment_title__in=candidates.values()).values_list('payment_title', flat=True)
+            )
+            for index, candidate in candidates.items():
+                if candidate not in taken:
+                    titles[index] = candidate
+            pending = [index for index in pending if titles[index] is None]
+
+        return titles
     
     class Meta:
         verbose_name = "Płatność"
@@ -192,11 +235,67 @@ class Payment(models.Model):
                 condition=models.Q(meal_period__isnull=False),
                 name='unique_meal_payment_per_child_period',
             ),
+            models.UniqueConstraint(
+                fields=['recurring_template', 'child', 'recurring_period'],
+                condition=models.Q(recurring_template__isnull=False),
+                name='unique_recurring_payment_per_child_period',
+            ),
         ]
 
     def __str__(self):
         return f"{self.child} - {self.description} ({self.amount} zł)"
 
+
+class PaymentTitleSequence(models.Model):
+    """
+    Ostatni wydany numer tytułu płatności dla prefiksu Imie/Nazwisko/MMRRRR.
+    Numery nie wracają po usunięciu płatności, więc tytuł nigdy się nie powtórzy.
+    """
+    prefix = models.CharField(max_length=100, unique=True, verbose_name="Prefiks tytułu")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Ostatni numer")
+
+    class Meta:
+        verbose_name = "Numeracja tytułów płatności"
+        verbose_name_plural = "Numeracja tytułów płatności"
+
+    def __str__(self):
+        return f"{self.prefix}/{self.last_value:03d}"
+
+    @classmethod
+    def reserve(cls, counts):
+        """
+        Rezerwuje bloki numerów: {prefiks: ile} -> {prefiks: pierwszy numer bloku}.
+        Wiersze liczników blokujemy (select_for_update) na czas transakcji - stała liczba
+        zapytań niezależnie od liczby prefiksów.
+        """
+        counts = {prefix: count for prefix, count in counts.items() if count > 0}
+        if not counts:
+            return {}
+
+        with transaction.atomic():
+            sequences = {
+                sequence.prefix: sequence
+                for sequence in cls.objects.select_for_update().filter(prefix__in=counts)
+            }
+            missing = [prefix for prefix in counts if prefix not in sequences]
+            if missing:
+                # ignore_conflicts - ten sam prefiks mógł właśnie założyć równoległy proces
+                cls.objects.bulk_create([cls(prefix=prefix) for prefix in missing], ignore_conflicts=True)
+                sequences.update(
+                    (sequence.prefix, sequence)
+                    for sequence in cls.objects.select_for_update().filter(prefix__in=missing)
+                )
+
+            first_codes = {}
+            for prefix, count in counts.items():
+                sequence = sequences[prefix]
+                first_codes[prefix] = sequence.last_value + 1
+                sequence.last_value += count
+            cls.objects.bulk_update(sequences.values(), ['last_value'])
+
+        return first_codes
+
+
 class Post(models.Model):
     # Tytuł wpisu, np. "Wizyta Świętego Mikołaja"
     title = models.CharField(max_length=200, verbose_name="Tytuł")
@@ -207,41 +306,29 @@ class Post(models.Model):
     # ZDJĘCIE - to jest kluczowe dla "Tablicy"
     image = models.ImageField(
         upload_to='gallery/%Y/%m/', # Zapisze np. w media/gallery/2023/11/
+        storage=get_image_storage, # Nazwa pliku ze skrótu treści - duplikaty trzymamy raz (core/image_store.py)
         blank=True, 
         null=True,
         verbose_name="Zdjęcie"
     )
 
+    # False, dopóki kopie WebP czekają w kolejce (core/images.py)
+    image_ready = models.BooleanField(default=True, editable=False, verbose_name="Zdjęcie przetworzone")
+    # {'thumb' | 'medium' | 'full': nazwa pliku WebP} - uzupełniane przez core/images.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Kopie zdjęcia")
+
     def save(self, *args, **kwargs):
+        image_uploaded = prepare_image_save(self)
         super().save(*args, **kwargs)
-        
-        if self.image:
-            self.image.open('rb')
-            img = Image.open(self.image)
-            if img.height > 1200 or img.width > 1200:
-                output_size = (1200, 1200)
-                img.thumbnail(output_size)
-
-                buffer = BytesIO()
-                image_format = (img.format or 'JPEG').upper()
-
-                if image_format in {'JPEG', 'JPG'} and img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-
-                save_kwargs = {'optimize': True}
-                if image_format in {'JPEG', 'JPG'}:
-                    save_kwargs['quality'] = 80
-
-                img.save(buffer, format=image_format, **save_kwargs)
-                buffer.seek(0)
-
-                self.image.save(self.image.name, ContentFile(buffer.read()), save=False)
-                super().save(update_fields=['image'])
-            self.image.close()
+
+        if image_uploaded:
+            schedule_image_processing(self)
     
     # Data dodania - automatycznie ustawi się "teraz"
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data publikacji")
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
+    # Licznik polubień utrzymywany przez core/likes.py - odczyt bez liczenia tabeli pośredniej
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Liczba polubień")
     
     # Opcjonalnie: Widoczność dla konkretnej grupy.
     # Jeśli puste (null) -> widzą wszyscy (ogłoszenie ogólnoprzedszkolne).
@@ -279,6 +366,7 @@ class FacilityClosure(models.Model):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         Attendance.objects.filter(date=self.date).delete()
+        AttendanceDailyAggregate.objects.filter(date=self.date).delete()
 
     def __str__(self):
         return f"{self.date} - {self.reason}"
@@ -313,7 +401,7 @@ class SpecialActivity(models.Model):
 
 class DailyMenu(models.Model):
     week_start_date = models.DateField(unique=True, verbose_name="Data rozpoczęcia tygodnia")
-    image = models.ImageField(upload_to='menu/%Y/%m/', verbose_name="Zdjęcie jadłospisu", blank=True, null=True)
+    image = models.ImageField(upload_to='menu/%Y/%m/', storage=get_image_storage, verbose_name="Zdjęcie jadłospisu", blank=True, null=True)
 
     class Meta:
         verbose_name = "Jadłospis (zdjęcie)"
@@ -331,6 +419,7 @@ class PostComment(models.Model):
     post = models.ForeignKey('Post', on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     likes = models.ManyToManyField(User, related_name='liked_comments', blank=True)
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Liczba polubień")
     content = models.TextField(verbose_name="Treść komentarza")
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -372,21 +461,34 @@ class RecurringPayment(models.Model):
     def __str__(self):
         return f"{self.description} ({self.get_frequency_display()})"
 
-    def update_next_date(self):
-        """Przesuwa datę następnej płatności w zależności od częstotliwości"""
+    def period_after(self, period):
+        """Data kolejnej płatności po podanej, w zależności od częstotliwości"""
         if self.frequency == 'weekly':
-            self.next_payment_date += relativedelta(weeks=1)
+            return period + relativedelta(weeks=1)
         elif self.frequency == 'monthly':
-            self.next_payment_date += relativedelta(months=1)
+            return period + relativedelta(months=1)
         elif self.frequency == 'yearly':
-            self.next_payment_date += relativedelta(years=1)
-        self.save()
+            return period + relativedelta(years=1)
+        return period
+
+    def due_periods(self, today):
+        """Wszystkie zaległe terminy od next_payment_date do dziś (włącznie)"""
+        periods = []
+        period = self.next_payment_date
+        while period <= today:
+            periods.append(period)
+            next_period = self.period_after(period)
+            if next_period == period:
+                break
+            period = next_period
+        return periods
 
 class GalleryItem(models.Model):
     title = models.CharField(max_length=200, verbose_name="Tytuł albumu")
     description = models.TextField(blank=True, verbose_name="Opis wydarzenia")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data dodania")
     likes = models.ManyToManyField(User, related_name='liked_galleries', blank=True)
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Liczba polubień")
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -417,38 +519,121 @@ class GalleryItem(models.Model):
 
 class GalleryImage(models.Model):
     gallery_item = models.ForeignKey(GalleryItem, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='gallery_albums/%Y/%m/', verbose_name="Zdjęcie")
+    image = models.ImageField(upload_to='gallery_albums/%Y/%m/', storage=get_image_storage, verbose_name="Zdjęcie")
     caption = models.CharField(max_length=200, blank=True, verbose_name="Podpis (opcjonalnie)")
+    image_ready = models.BooleanField(default=True, editable=False, verbose_name="Zdjęcie przetworzone")
+    # {'thumb' | 'medium' | 'full': nazwa pliku WebP} - uzupełniane przez core/images.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Kopie zdjęcia")
 
     def __str__(self):
         return f"Zdjęcie do: {self.gallery_item.title}"
 
     # --- AUTOMATYCZNA KOMPRESJA ---
+    # Zdjęcie jest zmniejszane w żądaniu przed jedynym zapisem (optimize_upload),
+    # a pula wątków w tle dorabia tylko kopie WebP (core/images.py)
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs) # Najpierw zapisz oryginał
+        image_uploaded = prepare_image_save(self)
+        super().save(*args, **kwargs)
 
-        if self.image:
-            self.image.open('rb')
-            img = Image.open(self.image)
-            
-            # Jeśli zdjęcie jest bardzo duże (szerokość lub wysokość > 1200px)
-            if img.height > 1200 or img.width > 1200:
-                output_size = (1200, 1200)
-                img.thumbnail(output_size) # Zmniejsz zachowując proporcje
+        if image_uploaded:
+            schedule_image_processing(self)
 
-                buffer = BytesIO()
-                image_format = (img.format or 'JPEG').upper()
 
-                if image_format in {'JPEG', 'JPG'} and img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
+class NotificationCounter(models.Model):
+    """
+    Zmaterializowane liczniki powiadomień (kropki w menu).
+    Wiersz bez dziecka trzyma wszystkie sekcje użytkownika, wiersz z dzieckiem - tylko
+    płatności widoku tego dziecka. Liczniki zmieniają sygnały i MarkNotificationSeenView
+    (patrz core/notification_counters.py), więc podsumowanie to odczyt jednego wiersza.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_counters', verbose_name="Użytkownik")
+    child = models.ForeignKey(Child, on_delete=models.CASCADE, null=True, blank=True, related_name='notification_counters', verbose_name="Dziecko")
+    schedule = models.PositiveIntegerField(default=0, verbose_name="Nowe zajęcia")
+    schedule_changes = models.PositiveIntegerField(default=0, verbose_name="Zmiany w zajęciach")
+    gallery = models.PositiveIntegerField(default=0, verbose_name="Nowe albumy")
+    calendar = models.PositiveIntegerField(default=0, verbose_name="Nowe dni wolne")
+    payments = models.PositiveIntegerField(default=0, verbose_name="Nowe płatności")
+
+    class Meta:
+        verbose_name = "Licznik powiadomień"
+        verbose_name_plural = "Liczniki powiadomień"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(child__isnull=True),
+                name='unique_notification_counter_per_user',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'child'],
+                condition=models.Q(child__isnull=False),
+                name='unique_notification_counter_per_user_child',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.child or 'wszystkie'}"
+
+
+class StoredImage(models.Model):
+    """
+    Licznik odwołań do pliku zdjęcia (core/image_store.py).
+    Zdjęcia zapisujemy pod nazwą ze skrótu SHA-256, więc jeden plik może wskazywać kilka
+    postów, albumów, jadłospisów i awatarów - usuwamy go dopiero przy ostatnim odwołaniu.
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name="Plik")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Liczba odwołań")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Plik zdjęcia"
+        verbose_name_plural = "Pliki zdjęć"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class JobLease(models.Model):
+    """
+    Dzierżawa zadania harmonogramu (core/scheduler.py) - przy kilku replikach
+    zadanie uruchamia tylko ta, która ma ważną dzierżawę.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Zadanie")
+    owner = models.CharField(max_length=200, verbose_name="Właściciel")
+    expires_at = models.DateTimeField(verbose_name="Ważna do")
+
+    class Meta:
+        verbose_name = "Dzierżawa zadania"
+        verbose_name_plural = "Dzierżawy zadań"
 
-                save_kwargs = {'optimize': True}
-                if image_format in {'JPEG', 'JPG'}:
-                    save_kwargs['quality'] = 80
+    def __str__(self):
+        return f"{self.name} ({self.owner})"
+
+
+class JobRun(models.Model):
+    """Historia uruchomień zadań harmonogramu: czas trwania i liczba utworzonych wierszy."""
+    STATUS_CHOICES = [
+        ('running', 'W toku'),
+        ('success', 'Zakończone'),
+        ('error', 'Błąd'),
+    ]
 
-                img.save(buffer, format=image_format, **save_kwargs)
-                buffer.seek(0)
+    job_name = models.CharField(max_length=100, verbose_name="Zadanie")
+    scheduled_for = models.DateTimeField(verbose_name="Termin z harmonogramu")
+    owner = models.CharField(max_length=200, verbose_name="Uruchomione przez")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running', verbose_name="Status")
+    started_at = models.DateTimeField(verbose_name="Start")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Koniec")
+    duration = models.FloatField(null=True, blank=True, verbose_name="Czas trwania (s)")
+    rows = models.PositiveIntegerField(default=0, verbose_name="Utworzone wiersze")
+    error = models.TextField(blank=True, verbose_name="Błąd")
 
-                self.image.save(self.image.name, ContentFile(buffer.read()), save=False)
-                super().save(update_fields=['image'])
-            self.image.close()
\ No newline at end of file
+    class Meta:
+        verbose_name = "Uruchomienie zadania"
+        verbose_name_plural = "Uruchomienia zadań"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job_name', 'scheduled_for'], name='job_run_name_scheduled_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_name} {self.started_at:%Y-%m-%d %H:%M} ({self.get_status_display()})"
@@ -0,0 +1,278 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery
+
+from users.models import User
+
+from .audience import filter_group_activities, filter_targeted_content
+from .models import Child, FacilityClosure, GalleryItem, NotificationCounter, Payment, SpecialActivity
+
+
+NOTIFICATION_SECTIONS = ('schedule', 'gallery', 'calendar', 'payments')
+
+PAYMENT_SEEN_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Dawny licznik zmian w planie trzymany w cache - przenoszony do NotificationCounter przy pierwszym odczycie
+LEGACY_SCHEDULE_EXTRA_CACHE_KEY = 'notification_schedule_extra_{user_id}'
+
+SEEN_FIELD_BY_SECTION = {
+    'schedule': 'last_seen_schedule_activity_id',
+    'gallery': 'last_seen_gallery_item_id',
+    'calendar': 'last_seen_calendar_closure_id',
+}
+
+
+# --- Widoczność (to samo, co liczyło dotąd NotificationSummaryView) ---
+
+def schedule_queryset_for_user(user):
+    return filter_group_activities(SpecialActivity.objects.all(), user)
+
+
+def gallery_queryset_for_user(user):
+    return filter_targeted_content(GalleryItem.objects.all(), user)
+
+
+def payments_queryset_for_user(user, child=None):
+    if user.is_director:
+        queryset = Payment.objects.all()
+    else:
+        queryset = Payment.objects.filter(child__parents=user)
+
+    if child is not None:
+        queryset = queryset.filter(child=child)
+
+    return queryset
+
+
+def payments_seen_cache_key(user_id, child_id):
+    return f'notification_payments_seen_user_{int(user_id)}_child_{int(child_id)}'
+
+
+def get_payments_seen_cursor(user, child=None):
+    if child is None:
+        return int(user.last_seen_payment_id or 0)
+
+    cache_key = payments_seen_cache_key(user.id, child.id)
+    cached_value = cache.get(cache_key)
+
+    if cached_value is None:
+        fallback_value = int(user.last_seen_payment_id or 0)
+        cache.set(cache_key, fallback_value, timeout=PAYMENT_SEEN_CACHE_TIMEOUT)
+        return fallback_value
+
+    try:
+        return int(cached_value)
+    except (TypeError, ValueError):
+        fallback_value = int(user.last_seen_payment_id or 0)
+        cache.set(cache_key, fallback_value, timeout=PAYMENT_SEEN_CACHE_TIMEOUT)
+        return fallback_value
+
+
+def set_payments_seen_cursor(user, latest_id, child=None):
+    latest_id = int(latest_id or 0)
+
+    if child is None:
+        # Keep the global cursor monotonic so fallback queries stay stable.
+        current_global = int(user.last_seen_payment_id or 0)
+        next_global = max(current_global, latest_id)
+        if next_global != current_global:
+            user.last_seen_payment_id = next_global
+            user.save(update_fields=['last_seen_payment_id'])
+        return
+
+    cache.set(payments_seen_cache_key(user.id, child.id), latest_id, timeout=PAYMENT_SEEN_CACHE_TIMEOUT)
+
+    # Persist fallback cursor across sessions/logins when child-scoped cache is missing.
+    current_global = int(user.last_seen_payment_id or 0)
+    if latest_id > current_global:
+        user.last_seen_payment_id = latest_id
+        user.save(update_fields=['last_seen_payment_id'])
+
+
+def compute_section_counts(user, child=None, sections=NOTIFICATION_SECTIONS):
+    """Liczy sekcje zapytaniami COUNT - tylko przy zakładaniu i przeliczaniu liczników."""
+    counts = {}
+    if 'schedule' in sections:
+        counts['schedule'] = schedule_queryset_for_user(user).filter(id__gt=user.last_seen_schedule_activity_id).count()
+    if 'gallery' in sections:
+        counts['gallery'] = gallery_queryset_for_user(user).filter(id__gt=user.last_seen_gallery_item_id).count()
+    if 'calendar' in sections:
+        counts['calendar'] = FacilityClosure.objects.filter(id__gt=user.last_seen_calendar_closure_id).count()
+    if 'payments' in sections:
+        counts['payments'] = payments_queryset_for_user(user, child=child).filter(
+            id__gt=get_payments_seen_cursor(user, child=child),
+            is_paid=False,
+        ).count()
+    return counts
+
+
+# --- Odczyt ---
+
+def _create_counter(user, child=None):
+    if child is None:
+        counts = compute_section_counts(user)
+        counts['schedule_changes'] = int(cache.get(LEGACY_SCHEDULE_EXTRA_CACHE_KEY.format(user_id=user.id), 0) or 0)
+    else:
+        counts = compute_section_counts(user, child=child, sections=('payments',))
+
+    try:
+        with transaction.atomic():
+            counter = NotificationCounter.objects.create(user=user, child=child, **counts)
+    except IntegrityError:
+        # Równoległe żądanie założyło licznik pierwsze
+        return NotificationCounter.objects.get(user=user, child=child)
+
+    if child is None:
+        cache.delete(LEGACY_SCHEDULE_EXTRA_CACHE_KEY.format(user_id=user.id))
+    return counter
+
+
+def get_notification_counts(user, child=None):
+    """
+    Liczniki powiadomień użytkownika (opcjonalnie z płatnościami jednego dziecka).
+    Brakujące wiersze są zakładane leniwie na podstawie zapytań COUNT.
+    """
+    scope = Q(child__isnull=True)
+    if child is not None:
+        scope |= Q(child=child)
+
+    counters = {counter.child_id: counter for counter in NotificationCounter.objects.filter(scope, user=user)}
+    user_counter = counters.get(None) or _create_counter(user)
+    payments_counter = user_counter
+    if child is not None:
+        payments_counter = counters.get(child.id) or _create_counter(user, child=child)
+
+    return {
+        'schedule': user_counter.schedule + user_counter.schedule_changes,
+        'gallery': user_counter.gallery,
+        'calendar': user_counter.calendar,
+        'payments': payments_counter.payments,
+    }
+
+
+# --- Zmiany liczników ---
+
+def _counter_rows(users=None, child_id=None):
+    """Wiersze użytkowników; z child_id także wiersze płatności tego dziecka."""
+    rows = NotificationCounter.objects.all()
+    if users is not None:
+        rows = rows.filter(user__in=users)
+    if child_id is None:
+        return rows.filter(child__isnull=True)
+    return rows.filter(Q(child__isnull=True) | Q(child_id=child_id))
+
+
+def adjust_counters(section, delta, users=None, child_id=None, seen_object_id=None):
+    """
+    Przesuwa licznik sekcji o delta w istniejących wierszach (brakujące policzą się przy odczycie).
+    seen_object_id ogranicza zmianę do użytkowników, którzy nie oznaczyli jeszcze obiektu jako widzianego.
+    """
+    if seen_object_id is not None:
+        users = (users if users is not None else User.objects.all()).filter(
+            **{f'{SEEN_FIELD_BY_SECTION[section]}__lt': seen_object_id}
+        )
+
+    rows = _counter_rows(users, child_id=child_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{section}__gte': -delta})
+    rows.update(**{section: F(section) + delta})
+
+
+def count_new_payments(child_ids):
+    """
+    Odpowiednik sygnału count_payment dla płatności z bulk_create: +1 za każdą nową
+    nieopłaconą płatność u dyrektorów i rodziców dziecka, w trzech zapytaniach niezależnie od liczby dzieci.
+    """
+    child_ids = list(child_ids)
+    if not child_ids:
+        return
+
+    parent_links = Child.parents.through.objects.filter(user_id=OuterRef('user_id'))
+
+    # Wiersze wybranego dziecka - tylko u osób, które widzą jego płatności
+    NotificationCounter.objects.filter(child_id__in=child_ids).filter(
+        Q(user__is_director=True) | Exists(parent_links.filter(child_id=OuterRef('child_id')))
+    ).update(payments=F('payments') + 1)
+
+    global_rows = NotificationCounter.objects.filter(child__isnull=True)
+    global_rows.filter(user__is_director=True).update(payments=F('payments') + len(child_ids))
+
+    # Rodzic dostaje tyle, ile jego dzieci dostało płatności
+    children_billed = parent_links.filter(child_id__in=child_ids).order_by().values('user_id').annotate(
+        total=Count('id'),
+    ).values('total')
+    global_rows.filter(user__is_director=False).filter(
+        Exists(parent_links.filter(child_id__in=child_ids))
+    ).update(payments=F('payments') + Subquery(children_billed, output_field=IntegerField()))
+
+
+def _store_recount(counter, sections, **extra):
+    """
+    Przelicza i zapisuje sekcje wiersza pod jego blokadą. Równoległy przyrost (adjust_counters)
+    czeka na blokadę i dolicza się do nowej wartości zamiast zostać nadpisany, a przyrost
+    zapisany przed nią jest już widoczny w COUNT.
+    """
+    with transaction.atomic():
+        if not list(NotificationCounter.objects.select_for_update().filter(pk=counter.pk).values_list('pk', flat=True)):
+            return
+        counts = compute_section_counts(counter.user, child=counter.child, sections=sections)
+        NotificationCounter.objects.filter(pk=counter.pk).update(**counts, **extra)
+
+
+def recount_counters(users, sections=NOTIFICATION_SECTIONS, **extra):
+    """Przelicza sekcje od nowa dla istniejących wierszy - przy zmianach, których nie da się opisać deltą."""
+    for counter in NotificationCounter.objects.filter(user__in=users).select_related('user', 'child'):
+        counter_sections = sections if counter.child_id is None else [s for s in sections if s == 'payments']
+        if not counter_sections:
+            continue
+        _store_recount(counter, counter_sections, **(extra if counter.child_id is None else {}))
+
+
+def record_schedule_changes(user_ids):
+    """Edycja lub usunięcie zajęć - dodatkowa kropka w planie dla wskazanych użytkowników."""
+    _counter_rows(User.objects.filter(id__in=set(user_ids))).update(schedule_changes=F('schedule_changes') + 1)
+
+
+def reset_counter(user, section, child=None):
+    """
+    Po MarkNotificationSeenView przelicza sekcję od zapisanego kursora "widziane" zamiast
+    ją zerować - obiekt dodany w trakcie oznaczania zostaje w liczniku.
+    """
+    users = User.objects.filter(pk=user.pk)
+    if section == 'payments':
+        # Kursory płatności dziecka i globalny zależą od siebie, więc przeliczamy oba wiersze
+        recount_counters(users, sections=('payments',))
+        return
+
+    # Zmian w planie nie da się przeliczyć z kursora - zerujemy je pod tą samą blokadą
+    extra = {'schedule_changes': 0} if section == 'schedule' else {}
+    recount_counters(users, sections=(section,), **extra)
+
+
+# --- Odbiorcy ---
+
+def _staff_q():
+    return Q(is_director=True) | Q(is_teacher=True)
+
+
+def schedule_audience(group_ids):
+    return User.objects.filter(_staff_q() | Q(child__group_id__in=list(group_ids))).distinct()
+
+
+def gallery_audience(target_group_id):
+    if target_group_id is None:
+        return User.objects.all()
+    return User.objects.filter(_staff_q() | Q(child__group_id=target_group_id)).distinct()
+
+
+def payment_audience(*child_ids):
+    return User.objects.filter(Q(is_director=True) | Q(child__id__in=child_ids)).distinct()
+
+
+def staff_users():
+    return User.objects.filter(_staff_q())
+
+
+def parents_in_groups(group_ids):
+    """Rodzice (bez personelu, który widzi wszystkie zajęcia) z dziećmi w podanych grupach."""
+    return User.objects.filter(child__group_id__in=list(group_ids)).exclude(_staff_q()).distinct()
@@ -0,0 +1,108 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Stronicowanie kursorem po (created_at, id) - koszt strony nie zależy od rozmiaru tabeli.
+
+    Parametry zapytania:
+    - limit: liczba elementów na stronę,
+    - before: kursor - elementy starsze niż wskazany,
+    - after: kursor - elementy nowsze niż wskazany.
+
+    Stronicowanie jest włączane tylko, gdy podano któryś z parametrów,
+    więc dotychczasowi klienci dalej dostają pełną listę
+    (chyba że podklasa ustawi always_paginate dla nowego endpointu).
+    """
+    page_size = 20
+    max_page_size = 100
+    limit_query_param = 'limit'
+    before_query_param = 'before'
+    after_query_param = 'after'
+    # Kolejność elementów w odpowiedzi: True - najnowsze pierwsze (tablica), False - jak w czacie
+    newest_first = True
+    always_paginate = False
+
+    def is_requested(self, request):
+        if self.always_paginate:
+            return True
+        params = request.query_params
+        return any(
+            param in params
+            for param in (self.limit_query_param, self.before_query_param, self.after_query_param)
+        )
+
+    def _get_limit(self, request):
+        raw_limit = request.query_params.get(self.limit_query_param)
+        if raw_limit in (None, ''):
+            return self.page_size
+        try:
+            limit = int(raw_limit)
+        except (TypeError, ValueError):
+            raise ValidationError({self.limit_query_param: 'Nieprawidłowy limit.'})
+        return max(1, min(limit, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(instance):
+        raw = f"{instance.created_at.isoformat()}|{instance.pk}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, param_name, value):
+        try:
+            raw = base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8')
+            created_at_raw, pk_raw = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at_raw), int(pk_raw)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValidationError({param_name: 'Nieprawidłowy kursor.'})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        limit = self._get_limit(request)
+        before = request.query_params.get(self.before_query_param)
+        after = request.query_params.get(self.after_query_param)
+        self.after_cursor = after or None
+
+        if after:
+            created_at, pk = self._decode_cursor(self.after_query_param, after)
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            items = list(queryset.order_by('created_at', 'pk')[:limit + 1])
+            self.has_more_after = len(items) > limit
+            items = items[:limit]
+            # Element wskazany kursorem jest starszy, więc wcześniejsze wpisy istnieją
+            self.has_more_before = True
+            oldest, newest = (items[0], items[-1]) if items else (None, None)
+            ordered_items = list(reversed(items)) if self.newest_first else items
+        else:
+            if before:
+                created_at, pk = self._decode_cursor(self.before_query_param, before)
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            items = list(queryset.order_by('-created_at', '-pk')[:limit + 1])
+            self.has_more_before = len(items) > limit
+            items = items[:limit]
+            self.has_more_after = bool(before)
+            newest, oldest = (items[0], items[-1]) if items else (None, None)
+            ordered_items = items if self.newest_first else list(reversed(items))
+
+        self.before_cursor = self.encode_cursor(oldest) if oldest is not None and self.has_more_before else None
+        if newest is not None:
+            self.after_cursor = self.encode_cursor(newest)
+
+        return ordered_items
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'before_cursor': self.before_cursor,
+            'after_cursor': self.after_cursor,
+            'has_more_before': self.has_more_before,
+            'has_more_after': self.has_more_after,
+        })
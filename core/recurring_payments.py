@@ -0,0 +1,102 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import transaction
+from django.db.models.functions import Mod
+
+from core.meal_payments import announce_new_payments
+from core.models import Payment, RecurringPayment
+
+
+logger = logging.getLogger(__name__)
+
+
+def _due_templates(today, shard=0, shards=1):
+    templates = RecurringPayment.objects.filter(is_active=True, next_payment_date__lte=today)
+    if shards > 1:
+        templates = templates.annotate(shard=Mod('id', shards)).filter(shard=shard)
+    return templates.order_by('id')
+
+
+def process_template(template_id, today):
+    """
+    Nalicza wszystkie zaległe okresy jednego szablonu w jednej transakcji: jeden bulk_create
+    dla wszystkich dzieci i okresów, potem przesunięcie next_payment_date za ostatni okres.
+    Płatności już istniejące dla (szablon, dziecko, okres) pomijamy, więc ponowne
+    uruchomienie po awarii niczego nie dubluje. Zwraca liczbę utworzonych płatności.
+    """
+    with transaction.atomic():
+        # Blokada szablonu - równoległy proces poczeka i zobaczy już przesuniętą datę
+        template = RecurringPayment.objects.select_for_update().filter(
+            pk=template_id,
+            is_active=True,
+            next_payment_date__lte=today,
+        ).first()
+        if template is None:
+            return 0
+
+        periods = template.due_periods(today)
+        children = list(template.children.all())
+        existing = set(
+            Payment.objects.filter(
+                recurring_template=template,
+                recurring_period__in=periods,
+            ).values_list('child_id', 'recurring_period')
+        )
+
+        payments = [
+            Payment(
+                child=child,
+                amount=template.amount,
+                description=template.description,
+                is_paid=False,
+                recurring_template=template,
+                recurring_period=period,
+            )
+            for period in periods
+            for child in children
+            if (child.id, period) not in existing
+        ]
+        for payment, title in zip(payments, Payment.generate_unique_titles([payment.child for payment in payments])):
+            payment.payment_title = title
+        Payment.objects.bulk_create(payments)
+
+        template.next_payment_date = template.period_after(periods[-1])
+        template.save(update_fields=['next_payment_date'])
+
+    if payments:
+        announce_new_payments([payment.child_id for payment in payments])
+    return len(payments)
+
+
+def process_due_templates(today, shard=0, shards=1):
+    """Przetwarza zaległe szablony z danej części (id % shards == shard). Zwraca liczbę płatności."""
+    created = 0
+    for template_id in _due_templates(today, shard, shards).values_list('id', flat=True):
+        try:
+            created += process_template(template_id, today)
+        except Exception:
+            # Jeden błędny szablon nie blokuje pozostałych - wróci przy kolejnym uruchomieniu
+            logger.exception('Nie udało się naliczyć płatności z szablonu %s', template_id)
+    return created
+
+
+def process_recurring_payments(today, workers=1):
+    """
+    Nalicza płatności ze wszystkich zaległych szablonów. Przy workers > 1 szablony dzielimy
+    na części (po id) i przetwarzamy w osobnych procesach - każdy szablon ma własną
+    transakcję i blokadę, więc części się nie nakładają.
+    """
+    if workers <= 1:
+        return process_due_templates(today)
+
+    # spawn - świeży proces z własnym połączeniem do bazy zamiast kopii połączenia rodzica
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        futures = [pool.submit(process_due_templates, today, shard, workers) for shard in range(workers)]
+        return sum(future.result() for future in futures)
@@ -0,0 +1,258 @@
+import asyncio
+import calendar
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import JobLease, JobRun
+
+
+logger = logging.getLogger(__name__)
+
+# Identyfikator repliki w dzierżawie i historii uruchomień
+OWNER = f'{socket.gethostname()}:{os.getpid()}'
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+
+
+# --- Zadania ---
+
+def _run_meal_payments(today):
+    from .meal_payments import generate_meal_payments
+
+    created, _ = generate_meal_payments(today.replace(day=1), include_previous_month_absences=True)
+    return created
+
+
+def _run_recurring_payments(today):
+    from .recurring_payments import process_recurring_payments
+
+    return process_recurring_payments(today)
+
+
+# Odpowiedniki komend generate_meal_payments i process_recurring; zwracają liczbę utworzonych płatności
+JOBS = {
+    'meal_payments': _run_meal_payments,
+    'recurring_payments': _run_recurring_payments,
+}
+
+
+# --- Harmonogram ---
+
+def parse_schedule(spec):
+    """
+    Termin w formacie "<dzień miesiąca|*> <GG:MM>" w strefie TIME_ZONE, np. "1 02:00"
+    (pierwszego dnia miesiąca) albo "* 02:30" (codziennie). Pusty albo "off" wyłącza zadanie.
+    """
+    spec = (spec or '').strip()
+    if not spec or spec.lower() == 'off':
+        return None
+
+    day, _, clock = spec.partition(' ')
+    hour, minute = (int(part) for part in clock.strip().split(':'))
+    return (None if day == '*' else int(day)), datetime.time(hour, minute)
+
+
+def previous_occurrence(spec, now):
+    """Ostatni termin z harmonogramu nie późniejszy niż now (None dla wyłączonego zadania)."""
+    schedule = parse_schedule(spec)
+    if schedule is None:
+        return None
+
+    day, clock = schedule
+    local_now = timezone.localtime(now)
+
+    def occurrence_in(year, month, day_of_month):
+        day_of_month = min(day_of_month, calendar.monthrange(year, month)[1])
+        return timezone.make_aware(datetime.datetime.combine(datetime.date(year, month, day_of_month), clock))
+
+    if day is None:
+        candidate = timezone.make_aware(datetime.datetime.combine(local_now.date(), clock))
+        if candidate > local_now:
+            candidate = timezone.make_aware(datetime.datetime.combine(local_now.date() - datetime.timedelta(days=1), clock))
+        return candidate
+
+    candidate = occurrence_in(local_now.year, local_now.month, day)
+    if candidate > local_now:
+        previous_month = local_now.date().replace(day=1) - datetime.timedelta(days=1)
+        candidate = occurrence_in(previous_month.year, previous_month.month, day)
+    return candidate
+
+
+def _job_schedules():
+    return {name: spec for name, spec in getattr(settings, 'SCHEDULER_JOBS', {}).items() if name in JOBS}
+
+
+def _is_due(name, occurrence, now):
+    # Termin obsłużony, jeśli jest udane uruchomienie; po błędzie ponawiamy dopiero po SCHEDULER_RETRY_SECONDS
+    runs = JobRun.objects.filter(job_name=name, scheduled_for__gte=occurrence)
+    if runs.filter(status='success').exists():
+        return False
+    # Trwające uruchomienie blokuje termin, dopóki jego replika odnawia dzierżawę;
+    # po wygaśnięciu dzierżawy traktujemy je jak przerwane
+    live_owners = JobLease.objects.filter(name=name, expires_at__gt=timezone.now()).values('owner')
+    if runs.filter(status='running', owner__in=live_owners).exists():
+        return False
+    retry_after = now - datetime.timedelta(seconds=getattr(settings, 'SCHEDULER_RETRY_SECONDS', 900))
+    return not runs.filter(started_at__gt=retry_after).exists()
+
+
+# --- Dzierżawa ---
+
+def _lease_seconds():
+    return getattr(settings, 'SCHEDULER_LEASE_SECONDS', 1800)
+
+
+def acquire_lease(name, owner=OWNER, seconds=None):
+    """Przejmuje dzierżawę zadania, jeśli jest wolna, wygasła albo już nasza."""
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(seconds=seconds or _lease_seconds())
+
+    with transaction.atomic():
+        if JobLease.objects.filter(name=name).filter(Q(expires_at__lte=now) | Q(owner=owner)).update(
+            owner=owner,
+            expires_at=expires_at,
+        ):
+            return True
+        try:
+            with transaction.atomic():
+                JobLease.objects.create(name=name, owner=owner, expires_at=expires_at)
+        except IntegrityError:
+            # Wiersz istnieje i należy do innej repliki
+            return False
+    return True
+
+
+def renew_lease(name, owner=OWNER, seconds=None):
+    """Przedłuża naszą dzierżawę; False, gdy przejęła ją inna replika."""
+    expires_at = timezone.now() + datetime.timedelta(seconds=seconds or _lease_seconds())
+    return bool(JobLease.objects.filter(name=name, owner=owner).update(expires_at=expires_at))
+
+
+def release_lease(name, owner=OWNER):
+    JobLease.objects.filter(name=name, owner=owner).update(expires_at=timezone.now())
+
+
+def _renew_lease_until(stopped, name, owner):
+    # Osobny wątek - własne połączenie do bazy, zamykane po zakończeniu zadania
+    try:
+        while not stopped.wait(_lease_seconds() / 3):
+            try:
+                if not renew_lease(name, owner):
+                    logger.warning('Dzierżawa zadania %s przeszła do innej repliki', name)
+                    return
+            except Exception:
+                logger.exception('Nie udało się odnowić dzierżawy zadania %s', name)
+    finally:
+        connection.close()
+
+
+@contextmanager
+def keep_lease(name, owner=OWNER):
+    """Odnawia dzierżawę co 1/3 jej długości, dopóki trwa zadanie - długie zadanie jej nie traci."""
+    stopped = threading.Event()
+    renewer = threading.Thread(
+        target=_renew_lease_until,
+        args=(stopped, name, owner),
+        name=f'job-lease-{name}',
+        daemon=True,
+    )
+    renewer.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
+
+
+# --- Uruchamianie ---
+
+def run_due_job(name, now=None):
+    """
+    Uruchamia zadanie, jeśli minął jego termin i żadna replika go jeszcze nie obsłużyła.
+    Zwraca zapisany JobRun albo None, gdy nie było czego uruchamiać.
+    """
+    now = now or timezone.now()
+    occurrence = previous_occurrence(_job_schedules().get(name), now)
+    if occurrence is None or not _is_due(name, occurrence, now):
+        return None
+    if not acquire_lease(name):
+        return None
+
+    try:
+        # Inna replika mogła skończyć to zadanie tuż przed przejęciem dzierżawy
+        if not _is_due(name, occurrence, now):
+            return None
+
+        run = JobRun.objects.create(job_name=name, scheduled_for=occurrence, owner=OWNER, started_at=now)
+        started = time.monotonic()
+        try:
+            with keep_lease(name):
+                rows = JOBS[name](timezone.localdate(now))
+        except Exception:
+            logger.exception('Zadanie %s zakończyło się błędem', name)
+            run.status = 'error'
+            run.error = traceback.format_exc()
+        else:
+            run.status = 'success'
+            run.rows = rows or 0
+
+        run.finished_at = timezone.now()
+        run.duration = round(time.monotonic() - started, 3)
+        run.save(update_fields=['status', 'error', 'rows', 'finished_at', 'duration'])
+        return run
+    finally:
+        release_lease(name)
+
+
+def _run_in_thread(name):
+    # Wątek z puli sync_to_async - własne połączenie do bazy, zamykane po zadaniu
+    close_old_connections()
+    try:
+        return run_due_job(name)
+    finally:
+        close_old_connections()
+
+
+async def run_scheduler(interval=None):
+    """Pętla harmonogramu: co `interval` sekund sprawdza terminy wszystkich zadań."""
+    interval = interval or getattr(settings, 'SCHEDULER_INTERVAL', 60)
+    while True:
+        for name in _job_schedules():
+            try:
+                await sync_to_async(_run_in_thread, thread_sensitive=False)(name)
+            except Exception:
+                logger.exception('Harmonogram nie mógł sprawdzić zadania %s', name)
+        await asyncio.sleep(interval)
+
+
+def _scheduler_main():
+    asyncio.run(run_scheduler())
+
+
+def start_scheduler():
+    """
+    Startuje harmonogram w wątku w tle (wołane z config/asgi.py). Własna pętla asyncio
+    nie blokuje pętli daphne; przy kilku replikach zadanie wykonuje posiadacz dzierżawy.
+    """
+    global _scheduler_thread
+    if not getattr(settings, 'SCHEDULER_ENABLED', False):
+        return None
+
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_thread = threading.Thread(target=_scheduler_main, name='job-scheduler', daemon=True)
+            _scheduler_thread.start()
+    return _scheduler_thread
@@ -2,8 +2,10 @@ from rest_framework import serializers
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from datetime import time, timedelta
+from .business_days import is_school_day
 from .models import Child, Payment, Attendance, Post, DailyMenu, FacilityClosure, SpecialActivity, PostComment, GalleryItem, GalleryImage, Group, RecurringPayment
 from drf_writable_nested import WritableNestedModelSerializer
+from .images import rendition_urls
 
 class ChildSerializer(serializers.ModelSerializer):
     # Automatyczne rozszyfrowanie medical_info przy odczycie
@@ -37,6 +39,31 @@ class PaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ()
 
 
+class DebtorPaymentSerializer(serializers.ModelSerializer):
+    payment_id = serializers.IntegerField(source='id', read_only=True)
+    amount = serializers.FloatField(read_only=True)
+    group_id = serializers.IntegerField(source='child.group_id', read_only=True)
+    group_name = serializers.CharField(source='child.group.name', read_only=True)
+    child_name = serializers.SerializerMethodField(read_only=True)
+
+    def get_child_name(self, obj):
+        return f"{obj.child.first_name} {obj.child.last_name}"
+
+    class Meta:
+        model = Payment
+        fields = [
+            'payment_id',
+            'payment_title',
+            'description',
+            'amount',
+            'group_id',
+            'group_name',
+            'child_id',
+            'child_name',
+            'created_at',
+        ]
+
+
 class RecurringPaymentSerializer(serializers.ModelSerializer):
     child_names = serializers.SerializerMethodField(read_only=True)
     child_names_text = serializers.SerializerMethodField(read_only=True)
@@ -104,7 +131,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
         if target_date.weekday() >= 5:
             raise serializers.ValidationError({'date': "Nie można dodać nieobecności w weekend."})
 
-        if FacilityClosure.objects.filter(date=target_date).exists():
+        if not is_school_day(target_date):
             raise serializers.ValidationError({'date': "Nie można dodać nieobecności w dzień wolny od zajęć."})
         
         # --- ZMIANA: Jeśli to Dyrektor, OMIŃ WSZYSTKIE WALIDACJE CZASOWE ---
@@ -216,7 +243,7 @@ class MessageSerializer(serializers.ModelSerializer):
 class PostCommentSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.get_full_name', read_only=True) # Imię Nazwisko autora
     author_avatar = serializers.ImageField(source='author.avatar', read_only=True)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked_by_user = serializers.SerializerMethodField()
 
     class Meta:
@@ -224,6 +251,8 @@ class PostCommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'author_name', 'author_avatar', 'content', 'created_at', 'likes_count', 'is_liked_by_user']
 
     def get_is_liked_by_user(self, obj):
+        if hasattr(obj, 'liked_by_me'):
+            return obj.liked_by_me
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
@@ -231,15 +260,16 @@ class PostCommentSerializer(serializers.ModelSerializer):
 
 class PostSerializer(serializers.ModelSerializer):
     formatted_date = serializers.SerializerMethodField()
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked_by_user = serializers.SerializerMethodField()
     comments = PostCommentSerializer(many=True, read_only=True)
     likers_names = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = [
-            'id', 'title', 'content', 'image', 'created_at', 'formatted_date', 'target_group',
+            'id', 'title', 'content', 'image', 'image_ready', 'renditions', 'created_at', 'formatted_date', 'target_group',
             'likes_count', 'is_liked_by_user', 'comments', 'likers_names'
         ]
 
@@ -250,6 +280,8 @@ class PostSerializer(serializers.ModelSerializer):
         return local_date.strftime("%d-%m-%Y %H:%M")
     
     def get_is_liked_by_user(self, obj):
+        if hasattr(obj, 'liked_by_me'):
+            return obj.liked_by_me
         # Sprawdzamy, czy user wysyłający zapytanie znajduje się na liście lajkujących
         request = self.context.get('request')
         if request and request.user.is_authenticated:
@@ -263,11 +295,38 @@ class PostSerializer(serializers.ModelSerializer):
             full_name = u.get_full_name()
             names.append(full_name if full_name else u.username)
         return names
+
+    def get_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
     
+class PostFeedSerializer(PostSerializer):
+    """
+    Post na stronicowanej tablicy: liczba komentarzy i tylko kilka ostatnich
+    (reszta przez /api/newsfeed/{id}/comments/). Wymaga feed_queryset(..., comments_preview=N).
+    """
+    comments = serializers.SerializerMethodField()
+    comments_count = serializers.IntegerField(source='comments_total', read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['comments_count']
+
+    def get_comments(self, obj):
+        comments = obj.latest_comments
+        preview = self.context.get('comments_preview')
+        if preview:
+            # Bazy bez funkcji okna zwracają wszystkie komentarze - przycinamy do ostatnich
+            comments = comments[-preview:]
+        return PostCommentSerializer(comments, many=True, context=self.context).data
+
 class GalleryImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = GalleryImage
-        fields = ['id', 'image', 'caption']
+        fields = ['id', 'image', 'image_ready', 'renditions', 'caption']
+
+    def get_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
 
 class GalleryItemSerializer(WritableNestedModelSerializer):
     formatted_date = serializers.SerializerMethodField()
@@ -277,7 +336,7 @@ class GalleryItemSerializer(WritableNestedModelSerializer):
     # przez metody create/update w widoku (bo tam operujemy na danych, a nie na serializerze).
     images = GalleryImageSerializer(many=True, read_only=True) 
 
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked_by_user = serializers.SerializerMethodField()
     likers_names = serializers.SerializerMethodField()
     
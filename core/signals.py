@@ -1,19 +1,57 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import m2m_changed, pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
+from communication.models import Message
+from core.attendance_stats import refresh_attendance_aggregate, refresh_attendance_aggregates_for_child
+from core.audience import invalidate_audience
+from core.business_days import invalidate_calendar
+from core.dashboard_cache import invalidate_dashboard_sections
+from core.image_store import track_file_field
+from core.likes import LIKEABLE_MODELS, forget_user_likes, recount_like_counts
 from core.meal_payments import ensure_meal_payment_for_period
-from core.models import Child, DailyMenu
+from core.models import (
+    Attendance,
+    Child,
+    DailyMenu,
+    FacilityClosure,
+    GalleryImage,
+    GalleryItem,
+    Group,
+    Payment,
+    Post,
+    SpecialActivity,
+)
+from core.notification_counters import (
+    adjust_counters,
+    gallery_audience,
+    parents_in_groups,
+    payment_audience,
+    recount_counters,
+    staff_users,
+)
+from users.models import User
 
 
 @receiver(pre_save, sender=Child)
-def cache_previous_meal_settings(sender, instance, **kwargs):
+def cache_previous_child_state(sender, instance, **kwargs):
     if not instance.pk:
         instance._previous_uses_meals = None
+        instance._previous_group_id = None
         return
 
-    previous = Child.objects.filter(pk=instance.pk).values('uses_meals').first()
+    previous = Child.objects.filter(pk=instance.pk).values('uses_meals', 'group_id').first()
     instance._previous_uses_meals = previous['uses_meals'] if previous else None
+    instance._previous_group_id = previous['group_id'] if previous else None
+
+
+@receiver(post_save, sender=Child)
+def refresh_attendance_aggregates_after_group_change(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created or previous_group_id is None or previous_group_id == instance.group_id:
+        return
+
+    refresh_attendance_aggregates_for_child(instance.pk, [previous_group_id, instance.group_id])
 
 
 @receiver(post_save, sender=Child)
@@ -36,21 +74,278 @@ def create_first_meal_payment_after_activation(sender, instance, created, **kwar
     )
 
 
-@receiver(post_delete, sender=DailyMenu)
-def delete_daily_menu_image_file(sender, instance, **kwargs):
-    if instance.image:
-        instance.image.delete(save=False)
-
+# Pliki zdjęć: liczniki odwołań zamiast ręcznego usuwania (core/image_store.py)
+for image_model in (Post, GalleryImage, DailyMenu):
+    track_file_field(image_model, 'image')
 
-@receiver(pre_save, sender=DailyMenu)
-def delete_replaced_daily_menu_image_file(sender, instance, **kwargs):
+@receiver(pre_save, sender=Attendance)
+def cache_previous_attendance_day(sender, instance, **kwargs):
+    instance._previous_attendance_key = None
     if not instance.pk:
         return
 
-    previous = DailyMenu.objects.filter(pk=instance.pk).only('image').first()
-    if not previous or not previous.image:
+    previous = Attendance.objects.filter(pk=instance.pk).values('date', 'child__group_id').first()
+    if previous:
+        instance._previous_attendance_key = (previous['date'], previous['child__group_id'])
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_attendance_aggregate_on_save(sender, instance, **kwargs):
+    group_id = Child.objects.filter(pk=instance.child_id).values_list('group_id', flat=True).first()
+    current_key = (instance.date, group_id)
+    refresh_attendance_aggregate(*current_key)
+
+    previous_key = getattr(instance, '_previous_attendance_key', None)
+    if previous_key and previous_key != current_key:
+        refresh_attendance_aggregate(*previous_key)
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_aggregate_on_delete(sender, instance, **kwargs):
+    group_id = Child.objects.filter(pk=instance.child_id).values_list('group_id', flat=True).first()
+    refresh_attendance_aggregate(instance.date, group_id)
+
+
+# --- Unieważnianie cache pulpitu dyrektora ---
+
+DASHBOARD_SECTIONS_BY_MODEL = {
+    Attendance: ('attendance',),
+    FacilityClosure: ('attendance',),
+    Child: ('attendance', 'debts'),
+    Group: ('attendance', 'debts'),
+    Payment: ('debts',),
+    Message: ('messages',),
+}
+
+
+def invalidate_dashboard_for_instance(sender, **kwargs):
+    invalidate_dashboard_sections(*DASHBOARD_SECTIONS_BY_MODEL[sender])
+
+
+for dashboard_model in DASHBOARD_SECTIONS_BY_MODEL:
+    post_save.connect(invalidate_dashboard_for_instance, sender=dashboard_model, dispatch_uid=f'dashboard_save_{dashboard_model.__name__}')
+    post_delete.connect(invalidate_dashboard_for_instance, sender=dashboard_model, dispatch_uid=f'dashboard_delete_{dashboard_model.__name__}')
+
+
+@receiver(m2m_changed, sender=Child.parents.through)
+def invalidate_dashboard_debts_on_parents_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_dashboard_sections('debts')
+
+
+# --- Liczniki powiadomień (NotificationCounter) ---
+
+@receiver(post_save, sender=SpecialActivity)
+def count_new_special_activity(sender, instance, created, **kwargs):
+    if created:
+        # Rodzice dostają +1 dopiero przy przypisaniu grup (m2m_changed poniżej)
+        adjust_counters('schedule', 1, users=staff_users())
+
+
+def _visible_activity_parent_ids(activity):
+    return set(parents_in_groups(activity.groups.values_list('id', flat=True)).values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=SpecialActivity.groups.through)
+def count_special_activity_group_changes(sender, instance, action, reverse, **kwargs):
+    if reverse:
+        # Zmiana od strony grupy (group.special_activities) - rzadka, przeliczamy rodziców tej grupy
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            recount_counters(parents_in_groups([instance.pk]), sections=('schedule',))
+        return
+
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        instance._visible_parent_ids_before = _visible_activity_parent_ids(instance)
         return
 
-    new_image_name = instance.image.name if instance.image else None
-    if previous.image.name != new_image_name:
-        previous.image.delete(save=False)
\ No newline at end of file
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    before = getattr(instance, '_visible_parent_ids_before', set())
+    after = _visible_activity_parent_ids(instance)
+    if after - before:
+        adjust_counters('schedule', 1, users=User.objects.filter(id__in=after - before), seen_object_id=instance.pk)
+    if before - after:
+        adjust_counters('schedule', -1, users=User.objects.filter(id__in=before - after), seen_object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=SpecialActivity)
+def cache_special_activity_audience(sender, instance, **kwargs):
+    instance._notification_user_ids = _visible_activity_parent_ids(instance) | set(staff_users().values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=SpecialActivity)
+def count_deleted_special_activity(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_notification_user_ids', set())
+    if user_ids:
+        adjust_counters('schedule', -1, users=User.objects.filter(id__in=user_ids), seen_object_id=instance.pk)
+
+
+@receiver(pre_save, sender=GalleryItem)
+def cache_previous_gallery_target(sender, instance, **kwargs):
+    instance._previous_target_group_id = None
+    if instance.pk:
+        instance._previous_target_group_id = GalleryItem.objects.filter(pk=instance.pk).values_list('target_group_id', flat=True).first()
+
+
+@receiver(post_save, sender=GalleryItem)
+def count_gallery_item(sender, instance, created, **kwargs):
+    if created:
+        adjust_counters('gallery', 1, users=gallery_audience(instance.target_group_id))
+        return
+
+    previous_target_group_id = getattr(instance, '_previous_target_group_id', None)
+    if previous_target_group_id == instance.target_group_id:
+        return
+
+    previous_audience = gallery_audience(previous_target_group_id)
+    current_audience = gallery_audience(instance.target_group_id)
+    adjust_counters(
+        'gallery', 1,
+        users=current_audience.exclude(pk__in=previous_audience.values('pk')),
+        seen_object_id=instance.pk,
+    )
+    adjust_counters(
+        'gallery', -1,
+        users=previous_audience.exclude(pk__in=current_audience.values('pk')),
+        seen_object_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=GalleryItem)
+def count_deleted_gallery_item(sender, instance, **kwargs):
+    adjust_counters('gallery', -1, users=gallery_audience(instance.target_group_id), seen_object_id=instance.pk)
+
+
+@receiver(pre_save, sender=FacilityClosure)
+def cache_previous_closure_date(sender, instance, **kwargs):
+    instance._previous_closure_date = None
+    if instance.pk:
+        instance._previous_closure_date = FacilityClosure.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=FacilityClosure)
+@receiver(post_delete, sender=FacilityClosure)
+def invalidate_business_days_calendar(sender, instance, **kwargs):
+    invalidate_calendar(instance.date, getattr(instance, '_previous_closure_date', None))
+
+
+@receiver(post_save, sender=FacilityClosure)
+def count_new_facility_closure(sender, instance, created, **kwargs):
+    if created:
+        adjust_counters('calendar', 1)
+
+
+@receiver(post_delete, sender=FacilityClosure)
+def count_deleted_facility_closure(sender, instance, **kwargs):
+    adjust_counters('calendar', -1, seen_object_id=instance.pk)
+
+
+@receiver(pre_save, sender=Payment)
+def cache_previous_payment_state(sender, instance, **kwargs):
+    instance._previous_notification_state = None
+    if instance.pk:
+        instance._previous_notification_state = Payment.objects.filter(pk=instance.pk).values_list('child_id', 'is_paid').first()
+
+
+@receiver(post_save, sender=Payment)
+def count_payment(sender, instance, created, **kwargs):
+    if created:
+        if not instance.is_paid:
+            adjust_counters('payments', 1, users=payment_audience(instance.child_id), child_id=instance.child_id)
+        return
+
+    previous_state = getattr(instance, '_previous_notification_state', None)
+    if previous_state is None or previous_state == (instance.child_id, instance.is_paid):
+        return
+
+    # Opłacenie albo przepięcie płatności zależy od kursorów "widziane" - przeliczamy zainteresowanych
+    recount_counters(payment_audience(previous_state[0], instance.child_id), sections=('payments',))
+
+
+@receiver(post_delete, sender=Payment)
+def count_deleted_payment(sender, instance, **kwargs):
+    if not instance.is_paid:
+        recount_counters(payment_audience(instance.child_id), sections=('payments',))
+
+
+@receiver(post_save, sender=Child)
+def recount_counters_after_group_change(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created or previous_group_id is None or previous_group_id == instance.group_id:
+        return
+
+    parents = User.objects.filter(child=instance)
+    # Najpierw cache grup rodzica - przeliczenie liczników z niego korzysta
+    invalidate_audience(parents.values_list('id', flat=True))
+    recount_counters(parents, sections=('schedule', 'gallery'))
+
+
+@receiver(m2m_changed, sender=Child.parents.through)
+def recount_counters_on_parents_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._cleared_parent_ids = (
+            {instance.pk} if reverse else set(instance.parents.values_list('id', flat=True))
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        user_ids = {instance.pk}
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_parent_ids', set())
+    else:
+        user_ids = set(pk_set or ())
+
+    if user_ids:
+        invalidate_audience(user_ids)
+        recount_counters(User.objects.filter(id__in=user_ids))
+
+
+@receiver(pre_delete, sender=Child)
+def cache_deleted_child_parents(sender, instance, **kwargs):
+    instance._parent_ids = list(instance.parents.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Child)
+def invalidate_audience_after_child_delete(sender, instance, **kwargs):
+    parent_ids = getattr(instance, '_parent_ids', [])
+    if parent_ids:
+        invalidate_audience(parent_ids)
+        recount_counters(User.objects.filter(id__in=parent_ids))
+
+
+# --- Liczniki polubień (like_count) ---
+# Akcje like w API zmieniają like_count same (core/likes.py); ten sygnał pilnuje zmian przez menedżera likes.
+
+def recount_like_count_on_likes_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_like_pks = {
+            likeable_model: set(likeable_model.objects.filter(likes=instance).values_list('pk', flat=True))
+            for likeable_model in LIKEABLE_MODELS
+        }
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recount_like_counts(type(instance), [instance.pk])
+    elif action == 'post_clear':
+        recount_like_counts(model, getattr(instance, '_cleared_like_pks', {}).get(model, ()))
+    else:
+        recount_like_counts(model, pk_set or ())
+
+
+for likeable_model in LIKEABLE_MODELS:
+    m2m_changed.connect(
+        recount_like_count_on_likes_change,
+        sender=likeable_model.likes.through,
+        dispatch_uid=f'like_count_{likeable_model.__name__}',
+    )
+
+
+@receiver(pre_delete, sender=User)
+def forget_likes_of_deleted_user(sender, instance, **kwargs):
+    # W tej samej transakcji co usunięcie - wycofane usunięcie cofa też zmianę liczników
+    forget_user_likes(instance)
@@ -1,43 +1,33 @@
 from django.utils import timezone
-from django.core.cache import cache
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
-from django.db.models import Q, Count, F, Case, When, IntegerField
+from django.db.models import Q
 from rest_framework.decorators import action
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from .models import Child, GalleryImage, Payment, Post, Attendance, DailyMenu, FacilityClosure, SpecialActivity, PostComment, GalleryItem, Group, RecurringPayment
-from .serializers import ChildSerializer, PaymentSerializer, RecurringPaymentSerializer, PostSerializer, AttendanceSerializer, FacilityClosureSerializer, SpecialActivitySerializer, DailyMenuSerializer, PostCommentSerializer, GalleryItemSerializer, GroupSerializer
+from .album_archive import album_zip_response
+from .attendance_stats import build_attendance_series
+from .audience import filter_group_activities, filter_targeted_content
+from .broadcast import broadcast_notification_summary_changed
+from .notification_counters import record_schedule_changes
+from .dashboard_cache import compute_dashboard_etag, etag_matches, get_dashboard_section
+from .feed import comments_with_like_data, feed_queryset
+from .gallery_uploads import ingest_gallery_images
+from .likes import parse_liked_param, set_like
+from .pagination import KeysetPagination
+from .debt_stats import build_debt_summary, unpaid_payments_for_parent
+from .serializers import ChildSerializer, PaymentSerializer, RecurringPaymentSerializer, PostSerializer, PostFeedSerializer, AttendanceSerializer, FacilityClosureSerializer, SpecialActivitySerializer, DailyMenuSerializer, PostCommentSerializer, GalleryItemSerializer, GroupSerializer, DebtorPaymentSerializer
 from users.permissions import IsDirector, IsDirectorOrTeacher
 from users.models import User
 from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import PageNumberPagination
 from communication.models import Message
+from communication.queries import latest_messages_per_participant
 from datetime import date, timedelta
-from decimal import Decimal
-
-
-def broadcast_notification_summary_changed(user_ids=None):
-    channel_layer = get_channel_layer()
-    if not channel_layer:
-        return
-
-    if user_ids is None:
-        user_ids = User.objects.values_list('id', flat=True)
-
-    for user_id in user_ids:
-        async_to_sync(channel_layer.group_send)(
-            f'user_{int(user_id)}',
-            {
-                'type': 'chat.notification_summary_changed',
-            }
-        )
 
 
 def increment_schedule_change_notification(user_ids):
-    for user_id in set(user_ids):
-        cache_key = f'notification_schedule_extra_{int(user_id)}'
-        current_value = int(cache.get(cache_key, 0) or 0)
-        cache.set(cache_key, current_value + 1, timeout=60 * 60 * 24 * 30)
+    record_schedule_changes(user_ids)
 
 class ChildViewSet(viewsets.ModelViewSet):
     serializer_class = ChildSerializer
@@ -117,9 +107,14 @@ class PaymentViewSet(viewsets.ModelViewSet):
         payment = serializer.save()
 
         parent_ids = payment.child.parents.values_list('id', flat=True)
-        director_ids = User.objects.filter(is_director=True).values_list('id', flat=True)
-        target_ids = set(parent_ids) | set(director_ids)
-        broadcast_notification_summary_changed(target_ids)
+        if payment.is_paid:
+            # Licznik płatności obejmuje tylko nieopłacone pozycje
+            return
+        broadcast_notification_summary_changed(
+            user_ids=parent_ids,
+            deltas={'payments': 1},
+            child_id=payment.child_id,
+        )
 
 
 class RecurringPaymentViewSet(viewsets.ModelViewSet):
@@ -137,6 +132,19 @@ class RecurringPaymentViewSet(viewsets.ModelViewSet):
             return [IsDirector()]
         return super().get_permissions()
 
+class NewsfeedPagination(KeysetPagination):
+    """Tablica: ?limit=N zwraca N najnowszych postów, before doczytuje starsze."""
+    page_size = 10
+    newest_first = True
+
+
+class PostCommentsPagination(KeysetPagination):
+    """Komentarze posta: zawsze stronicowane, najstarsze na górze (jak czat)."""
+    page_size = 20
+    newest_first = False
+    always_paginate = True
+
+
 class PostViewSet(viewsets.ModelViewSet): # <--- ZMIANA 1: ModelViewSet (zamiast ReadOnly)
     """
     Zwraca listę postów (tablicę).
@@ -146,6 +154,9 @@ class PostViewSet(viewsets.ModelViewSet): # <--- ZMIANA 1: ModelViewSet (zamiast
     serializer_class = PostSerializer
     # Domyślnie wymagamy zalogowania (dla listowania, lajków itp.)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewsfeedPagination
+    # Ile ostatnich komentarzy dostaje post na stronicowanej tablicy
+    COMMENTS_PREVIEW = 3
 
     # --- ZMIANA 2: OCHRONA ZAPISU ---
     def get_permissions(self):
@@ -158,62 +169,46 @@ class PostViewSet(viewsets.ModelViewSet): # <--- ZMIANA 1: ModelViewSet (zamiast
             return [IsDirectorOrTeacher()]
         return super().get_permissions()
 
-    # --- TWOJA ORYGINALNA LOGIKA FILTROWANIA (BEZ ZMIAN) ---
+    def _is_paginated_feed(self):
+        return self.action == 'list' and self.paginator.is_requested(self.request)
+
     def get_queryset(self):
-        user = self.request.user
-        child_id = self.request.query_params.get('child_id')
-        
-        # 1. Jeśli to Dyrektor -> widzi wszystko
-        if user.is_director or user.is_teacher:
-            queryset = Post.objects.all()
-            if child_id:
-                try:
-                    child = Child.objects.get(id=child_id)
-                    return queryset.filter(Q(target_group__isnull=True) | Q(target_group=child.group)).distinct()
-                except Child.DoesNotExist:
-                    return queryset.none()
-            return queryset
-        
-        # 2. Jeśli to Rodzic -> pobieramy wszystkie jego dzieci
-        children = user.child.all()
-        
-        # Jeśli rodzic nie ma przypisanych dzieci, widzi tylko posty ogólne
-        if not children.exists():
-            return Post.objects.filter(target_group__isnull=True)
+        queryset = self._visible_posts()
+        if self._is_paginated_feed():
+            return feed_queryset(queryset, self.request.user, comments_preview=self.COMMENTS_PREVIEW)
+        if self.action in ('list', 'retrieve'):
+            # Polubienia i komentarze w stałej liczbie zapytań (core/feed.py)
+            return feed_queryset(queryset, self.request.user)
+        return queryset
 
-        if child_id:
-            selected_child = children.filter(id=child_id).first()
-            if not selected_child:
-                return Post.objects.none()
-            return Post.objects.filter(
-                Q(target_group__isnull=True) | Q(target_group=selected_child.group)
-            ).distinct()
-
-        # 3. Zbieramy grupy wszystkich dzieci rodzica do jednej listy
-        parent_groups = [child.group for child in children]
-        
-        # 4. Filtrujemy posty
-        return Post.objects.filter(
-            Q(target_group__isnull=True) | Q(target_group__in=parent_groups)
-        ).distinct()
+    def get_serializer_class(self):
+        if self._is_paginated_feed():
+            return PostFeedSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['comments_preview'] = self.COMMENTS_PREVIEW
+        return context
+
+    def _visible_posts(self):
+        # Dyrektor/nauczyciel widzi wszystko, rodzic - posty ogólne i grup swoich dzieci (core/audience.py)
+        return filter_targeted_content(
+            Post.objects.all(),
+            self.request.user,
+            child_id=self.request.query_params.get('child_id'),
+        )
 
     # --- TWOJE ORYGINALNE AKCJE (BEZ ZMIAN) ---
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         post = self.get_object()
-        user = request.user
-
-        if post.likes.filter(id=user.id).exists():
-            post.likes.remove(user)
-            liked = False
-        else:
-            post.likes.add(user)
-            liked = True
+        liked, like_count = set_like(post, request.user, liked=parse_liked_param(request.data))
 
         return Response({
             'liked': liked, 
-            'likes_count': post.likes.count()
+            'likes_count': like_count
         })
 
     @action(detail=True, methods=['post'])
@@ -233,6 +228,17 @@ class PostViewSet(viewsets.ModelViewSet): # <--- ZMIANA 1: ModelViewSet (zamiast
         serializer = PostCommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)    
 
+    # GET /api/newsfeed/{id}/comments/?before=<kursor> - kolejne strony komentarzy posta
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        post = self.get_object()
+        comments = comments_with_like_data(request.user, post.comments.all())
+
+        paginator = PostCommentsPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = PostCommentSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
 
@@ -245,18 +251,15 @@ class PostViewSet(viewsets.ModelViewSet): # <--- ZMIANA 1: ModelViewSet (zamiast
         else:
             instance.target_group = None
 
+        # Stary plik zwalnia core.image_store - może go jeszcze używać inny wpis
         new_image = request.FILES.get('image')
         if new_image:
-            if instance.image:
-                instance.image.delete(save=False)
             instance.image = new_image
 
         delete_image_value = str(request.data.get('delete_image', '')).strip().lower()
         delete_image = delete_image_value in ['1', 'true', 'yes', 'on']
 
         if delete_image and not new_image:
-            if instance.image:
-                instance.image.delete(save=False)
             instance.image = None
 
         instance.save()
@@ -300,7 +303,7 @@ class FacilityClosureViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save()
-        broadcast_notification_summary_changed()
+        broadcast_notification_summary_changed(deltas={'calendar': 1})
 
 class SpecialActivityViewSet(viewsets.ModelViewSet):
     """
@@ -318,36 +321,12 @@ class SpecialActivityViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        user = self.request.user
-        child_id = self.request.query_params.get('child_id')
-        
-        # Dyrektor widzi cały kalendarz
-        if user.is_director or user.is_teacher:
-            queryset = SpecialActivity.objects.all()
-            if child_id:
-                try:
-                    child = Child.objects.get(id=child_id)
-                    return queryset.filter(groups=child.group).distinct()
-                except Child.DoesNotExist:
-                    return queryset.none()
-            return queryset
-        
-        # Rodzic: pobieramy grupy jego dzieci
-        children = user.child.all()
-        if not children.exists():
-            return SpecialActivity.objects.none()
-
-        if child_id:
-            selected_child = children.filter(id=child_id).first()
-            if not selected_child:
-                return SpecialActivity.objects.none()
-            return SpecialActivity.objects.filter(groups=selected_child.group).distinct()
-            
-        parent_groups = [child.group for child in children]
-        
-        # Filtrujemy zajęcia, które są przypisane do którejkolwiek z tych grup
-        # distinct() jest ważne przy ManyToMany, żeby nie dublować wyników
-        return SpecialActivity.objects.filter(groups__in=parent_groups).distinct()
+        # Dyrektor widzi cały kalendarz, rodzic - zajęcia grup swoich dzieci
+        return filter_group_activities(
+            SpecialActivity.objects.all(),
+            self.request.user,
+            child_id=self.request.query_params.get('child_id'),
+        )
 
     def _get_activity_notification_target_ids(self, group_ids):
         normalized_group_ids = set(group_ids)
@@ -358,29 +337,41 @@ class SpecialActivityViewSet(viewsets.ModelViewSet):
         director_ids = User.objects.filter(is_director=True).values_list('id', flat=True)
         return set(parent_ids) | set(director_ids)
 
+    def _broadcast_activity_change(self, group_ids, deltas=None):
+        group_ids = set(group_ids)
+        if deltas:
+            # Nowe zajęcia widzi personel i rodzice z ich grup (zajęcia bez grup - tylko personel)
+            broadcast_notification_summary_changed(group_ids=group_ids, include_teachers=True, deltas=deltas)
+        elif group_ids:
+            broadcast_notification_summary_changed(group_ids=group_ids)
+        else:
+            # Zajęcia bez grup dotyczą wszystkich (tak jak w _get_activity_notification_target_ids)
+            broadcast_notification_summary_changed()
+
     def perform_create(self, serializer):
         activity = serializer.save()
 
         group_ids = activity.groups.values_list('id', flat=True)
-        target_ids = self._get_activity_notification_target_ids(group_ids)
-        broadcast_notification_summary_changed(target_ids)
+        # Nowe zajęcia to +1 dla każdego, kto je widzi. Przy edycji i usuwaniu zmiana zależy
+        # od tego, co użytkownik już widział, więc klienci pobierają pełne podsumowanie.
+        self._broadcast_activity_change(group_ids, deltas={'schedule': 1})
 
     def perform_update(self, serializer):
-        previous_group_ids = serializer.instance.groups.values_list('id', flat=True)
+        previous_group_ids = list(serializer.instance.groups.values_list('id', flat=True))
         activity = serializer.save()
         updated_group_ids = activity.groups.values_list('id', flat=True)
 
         all_relevant_group_ids = set(previous_group_ids) | set(updated_group_ids)
         target_ids = self._get_activity_notification_target_ids(all_relevant_group_ids)
         increment_schedule_change_notification(target_ids)
-        broadcast_notification_summary_changed(target_ids)
+        self._broadcast_activity_change(all_relevant_group_ids)
 
     def perform_destroy(self, instance):
-        group_ids = instance.groups.values_list('id', flat=True)
+        group_ids = list(instance.groups.values_list('id', flat=True))
         target_ids = self._get_activity_notification_target_ids(group_ids)
         instance.delete()
         increment_schedule_change_notification(target_ids)
-        broadcast_notification_summary_changed(target_ids)
+        self._broadcast_activity_change(group_ids)
     
 class DailyMenuViewSet(viewsets.ModelViewSet):
     """
@@ -434,57 +425,30 @@ class GalleryViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        user = self.request.user
-        child_id = self.request.query_params.get('child_id')
-        
-        if user.is_director or user.is_teacher:
-            queryset = GalleryItem.objects.all()
-            if child_id:
-                try:
-                    child = Child.objects.get(id=child_id)
-                    return queryset.filter(
-                        Q(target_group__isnull=True) | Q(target_group=child.group)
-                    ).distinct()
-                except Child.DoesNotExist:
-                    return queryset.none()
-            return queryset
-        
-        children = user.child.all()
-        if not children.exists():
-            return GalleryItem.objects.filter(target_group__isnull=True)
-
-        if child_id:
-            selected_child = children.filter(id=child_id).first()
-            if not selected_child:
-                return GalleryItem.objects.none()
-            return GalleryItem.objects.filter(
-                Q(target_group__isnull=True) | Q(target_group=selected_child.group)
-            ).distinct()
-
-        parent_groups = [child.group for child in children]
-        
-        return GalleryItem.objects.filter(
-            Q(target_group__isnull=True) | Q(target_group__in=parent_groups)
-        ).distinct()
+        return filter_targeted_content(
+            GalleryItem.objects.all(),
+            self.request.user,
+            child_id=self.request.query_params.get('child_id'),
+        )
 
     # --- AKCJA LAJKOWANIA ALBUMU ---
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         album = self.get_object()
-        user = request.user
-
-        if album.likes.filter(id=user.id).exists():
-            album.likes.remove(user)
-            liked = False
-        else:
-            album.likes.add(user)
-            liked = True
+        liked, like_count = set_like(album, request.user, liked=parse_liked_param(request.data))
 
         return Response({
             'liked': liked, 
-            'likes_count': album.likes.count()
+            'likes_count': like_count
         })
 
+    # --- POBIERANIE CAŁEGO ALBUMU (ZIP) ---
+    # GET /api/gallery/{id}/download/ - get_object() pilnuje tych samych zasad widoczności co lista
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        album = self.get_object()
+        return album_zip_response(request, album)
+
     # --- NOWA METODA CREATE (dla wielu zdjęć z Frontendu) ---
     def create(self, request, *args, **kwargs):
         title = request.data.get('title')
@@ -500,23 +464,20 @@ class GalleryViewSet(viewsets.ModelViewSet):
             target_group_id=target_group_id if target_group_id else None
         )
         
-        # Pobieramy listę plików (zdjęć)
-        images = request.FILES.getlist('images')
-        
-        # W pętli tworzymy obiekty GalleryImage
-        for image_file in images:
-            GalleryImage.objects.create(gallery_item=album, image=image_file)
+        # Zdjęcia przetwarzamy równolegle i zapisujemy jednym bulk_create
+        upload_results = ingest_gallery_images(album, request.FILES.getlist('images'))
 
         if album.target_group_id:
-            parent_ids = User.objects.filter(child__group_id=album.target_group_id).values_list('id', flat=True).distinct()
-            director_ids = User.objects.filter(is_director=True).values_list('id', flat=True)
-            target_ids = set(parent_ids) | set(director_ids)
-            broadcast_notification_summary_changed(target_ids)
+            broadcast_notification_summary_changed(
+                group_ids=[album.target_group_id],
+                include_teachers=True,
+                deltas={'gallery': 1},
+            )
         else:
-            broadcast_notification_summary_changed()
+            broadcast_notification_summary_changed(deltas={'gallery': 1})
             
         serializer = self.get_serializer(album)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({**serializer.data, 'upload_results': upload_results}, status=status.HTTP_201_CREATED)
 
     # --- NOWA METODA UPDATE (dla edycji zdjęć) ---
     def update(self, request, *args, **kwargs):
@@ -534,9 +495,7 @@ class GalleryViewSet(viewsets.ModelViewSet):
         instance.save()
         
         # 2. Dodawanie nowych zdjęć
-        new_images = request.FILES.getlist('images')
-        for image_file in new_images:
-            GalleryImage.objects.create(gallery_item=instance, image=image_file)
+        upload_results = ingest_gallery_images(instance, request.FILES.getlist('images'))
 
         # 3. Usuwanie starych zdjęć
         # Frontend wyśle listę ID zdjęć do usunięcia, np. 'deleted_images': [1, 5, 12]
@@ -545,7 +504,7 @@ class GalleryViewSet(viewsets.ModelViewSet):
             GalleryImage.objects.filter(id__in=deleted_images_ids, gallery_item=instance).delete()
             
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return Response({**serializer.data, 'upload_results': upload_results})
     
 class CommentViewSet(viewsets.GenericViewSet):
     queryset = PostComment.objects.all()
@@ -556,18 +515,11 @@ class CommentViewSet(viewsets.GenericViewSet):
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         comment = self.get_object()
-        user = request.user
-
-        if comment.likes.filter(id=user.id).exists():
-            comment.likes.remove(user)
-            liked = False
-        else:
-            comment.likes.add(user)
-            liked = True
+        liked, like_count = set_like(comment, request.user, liked=parse_liked_param(request.data))
 
         return Response({
             'liked': liked, 
-            'likes_count': comment.likes.count()
+            'likes_count': like_count
         })
 
 class GroupViewSet(viewsets.ModelViewSet): # Zmieniamy na ModelViewSet (pełny dostęp)
@@ -594,150 +546,16 @@ class DirectorStatsView(APIView):
     """
     permission_classes = [IsDirector] # Tylko dyrektor
 
-    def _build_attendance_series(self, days, group_id=None):
-        today = timezone.localdate()
-        start_date = today - timedelta(days=days - 1)
-
-        children_qs = Child.objects.all()
-        if group_id is not None:
-            children_qs = children_qs.filter(group_id=group_id)
-
-        total_children = children_qs.count()
-
-        absence_qs = Attendance.objects.filter(
-            status='absent',
-            date__range=(start_date, today),
-        )
-        if group_id is not None:
-            absence_qs = absence_qs.filter(child__group_id=group_id)
-
-        absences_by_date = {
-            entry['date']: entry['count']
-            for entry in absence_qs.values('date').annotate(count=Count('id'))
-        }
-
-        series = []
-        for day_index in range(days):
-            current_date = start_date + timedelta(days=day_index)
-            absent_count = int(absences_by_date.get(current_date, 0) or 0)
-            present_count = max(total_children - absent_count, 0)
-            attendance_rate = round((present_count / total_children) * 100, 1) if total_children else 0.0
-
-            series.append({
-                'date': current_date.isoformat(),
-                'label': current_date.strftime('%d.%m'),
-                'present': present_count,
-                'absent': absent_count,
-                'total': total_children,
-                'attendance_rate': attendance_rate,
-            })
-
-        return series
-
-    def _build_debt_stats(self):
-        unpaid_payments = Payment.objects.filter(is_paid=False).select_related(
-            'child',
-            'child__group',
-        ).prefetch_related('child__parents')
-
-        total_outstanding = Decimal('0.00')
-        group_totals = {}
-        parent_map = {}
-
-        for payment in unpaid_payments:
-            payment_amount = payment.amount or Decimal('0.00')
-            total_outstanding += payment_amount
-
-            group_obj = payment.child.group
-            group_key = int(group_obj.id)
-            if group_key not in group_totals:
-                group_totals[group_key] = {
-                    'group_id': group_key,
-                    'group_name': group_obj.name,
-                    'amount': Decimal('0.00'),
-                    'unpaid_items': 0,
-                }
-            group_totals[group_key]['amount'] += payment_amount
-            group_totals[group_key]['unpaid_items'] += 1
-
-            parent_users = list(payment.child.parents.all())
-            for parent in parent_users:
-                parent_key = int(parent.id)
-                full_name = f"{parent.first_name} {parent.last_name}".strip() or parent.username
-                if parent_key not in parent_map:
-                    parent_map[parent_key] = {
-                        'parent_id': parent_key,
-                        'parent_name': full_name,
-                        'amount': Decimal('0.00'),
-                        'unpaid_items': 0,
-                        'group_names': set(),
-                        'debts': [],
-                    }
-
-                parent_map[parent_key]['amount'] += payment_amount
-                parent_map[parent_key]['unpaid_items'] += 1
-                parent_map[parent_key]['group_names'].add(group_obj.name)
-                parent_map[parent_key]['debts'].append({
-                    'payment_id': payment.id,
-                    'payment_title': payment.payment_title,
-                    'description': payment.description,
-                    'amount': float(payment_amount),
-                    'group_id': group_key,
-                    'group_name': group_obj.name,
-                    'child_id': payment.child_id,
-                    'child_name': f"{payment.child.first_name} {payment.child.last_name}",
-                    'created_at': payment.created_at.isoformat(),
-                })
-
-        debtors = []
-        for entry in parent_map.values():
-            entry['amount'] = float(entry['amount'])
-            entry['group_names'] = sorted(list(entry['group_names']))
-            entry['debts'].sort(key=lambda debt: debt['created_at'])
-            debtors.append(entry)
-
-        debtors.sort(key=lambda debtor: debtor['amount'], reverse=True)
-
-        by_group = []
-        for group_entry in group_totals.values():
-            by_group.append({
-                'group_id': group_entry['group_id'],
-                'group_name': group_entry['group_name'],
-                'amount': float(group_entry['amount']),
-                'unpaid_items': group_entry['unpaid_items'],
-            })
-        by_group.sort(key=lambda group_entry: group_entry['amount'], reverse=True)
-
-        return {
-            'total_outstanding': float(total_outstanding),
-            'total_unpaid_items': sum(item['unpaid_items'] for item in by_group),
-            'by_group': by_group,
-            'debtors': debtors,
-            'top_debtor': debtors[0] if debtors else None,
-        }
+    MESSAGES_SECTION_TIMEOUT = 5 * 60
 
     def _build_unanswered_over_24h(self, director_user):
         threshold = timezone.now() - timedelta(hours=24)
 
-        message_qs = Message.objects.filter(
-            Q(sender=director_user) | Q(receiver=director_user)
-        ).annotate(
-            participant_id=Case(
-                When(sender=director_user, then=F('receiver_id')),
-                default=F('sender_id'),
-                output_field=IntegerField(),
-            )
-        ).exclude(participant_id=director_user.id).select_related('sender', 'receiver').order_by('participant_id', '-created_at')
-
-        latest_by_participant = {}
-        for message in message_qs:
-            participant_id = int(message.participant_id)
-            if participant_id not in latest_by_participant:
-                latest_by_participant[participant_id] = message
+        latest_messages = latest_messages_per_participant(director_user)
 
         pending = []
         now = timezone.now()
-        for participant_id, last_message in latest_by_participant.items():
+        for last_message in latest_messages:
             if last_message.sender_id == director_user.id:
                 continue
             if last_message.created_at > threshold:
@@ -763,17 +581,10 @@ class DirectorStatsView(APIView):
         pending.sort(key=lambda item: item['last_message_at'])
         return pending
 
-    def get(self, request):
-        today = timezone.localdate()
+    def _build_attendance_section(self, today):
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=4)
 
-        # 1. Liczba nieprzeczytanych wiadomości (skierowanych do dyrekcji)
-        unread_messages_count = Message.objects.filter(
-            receiver=request.user,
-            is_read=False
-        ).count()
-
         # 2. Liczba zgłoszonych nieobecności w bieżącym tygodniu roboczym (poniedziałek-piątek)
         absent_week_count = Attendance.objects.filter(
             date__range=(week_start, week_end),
@@ -782,7 +593,7 @@ class DirectorStatsView(APIView):
 
         # 3. Całkowita liczba dzieci
         total_children_count = Child.objects.count()
-        
+
         # 4. Liczba obecnych (Total - Nieobecni)
         present_today_count = total_children_count - Attendance.objects.filter(
             date=today,
@@ -791,24 +602,9 @@ class DirectorStatsView(APIView):
 
         # 5. Frekwencja tygodniowa/miesięczna (cała placówka + każda grupa)
         groups = list(Group.objects.order_by('name').values('id', 'name'))
-        attendance_week = {'all': self._build_attendance_series(7)}
-        attendance_month = {'all': self._build_attendance_series(30)}
-
-        for group in groups:
-            group_id = int(group['id'])
-            key = str(group_id)
-            attendance_week[key] = self._build_attendance_series(7, group_id=group_id)
-            attendance_month[key] = self._build_attendance_series(30, group_id=group_id)
+        attendance_series = build_attendance_series([group['id'] for group in groups], periods=(7, 30))
 
-        # 6. Zaległości i najwięksi dłużnicy
-        debt_stats = self._build_debt_stats()
-
-        # 7. Rozmowy bez odpowiedzi >24h
-        unanswered = self._build_unanswered_over_24h(request.user)
-        
-        # Przygotowujemy dane do wysłania
-        stats = {
-            'unread_messages': unread_messages_count,
+        return {
             'absent_today': absent_week_count,
             'absent_week': absent_week_count,
             'present_today': present_today_count,
@@ -818,12 +614,84 @@ class DirectorStatsView(APIView):
                     {'id': str(group['id']), 'name': group['name']}
                     for group in groups
                 ],
-                'week': attendance_week,
-                'month': attendance_month,
+                'week': attendance_series[7],
+                'month': attendance_series[30],
             },
-            'debts': debt_stats,
+        }
+
+    def _build_messages_section(self, director_user):
+        # 1. Liczba nieprzeczytanych wiadomości (skierowanych do dyrekcji)
+        unread_messages_count = Message.objects.filter(
+            receiver=director_user,
+            is_read=False
+        ).count()
+
+        # 7. Rozmowy bez odpowiedzi >24h
+        unanswered = self._build_unanswered_over_24h(director_user)
+
+        return {
+            'unread_messages': unread_messages_count,
             'unanswered_over_24h': unanswered,
             'unanswered_over_24h_count': len(unanswered),
         }
-        
-        return Response(stats)
\ No newline at end of file
+
+    def get(self, request):
+        today = timezone.localdate()
+
+        # Każda sekcja jest cache'owana osobno i unieważniana sygnałami (core/signals.py)
+        attendance_section = get_dashboard_section(
+            'attendance',
+            lambda: self._build_attendance_section(today),
+            scope=today.isoformat(),
+        )
+        # 6. Zaległości i najwięksi dłużnicy
+        debt_stats = get_dashboard_section('debts', build_debt_summary)
+        # Próg 24h przesuwa się z czasem, więc ta sekcja żyje krócej
+        messages_section = get_dashboard_section(
+            'messages',
+            lambda: self._build_messages_section(request.user),
+            scope=request.user.id,
+            timeout=self.MESSAGES_SECTION_TIMEOUT,
+        )
+
+        # Przygotowujemy dane do wysłania
+        stats = {
+            **attendance_section,
+            **messages_section,
+            'debts': debt_stats,
+        }
+
+        etag = compute_dashboard_etag(stats)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(stats)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class DebtorPaymentsPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class DirectorDebtorPaymentsView(ListAPIView):
+    """
+    Stronicowana lista nieopłaconych płatności jednego rodzica (szczegóły dłużnika).
+    Opcjonalnie filtrowana po grupie: ?group_id=<id>
+    """
+    permission_classes = [IsDirector]
+    serializer_class = DebtorPaymentSerializer
+    pagination_class = DebtorPaymentsPagination
+
+    def get_queryset(self):
+        group_id = self.request.query_params.get('group_id')
+        try:
+            group_id = int(group_id) if group_id not in (None, '', 'all') else None
+        except (TypeError, ValueError):
+            return Payment.objects.none()
+
+        return unpaid_payments_for_parent(self.kwargs['parent_id'], group_id=group_id)
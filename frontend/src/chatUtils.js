@@ -0,0 +1,27 @@
+import axios from 'axios';
+
+// Rozmiar strony historii czatu (MessageHistoryPagination na backendzie)
+export const MESSAGES_PAGE_SIZE = 50;
+
+// Bez kursora: najnowsze wiadomości; z `before`: starsze od kursora (doczytywanie przy przewijaniu w górę)
+export const fetchMessagesPage = async (authConfig, { participantId, before } = {}) => {
+  const params = { limit: MESSAGES_PAGE_SIZE };
+  if (participantId) params.participant_id = participantId;
+  if (before) params.before = before;
+
+  const res = await axios.get('/api/communication/messages/', { ...authConfig, params });
+  return {
+    messages: res.data.results,
+    beforeCursor: res.data.has_more_before ? res.data.before_cursor : null,
+  };
+};
+
+// Scala po id - odświeżenie najnowszej strony nie gubi doczytanych starszych wiadomości
+export const mergeMessages = (current, incoming) => {
+  const byId = new Map(current.map(msg => [msg.id, msg]));
+  incoming.forEach(msg => byId.set(msg.id, msg));
+  return [...byId.values()].sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
+};
+
+// Próg (px od góry), od którego przewijanie w górę doczytuje starsze wiadomości
+export const LOAD_OLDER_THRESHOLD_PX = 80;
@@ -38,7 +38,7 @@ const DirectorDashboard = () => {
       return debtors;
     }
 
-    return debtors.filter(debtor => debtor.debts.some(debt => String(debt.group_id) === String(debtGroup)));
+    return debtors.filter(debtor => (debtor.group_ids || []).some(groupId => String(groupId) === String(debtGroup)));
   }, [debtGroup, debtStats]);
 
   const selectedDebtor = useMemo(() => {
@@ -46,6 +46,37 @@ const DirectorDashboard = () => {
     return filteredDebtors.find(debtor => debtor.parent_id === selectedDebtorId) || null;
   }, [filteredDebtors, selectedDebtorId]);
 
+  const [debtorPayments, setDebtorPayments] = useState([]);
+  const [debtorPaymentsNextUrl, setDebtorPaymentsNextUrl] = useState(null);
+  const [debtorPaymentsLoading, setDebtorPaymentsLoading] = useState(false);
+
+  const loadDebtorPayments = async (url, append = false) => {
+    setDebtorPaymentsLoading(true);
+    try {
+      const res = await axios.get(url, getAuthHeaders());
+      const results = res.data?.results || [];
+      setDebtorPayments(prev => (append ? [...prev, ...results] : results));
+      setDebtorPaymentsNextUrl(res.data?.next || null);
+    } catch (err) {
+      console.error("Błąd pobierania szczegółów zaległości:", err);
+    } finally {
+      setDebtorPaymentsLoading(false);
+    }
+  };
+
+  // Szczegóły pobieramy tylko przy zmianie wyboru - odświeżone statystyki dają nowy obiekt dłużnika,
+  // ale to ten sam wybór, więc otwarte szczegóły (i doczytane strony) zostają
+  const selectedDebtorParentId = selectedDebtor?.parent_id ?? null;
+
+  useEffect(() => {
+    setDebtorPayments([]);
+    setDebtorPaymentsNextUrl(null);
+    if (!selectedDebtorParentId) return;
+
+    const groupQuery = debtGroup === 'all' ? '' : `?group_id=${debtGroup}`;
+    loadDebtorPayments(`/api/director/stats/debtors/${selectedDebtorParentId}/payments/${groupQuery}`);
+  }, [selectedDebtorParentId, debtGroup]);
+
   const unansweredOver24h = stats?.unanswered_over_24h || [];
   const unansweredOver24hCount = stats?.unanswered_over_24h_count || 0;
 
@@ -75,9 +106,10 @@ const DirectorDashboard = () => {
         const res = await axios.get('/api/director/stats/', getAuthHeaders());
         setStats(res.data);
 
+        // Pierwszy dłużnik tylko, gdy nic nie jest jeszcze wybrane - odświeżenie nie zmienia wyboru
         const firstDebtor = res.data?.debts?.debtors?.[0];
         if (firstDebtor?.parent_id) {
-          setSelectedDebtorId(firstDebtor.parent_id);
+          setSelectedDebtorId(current => current ?? firstDebtor.parent_id);
         }
       } catch (err) {
         console.error("Błąd pobierania statystyk:", err);
@@ -291,19 +323,27 @@ const DirectorDashboard = () => {
                       </tr>
                     </thead>
                     <tbody>
-                      {selectedDebtor.debts
-                        .filter(debt => debtGroup === 'all' || String(debt.group_id) === String(debtGroup))
-                        .map(debt => (
-                          <tr key={debt.payment_id}>
-                            <td>{debt.child_name}</td>
-                            <td>{debt.group_name}</td>
-                            <td>{debt.description}</td>
-                            <td>{formatCurrency(debt.amount)}</td>
-                          </tr>
-                        ))}
+                      {debtorPayments.map(debt => (
+                        <tr key={debt.payment_id}>
+                          <td>{debt.child_name}</td>
+                          <td>{debt.group_name}</td>
+                          <td>{debt.description}</td>
+                          <td>{formatCurrency(debt.amount)}</td>
+                        </tr>
+                      ))}
                     </tbody>
                   </table>
                 </div>
+                {debtorPaymentsNextUrl && (
+                  <button
+                    type="button"
+                    className="debtor-item"
+                    disabled={debtorPaymentsLoading}
+                    onClick={() => loadDebtorPayments(debtorPaymentsNextUrl, true)}
+                  >
+                    {debtorPaymentsLoading ? 'Wczytywanie...' : 'Pokaż więcej'}
+                  </button>
+                )}
               </>
             )}
           </div>
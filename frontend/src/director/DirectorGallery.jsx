@@ -271,18 +271,26 @@ const DirectorGallery = () => {
     newImages.forEach(file => dataToSend.append('images', file));
 
     try {
+      let res;
       if (editingAlbum) {
         if (imagesToDelete.length > 0) {
            imagesToDelete.forEach(id => dataToSend.append('deleted_images', id));
         }
-        await axios.patch(`/api/gallery/${editingAlbum.id}/`, dataToSend, {
+        res = await axios.patch(`/api/gallery/${editingAlbum.id}/`, dataToSend, {
           headers: { ...getAuthHeaders().headers, 'Content-Type': 'multipart/form-data' }
         });
       } else {
-        await axios.post('/api/gallery/', dataToSend, {
+        res = await axios.post('/api/gallery/', dataToSend, {
           headers: { ...getAuthHeaders().headers, 'Content-Type': 'multipart/form-data' }
         });
       }
+
+      // Backend zwraca wynik dla każdego pliku - album zapisuje się nawet, gdy część zdjęć odpadła
+      const failedFiles = (res.data?.upload_results || [])
+        .filter(result => result.status !== 'ok')
+        .map(result => result.file);
+      setActionError(failedFiles.length > 0 ? `Nie udało się dodać zdjęć: ${failedFiles.join(', ')}` : '');
+
       setIsModalOpen(false);
       await fetchData(); // To odświeży listę i wyłączy loading
     } catch (err) {
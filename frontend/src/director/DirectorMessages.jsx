@@ -1,9 +1,10 @@
 // frontend/src/director/DirectorMessages.jsx
-import React, { useState, useEffect, useRef, useCallback } from 'react';
+import React, { useState, useEffect, useLayoutEffect, useRef, useCallback } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import axios from 'axios';
 import { getAuthHeaders, removeToken } from '../authUtils';
 import { getChatWebSocketUrl } from '../wsUtils';
+import { LOAD_OLDER_THRESHOLD_PX, fetchMessagesPage, mergeMessages } from '../chatUtils';
 import './DirectorMessages.css'; 
 import LoadingScreen from '../users/LoadingScreen';
 
@@ -33,6 +34,7 @@ const DirectorMessages = () => {
   const [currentUser, setCurrentUser] = useState(null);
 
   const [showScrollButton, setShowScrollButton] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const messagesContainerRef = useRef(null);
   const messagesEndRef = useRef(null);
   const isUserAtBottomRef = useRef(true);
@@ -44,6 +46,9 @@ const DirectorMessages = () => {
   const shouldReconnectRef = useRef(true);
   const isFetchingRef = useRef(false);
   const pendingFetchRef = useRef(false);
+  const isLoadingOlderRef = useRef(false);
+  // Wysokość listy przed doczytaniem starszych - po renderze przywracamy pozycję przewinięcia
+  const scrollAnchorRef = useRef(null);
   const MAX_RECONNECT_ATTEMPTS = 10;
   const BASE_RECONNECT_DELAY_MS = 1000;
   const MAX_RECONNECT_DELAY_MS = 30000;
@@ -78,15 +83,9 @@ const DirectorMessages = () => {
         participant_id: participantId
       }, authConfig);
 
-      setConversations(prev => prev.map(conv => {
-        if (!isSameParticipant(conv.participantId, participantId)) return conv;
-        return {
-          ...conv,
-          messages: conv.messages.map(msg => (
-            isSameParticipant(msg.sender, participantId) ? { ...msg, is_read: true } : msg
-          )),
-        };
-      }));
+      setConversations(prev => prev.map(conv => (
+        isSameParticipant(conv.participantId, participantId) ? { ...conv, unreadCount: 0 } : conv
+      )));
 
       setActiveConversation(prev => {
         if (!prev || !isSameParticipant(prev.participantId, participantId)) return prev;
@@ -115,6 +114,7 @@ const DirectorMessages = () => {
   };
 
   // --- 1. POBIERANIE DANYCH ---
+  // Lista rozmów z ostatnią wiadomością i licznikiem; treść wczytujemy tylko dla otwartej rozmowy
   const fetchData = useCallback(async (myId) => {
     if (isFetchingRef.current) {
       pendingFetchRef.current = true;
@@ -128,13 +128,18 @@ const DirectorMessages = () => {
         navigate('/');
         return;
       }
-      const [messagesRes, allUsersRes] = await Promise.all([
-        axios.get('/api/communication/messages/', authConfig),
+      const [conversationsRes, allUsersRes] = await Promise.all([
+        axios.get('/api/communication/conversations/', authConfig),
         axios.get('/api/users/manage/?is_parent=true', authConfig)
       ]);
 
       // Przekazujemy 'myId' bezpośrednio, żeby nie polegać na asynchronicznym stanie
-      processMessages(messagesRes.data, myId, allUsersRes.data);
+      processConversations(conversationsRes.data, myId, allUsersRes.data);
+
+      const active = activeConversationRef.current;
+      if (active) {
+        await refreshActiveConversation(active.participantId, authConfig);
+      }
 
     } catch (err) {
       console.error("Błąd pobierania:", err);
@@ -149,31 +154,22 @@ const DirectorMessages = () => {
     }
   }, [navigate]);
   
-  // --- 2. PRZETWARZANIE WIADOMOŚCI ---
-  const processMessages = (messages, myId, allParentUsers) => {
-    const grouped = messages.reduce((acc, msg) => {
-        const otherId = msg.sender === myId ? msg.receiver : msg.sender;
-        if (otherId === myId) return acc;
-      const participantName = msg.sender === myId ? msg.receiver_name : msg.sender_name;
-      const participantAvatarUrl = msg.sender === myId ? msg.receiver_avatar_url : msg.sender_avatar_url;
-
-        if (!acc[otherId]) {
-        acc[otherId] = {
-          participantId: otherId,
-          participantName,
-          participantAvatar: toAbsoluteUrl(participantAvatarUrl),
-          messages: []
-        };
-      } else if (!acc[otherId].participantAvatar && participantAvatarUrl) {
-        acc[otherId].participantAvatar = toAbsoluteUrl(participantAvatarUrl);
-        }
-        acc[otherId].messages.push(msg);
-        return acc;
-    }, {});
-    
-    for (const key in grouped) {
-        grouped[key].messages.sort((a,b) => new Date(a.created_at) - new Date(b.created_at));
-    }
+  // --- 2. PRZETWARZANIE ROZMÓW ---
+  const processConversations = (serverConversations, myId, allParentUsers) => {
+    const grouped = {};
+    serverConversations.forEach(conv => {
+      grouped[conv.participant_id] = {
+        participantId: conv.participant_id,
+        participantName: conv.participant_name,
+        participantAvatar: toAbsoluteUrl(conv.participant_avatar_url),
+        lastMessage: conv.last_message ? {
+          body: conv.last_message_preview,
+          sender: conv.last_message_sender,
+          created_at: conv.last_message_at,
+        } : null,
+        unreadCount: conv.unread_count,
+      };
+    });
     
     allParentUsers.forEach(user => {
       const parentAvatar = toAbsoluteUrl(user.avatar_url || user.avatar);
@@ -182,7 +178,8 @@ const DirectorMessages = () => {
           participantId: user.id,
           participantName: `${user.first_name} ${user.last_name}`.trim() || user.username,
           participantAvatar: parentAvatar,
-          messages: []
+          lastMessage: null,
+          unreadCount: 0
         };
       } else if (grouped[user.id] && !grouped[user.id].participantAvatar && parentAvatar) {
         grouped[user.id].participantAvatar = parentAvatar;
@@ -190,8 +187,8 @@ const DirectorMessages = () => {
     });
 
     const convArray = Object.values(grouped).sort((a, b) => {
-      const aMsg = a.messages[a.messages.length - 1];
-      const bMsg = b.messages[b.messages.length - 1];
+      const aMsg = a.lastMessage;
+      const bMsg = b.lastMessage;
       const aHas = Boolean(aMsg);
       const bHas = Boolean(bMsg);
 
@@ -210,28 +207,95 @@ const DirectorMessages = () => {
       return a.participantName.localeCompare(b.participantName);
     });
     setConversations(convArray);
+  };
 
+  // --- 3. WIADOMOŚCI OTWARTEJ ROZMOWY ---
+  // Najnowsza strona scalona z już wczytanymi (doczytane starsze zostają)
+  const refreshActiveConversation = async (participantId, authConfig) => {
+    const page = await fetchMessagesPage(authConfig, { participantId });
     const currentActive = activeConversationRef.current;
-    if (currentActive) {
-      const updatedActiveConv = convArray.find(c => c.participantId === currentActive.participantId);
-      if (updatedActiveConv) {
-        const currentSig = getConvSignature(currentActive);
-        const updatedSig = getConvSignature(updatedActiveConv);
-        if (currentSig !== updatedSig) {
-          setActiveConversation(updatedActiveConv);
-          if (isUserAtBottomRef.current) setTimeout(scrollToBottom, 100);
-        }
+    if (!currentActive || !isSameParticipant(currentActive.participantId, participantId)) return;
+
+    const updatedActiveConv = {
+      ...currentActive,
+      messages: mergeMessages(currentActive.messages, page.messages),
+      // Kursor ustawiamy przy pierwszym wczytaniu; później wskazuje najstarszą doczytaną wiadomość
+      beforeCursor: currentActive.loaded ? currentActive.beforeCursor : page.beforeCursor,
+      loaded: true,
+    };
+    if (getConvSignature(currentActive) !== getConvSignature(updatedActiveConv) || !currentActive.loaded) {
+      activeConversationRef.current = updatedActiveConv;
+      setActiveConversation(updatedActiveConv);
+      if (!currentActive.loaded || isUserAtBottomRef.current) setTimeout(scrollToBottom, 100);
+    }
 
-        const hasUnread = updatedActiveConv.messages.some(
-          m => !m.is_read && isSameParticipant(m.sender, updatedActiveConv.participantId)
-        );
-        if (hasUnread && document.visibilityState === 'visible') {
-          markConversationRead(updatedActiveConv.participantId);
-        }
-      }
+    const hasUnread = updatedActiveConv.messages.some(
+      m => !m.is_read && isSameParticipant(m.sender, participantId)
+    );
+    if (hasUnread && document.visibilityState === 'visible') {
+      markConversationRead(participantId);
     }
   };
-  
+
+  const openConversation = (conv) => {
+    if (isSameParticipant(activeConversationRef.current?.participantId, conv.participantId)) return;
+    const opened = { ...conv, messages: [], beforeCursor: null, loaded: false };
+    activeConversationRef.current = opened;
+    isUserAtBottomRef.current = true;
+    setShowScrollButton(false);
+    setActiveConversation(opened);
+
+    const authConfig = getAuthHeaders();
+    if (!authConfig) {
+      removeToken();
+      navigate('/');
+      return;
+    }
+    refreshActiveConversation(conv.participantId, authConfig).catch(err => {
+      console.error("Błąd pobierania rozmowy:", err);
+    });
+  };
+
+  const loadOlderMessages = async () => {
+    const active = activeConversationRef.current;
+    const container = messagesContainerRef.current;
+    if (!active?.beforeCursor || isLoadingOlderRef.current || !container) return;
+
+    const authConfig = getAuthHeaders();
+    if (!authConfig) return;
+
+    isLoadingOlderRef.current = true;
+    setLoadingOlder(true);
+    try {
+      const page = await fetchMessagesPage(authConfig, { participantId: active.participantId, before: active.beforeCursor });
+      const currentActive = activeConversationRef.current;
+      if (!currentActive || !isSameParticipant(currentActive.participantId, active.participantId)) return;
+
+      scrollAnchorRef.current = { scrollHeight: container.scrollHeight, scrollTop: container.scrollTop };
+      const updated = {
+        ...currentActive,
+        messages: mergeMessages(currentActive.messages, page.messages),
+        beforeCursor: page.beforeCursor,
+      };
+      activeConversationRef.current = updated;
+      setActiveConversation(updated);
+    } catch (err) {
+      console.error("Błąd doczytywania starszych wiadomości:", err);
+    } finally {
+      isLoadingOlderRef.current = false;
+      setLoadingOlder(false);
+    }
+  };
+
+  useLayoutEffect(() => {
+    const anchor = scrollAnchorRef.current;
+    const container = messagesContainerRef.current;
+    if (!anchor || !container) return;
+    scrollAnchorRef.current = null;
+    // Starsze wiadomości doszły nad listą - widok zostaje na tej samej wiadomości
+    container.scrollTop = container.scrollHeight - anchor.scrollHeight + anchor.scrollTop;
+  }, [activeConversation]);
+
   // --- POPRAWIONY START I POLLING ---
   useEffect(() => {
     let mounted = true;
@@ -277,13 +341,6 @@ const DirectorMessages = () => {
             if (!ids.length) return;
             const idSet = new Set(ids);
 
-            setConversations(prev => prev.map(conv => ({
-              ...conv,
-              messages: conv.messages.map(msg => (
-                idSet.has(msg.id) ? { ...msg, is_read: true } : msg
-              )),
-            })));
-
             setActiveConversation(prev => {
               if (!prev) return prev;
               return {
@@ -374,13 +431,12 @@ const DirectorMessages = () => {
   }, [fetchData, markActiveConversationRead, navigate]);
 
   // --- LOGIKA "PRZECZYTANO" PO KLIKNIĘCIU ---
+  const activeParticipantId = activeConversation?.participantId;
   useEffect(() => {
-    if (activeConversation) {
+    if (activeParticipantId) {
       markActiveConversationRead();
-      
-      setTimeout(scrollToBottom, 50);
     }
-  }, [activeConversation, markActiveConversationRead]);
+  }, [activeParticipantId, markActiveConversationRead]);
 
   useEffect(() => {
     if (!requestedParticipantId || !conversations.length) return;
@@ -392,7 +448,7 @@ const DirectorMessages = () => {
     if (!targetConversation) return;
     if (isSameParticipant(activeConversation?.participantId, requestedParticipantId)) return;
 
-    setActiveConversation(targetConversation);
+    openConversation(targetConversation);
   }, [requestedParticipantId, conversations, activeConversation]);
 
   const clearParticipantQuery = useCallback(() => {
@@ -410,6 +466,10 @@ const DirectorMessages = () => {
     const isAtBottom = scrollHeight - scrollTop - clientHeight < 300;
     isUserAtBottomRef.current = isAtBottom;
     setShowScrollButton(!isAtBottom);
+
+    if (scrollTop < LOAD_OLDER_THRESHOLD_PX) {
+      loadOlderMessages();
+    }
   };
 
   const handleSendMessage = async (e) => {
@@ -463,13 +523,8 @@ const DirectorMessages = () => {
           
           <div className="conv-list">
             {filteredConversations.map(conv => {
-              const lastMessage = conv.messages.length > 0 ? conv.messages[conv.messages.length - 1] : null;
-              
-              const unreadCount = conv.messages.reduce((count, msg) => {
-                const isIncoming = isSameParticipant(msg.sender, conv.participantId);
-                return (!msg.is_read && isIncoming) ? count + 1 : count;
-              }, 0);
-              const hasUnread = unreadCount > 0;
+              const lastMessage = conv.lastMessage;
+              const hasUnread = conv.unreadCount > 0;
 
               return (
                 <div 
@@ -477,7 +532,7 @@ const DirectorMessages = () => {
                   className={`conv-item ${activeConversation?.participantId === conv.participantId ? 'active' : ''} ${hasUnread ? 'unread-conv' : ''}`}
                   onClick={() => {
                     clearParticipantQuery();
-                    setActiveConversation(conv);
+                    openConversation(conv);
                   }}
                 >
                   <div className="conv-avatar">
@@ -530,6 +585,7 @@ const DirectorMessages = () => {
               </div>
 
               <div className="messages-area" ref={messagesContainerRef} onScroll={handleScroll}>
+                {loadingOlder && <div className="loading-older">Wczytywanie starszych wiadomości...</div>}
                 {activeConversation.messages.map(msg => {
                   const isIncoming = isSameParticipant(msg.sender, activeConversation.participantId);
                   const senderAvatar = activeConversation.participantAvatar;
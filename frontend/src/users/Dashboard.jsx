@@ -27,6 +27,8 @@ const Dashboard = () => {
   const EVENTS_PAYMENTS_REFRESH_MS = 5 * 60 * 1000;
   const PROFILE_REFRESH_MS = 15 * 60 * 1000;
   const POLL_TICK_MS = 30 * 1000;
+  const POSTS_PAGE_SIZE = 10;
+  const MAX_POSTS_PAGE_SIZE = 100;
 
   const [posts, setPosts] = useState([]);
   const [events, setEvents] = useState([]);
@@ -36,7 +38,11 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
   const [commentInputs, setCommentInputs] = useState({});
   const [expandedComments, setExpandedComments] = useState({});
+  const [postsBeforeCursor, setPostsBeforeCursor] = useState(null);
+  const [loadingMorePosts, setLoadingMorePosts] = useState(false);
+  const [loadingCommentsFor, setLoadingCommentsFor] = useState(null);
   const isFetchingRef = useRef(false);
+  const loadedPostsCountRef = useRef(POSTS_PAGE_SIZE);
   const lastFetchRef = useRef({
     posts: 0,
     eventsPayments: 0,
@@ -51,6 +57,38 @@ const Dashboard = () => {
     return `${url}`;
   };
 
+  const normalizeComment = (comment) => ({
+    ...comment,
+    likes_count: comment.likes_count ?? 0,
+    is_liked_by_user: Boolean(comment.is_liked_by_user),
+  });
+
+  const normalizePost = (post) => {
+    const comments = (Array.isArray(post.comments) ? post.comments : []).map(normalizeComment);
+    return {
+      ...post,
+      comments,
+      comments_count: post.comments_count ?? comments.length,
+      // Kursor starszych komentarzy - ustawiany po pierwszym doczytaniu z /comments/
+      comments_before_cursor: null,
+      likes_count: post.likes_count ?? 0,
+      is_liked_by_user: Boolean(post.is_liked_by_user),
+    };
+  };
+
+  // Tablica jest stronicowana (?limit) - post ma tylko kilka ostatnich komentarzy i ich liczbę
+  const getPostsConfig = (limit, beforeCursor = null) => {
+    const config = getAuthConfigWithActiveChild();
+    return {
+      ...config,
+      params: {
+        ...(config.params || {}),
+        limit,
+        ...(beforeCursor ? { before: beforeCursor } : {}),
+      },
+    };
+  };
+
   const fetchData = useCallback(async ({ force = false } = {}) => {
     const now = Date.now();
     const shouldFetchPosts = force || (now - lastFetchRef.current.posts >= POSTS_REFRESH_MS);
@@ -69,7 +107,10 @@ const Dashboard = () => {
       const childScopedConfig = getAuthConfigWithActiveChild();
 
       const [postsRes, eventsRes, paymentsRes, userRes, directorStatusRes] = await Promise.all([
-        shouldFetchPosts ? axios.get('/api/newsfeed/', childScopedConfig) : Promise.resolve(null),
+        shouldFetchPosts
+          // Odświeżenie obejmuje tyle postów, ile użytkownik już doczytał
+          ? axios.get('/api/newsfeed/', getPostsConfig(Math.min(loadedPostsCountRef.current, MAX_POSTS_PAGE_SIZE)))
+          : Promise.resolve(null),
         shouldFetchEventsPayments ? axios.get('/api/calendar/activities/', childScopedConfig) : Promise.resolve(null),
         shouldFetchEventsPayments ? axios.get('/api/payments/', childScopedConfig) : Promise.resolve(null),
         shouldFetchProfile ? axios.get('/api/users/me/', getAuthHeaders()) : Promise.resolve(null),
@@ -77,16 +118,8 @@ const Dashboard = () => {
       ]);
 
       if (postsRes) {
-        setPosts(postsRes.data.map(post => ({
-          ...post,
-          comments: (Array.isArray(post.comments) ? post.comments : []).map(comment => ({
-            ...comment,
-            likes_count: comment.likes_count ?? 0,
-            is_liked_by_user: Boolean(comment.is_liked_by_user),
-          })),
-          likes_count: post.likes_count ?? 0,
-          is_liked_by_user: Boolean(post.is_liked_by_user),
-        })));
+        setPosts(postsRes.data.results.map(normalizePost));
+        setPostsBeforeCursor(postsRes.data.has_more_before ? postsRes.data.before_cursor : null);
         lastFetchRef.current.posts = Date.now();
       }
 
@@ -191,8 +224,62 @@ const Dashboard = () => {
 
   const widgetData = getWidgetItems();
 
+  const loadMorePosts = async () => {
+    if (!postsBeforeCursor || loadingMorePosts) return;
+    setLoadingMorePosts(true);
+
+    try {
+      const res = await axios.get('/api/newsfeed/', getPostsConfig(POSTS_PAGE_SIZE, postsBeforeCursor));
+      setPosts(currentPosts => {
+        const knownIds = new Set(currentPosts.map(post => post.id));
+        const nextPosts = [...currentPosts, ...res.data.results.filter(post => !knownIds.has(post.id)).map(normalizePost)];
+        loadedPostsCountRef.current = Math.max(POSTS_PAGE_SIZE, nextPosts.length);
+        return nextPosts;
+      });
+      setPostsBeforeCursor(res.data.has_more_before ? res.data.before_cursor : null);
+    } catch (err) {
+      console.error("Błąd doczytywania postów:", err);
+    } finally {
+      setLoadingMorePosts(false);
+    }
+  };
+
+  const loadOlderComments = async (post) => {
+    if (loadingCommentsFor === post.id) return;
+    setLoadingCommentsFor(post.id);
+
+    try {
+      const res = await axios.get(`/api/newsfeed/${post.id}/comments/`, {
+        ...getAuthHeaders(),
+        params: post.comments_before_cursor ? { before: post.comments_before_cursor } : {},
+      });
+      const olderComments = res.data.results.map(normalizeComment);
+
+      setPosts(currentPosts => currentPosts.map(current => {
+        if (current.id !== post.id) return current;
+        // Pierwsze doczytanie zwraca najnowszą stronę - zastępuje podgląd; kolejne dopisują starsze
+        const mergedComments = current.comments_before_cursor
+          ? [...olderComments, ...current.comments]
+          : [...olderComments, ...current.comments.filter(comment => !olderComments.some(older => older.id === comment.id))];
+        return {
+          ...current,
+          comments: mergedComments,
+          comments_before_cursor: res.data.has_more_before ? res.data.before_cursor : null,
+          comments_count: res.data.has_more_before ? current.comments_count : mergedComments.length,
+        };
+      }));
+    } catch (err) {
+      console.error("Błąd doczytywania komentarzy:", err);
+    } finally {
+      setLoadingCommentsFor(null);
+    }
+  };
+
   // --- LAJKOWANIE POSTA ---
   const handleLike = async (postId) => {
+    // Wysyłamy docelowy stan - powtórzone kliknięcie nie odwróci polubienia drugi raz
+    const liked = !posts.find(post => post.id === postId)?.is_liked_by_user;
+
     setPosts(currentPosts => currentPosts.map(post => {
       if (post.id === postId) {
         const isLiked = post.is_liked_by_user;
@@ -206,13 +293,17 @@ const Dashboard = () => {
     }));
 
     try {
-      await axios.post(`/api/newsfeed/${postId}/like/`, {}, getAuthHeaders());
+      await axios.post(`/api/newsfeed/${postId}/like/`, { liked }, getAuthHeaders());
     } catch (err) {
       console.error("Błąd lajkowania:", err);
     }
   };
 
 const handleLikeComment = async (postId, commentId) => {
+    const liked = !posts
+      .find(post => post.id === postId)?.comments
+      ?.find(comment => comment.id === commentId)?.is_liked_by_user;
+
     // 1. Optymistyczna aktualizacja UI (dzieje się natychmiast)
     setPosts(currentPosts => currentPosts.map(post => {
       // Szukamy odpowiedniego posta
@@ -241,7 +332,7 @@ const handleLikeComment = async (postId, commentId) => {
 
     // 2. Wysłanie żądania do API w tle
     try {
-      await axios.post(`/api/comments/${commentId}/like/`, {}, getAuthHeaders());
+      await axios.post(`/api/comments/${commentId}/like/`, { liked }, getAuthHeaders());
     } catch (err) {
       console.error("Błąd lajkowania komentarza:", err);
       // Opcjonalnie: Tu można dodać logikę cofania zmian w razie błędu serwera
@@ -268,7 +359,8 @@ const handleLikeComment = async (postId, commentId) => {
         if (post.id === postId) {
           return {
             ...post,
-            comments: [...post.comments, newComment]
+            comments: [...post.comments, normalizeComment(newComment)],
+            comments_count: post.comments_count + 1,
           };
         }
         return post;
@@ -320,11 +412,11 @@ const handleLikeComment = async (postId, commentId) => {
 
                 <h3 style={{ marginTop: 0, marginBottom: 10, color: '#333' }}>{post.title}</h3>
                 <div className="post-content">{post.content}</div>
-                {post.image && <img src={post.image} alt={post.title} className="post-image" />}
+                {post.image && <img src={post.renditions?.medium || post.image} alt={post.title} className="post-image" loading="lazy" />}
 
                 <div className="post-actions-bar">
                   <button className="action-btn comment-btn" onClick={() => toggleComments(post.id)}>
-                    <FaRegCommentDots /> <span>{expandedComments[post.id] ? 'Ukryj' : 'Komentarze'} ({post.comments.length})</span>
+                    <FaRegCommentDots /> <span>{expandedComments[post.id] ? 'Ukryj' : 'Komentarze'} ({post.comments_count})</span>
                   </button>
                   <button className={`action-btn like-btn ${post.is_liked_by_user ? 'liked' : ''}`} onClick={() => handleLike(post.id)}>
                     {post.is_liked_by_user ? <FaThumbsUp color="#2196f3" /> : <FaRegThumbsUp />} <span>{post.likes_count || 'Lubię to'}</span>
@@ -354,6 +446,16 @@ const handleLikeComment = async (postId, commentId) => {
 
                 {expandedComments[post.id] ? (
                   <div className="comments-section-wrapper">
+                    {post.comments_count > post.comments.length && (
+                      <button
+                        type="button"
+                        className="action-btn comment-btn"
+                        disabled={loadingCommentsFor === post.id}
+                        onClick={() => loadOlderComments(post)}
+                      >
+                        {loadingCommentsFor === post.id ? 'Wczytywanie...' : 'Pokaż wcześniejsze komentarze'}
+                      </button>
+                    )}
                     {post.comments && post.comments.length > 0 ? (
                       <div className="comments-list">
                         {post.comments.map((comment) => (
@@ -430,6 +532,16 @@ const handleLikeComment = async (postId, commentId) => {
               </div>
             ))
           )}
+          {postsBeforeCursor && (
+            <button
+              type="button"
+              className="action-btn comment-btn"
+              disabled={loadingMorePosts}
+              onClick={loadMorePosts}
+            >
+              {loadingMorePosts ? 'Wczytywanie...' : 'Pokaż starsze posty'}
+            </button>
+          )}
         </div>
 
         {/* Prawa strona - widgety (bez zmian) */}
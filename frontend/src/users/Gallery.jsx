@@ -3,7 +3,7 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import './Gallery.css';
 import ImageGrid from './ImageGrid';
-import { FaImages, FaRegClock, FaThumbsUp, FaRegThumbsUp, FaUserTie } from 'react-icons/fa';
+import { FaImages, FaRegClock, FaThumbsUp, FaRegThumbsUp, FaUserTie, FaDownload } from 'react-icons/fa';
 import LoadingScreen from './LoadingScreen';
 import { getAuthConfigWithActiveChild, getAuthHeaders } from '../authUtils';
 import { formatDateWithDots } from '../dateUtils';
@@ -59,6 +59,9 @@ const Gallery = () => {
 
   // --- OBSŁUGA LAJKOWANIA ---
   const handleLike = async (albumId) => {
+    // Wysyłamy docelowy stan - powtórzone kliknięcie nie odwróci polubienia drugi raz
+    const liked = !albums.find(album => album.id === albumId)?.is_liked_by_user;
+
     // 1. Optymistyczna aktualizacja UI
     setAlbums(currentAlbums => currentAlbums.map(album => {
       if (album.id === albumId) {
@@ -74,13 +77,33 @@ const Gallery = () => {
 
     // 2. Strzał do API
     try {
-      await axios.post(`/api/gallery/${albumId}/like/`, {}, getAuthHeaders());
+      await axios.post(`/api/gallery/${albumId}/like/`, { liked }, getAuthHeaders());
     } catch (err) {
       console.error("Błąd lajkowania:", err);
       // Opcjonalnie: Cofnij zmianę w razie błędu
     }
   };
 
+  // --- POBIERANIE ALBUMU (ZIP) ---
+  const handleDownload = async (album) => {
+    try {
+      const res = await axios.get(`/api/gallery/${album.id}/download/`, {
+        ...getAuthConfigWithActiveChild(),
+        responseType: 'blob',
+      });
+      const url = URL.createObjectURL(res.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `${album.title || 'album'}.zip`;
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error("Błąd pobierania albumu:", err);
+    }
+  };
+
   if (loading) return <LoadingScreen message="Wczytywanie galerii..." />;
 
   return (
@@ -155,6 +178,9 @@ const Gallery = () => {
                       )}
                     </span>
                  </button>
+                 <button className="action-btn" onClick={() => handleDownload(album)}>
+                    <FaDownload /> <span>Pobierz album</span>
+                 </button>
               </div>
 
             </div>
@@ -65,7 +65,7 @@ const ImageGrid = ({ images }) => {
 
       <div className="lightbox-content" onClick={(e) => e.stopPropagation()}>
         <img 
-          src={images[photoIndex].image} 
+          src={images[photoIndex].renditions?.full || images[photoIndex].image} 
           alt={`Gallery preview ${photoIndex + 1}`} 
         />
         <div className="lightbox-counter">
@@ -91,7 +91,12 @@ const ImageGrid = ({ images }) => {
             className={`grid-item item-${index}`}
             onClick={() => openLightbox(index)}
           >
-            <img src={imgObj.image} alt="Gallery thumbnail" loading="lazy" />
+            {/* Pierwsze zdjęcie w siatce jest duże, reszta to miniatury */}
+            <img
+              src={(index === 0 ? imgObj.renditions?.medium : imgObj.renditions?.thumb) || imgObj.image}
+              alt="Gallery thumbnail"
+              loading="lazy"
+            />
             {index === 3 && remaining > 0 && (
               <div className="more-overlay"><span>+{remaining}</span></div>
             )}
@@ -36,6 +36,40 @@ const Layout = () => {
   });
   const [activeChildGroupName, setActiveChildGroupName] = useState('');
 
+  const applyNotificationChanges = useCallback((changes, appliedChangeIds) => {
+    const activeChildId = getActiveChildId();
+    const totals = {};
+
+    changes.forEach((change) => {
+      if (!change?.id || appliedChangeIds.has(change.id)) return;
+      appliedChangeIds.add(change.id);
+
+      // Zmiana płatności jednego dziecka nie dotyczy widoku innego dziecka
+      if (change.child_id && activeChildId && change.child_id !== activeChildId) return;
+
+      Object.entries(change.deltas || {}).forEach(([section, delta]) => {
+        totals[section] = (totals[section] || 0) + (Number(delta) || 0);
+      });
+    });
+
+    // Pamiętamy tylko ostatnie zmiany - ta sama zmiana może przyjść kilkoma grupami kanałów naraz
+    while (appliedChangeIds.size > 500) {
+      appliedChangeIds.delete(appliedChangeIds.values().next().value);
+    }
+
+    if (Object.keys(totals).length === 0) return;
+
+    setNotificationCounts((prev) => {
+      const next = { ...prev };
+      Object.entries(totals).forEach(([section, delta]) => {
+        if (section in next) {
+          next[section] = Math.max(0, next[section] + delta);
+        }
+      });
+      return next;
+    });
+  }, []);
+
   const fetchNotificationSummary = useCallback(async () => {
     try {
       const response = await axios.get('/api/users/notifications/summary/', getAuthConfigWithActiveChild());
@@ -106,7 +140,6 @@ const Layout = () => {
         navigate('/');
       });
 
-    const summaryInterval = setInterval(fetchNotificationSummary, 30000);
     const onNotificationsUpdated = () => fetchNotificationSummary();
     window.addEventListener('notifications-updated', onNotificationsUpdated);
 
@@ -117,12 +150,19 @@ const Layout = () => {
     let reconnectTimer = null;
     let socket = null;
     let reconnectAttempts = 0;
+    let hasConnected = false;
+    const appliedChangeIds = new Set();
 
     const connect = () => {
       socket = new WebSocket(wsUrl);
 
       socket.onopen = () => {
         reconnectAttempts = 0;
+        // Po zerwaniu połączenia mogły przepaść zmiany liczników - wtedy pobieramy całość
+        if (hasConnected) {
+          fetchNotificationSummary();
+        }
+        hasConnected = true;
       };
 
       socket.onmessage = (event) => {
@@ -132,7 +172,11 @@ const Layout = () => {
             setUnreadCount(Number(data.count) || 0);
           }
           if (data.type === 'notification_summary_changed') {
-            fetchNotificationSummary();
+            if (Array.isArray(data.changes)) {
+              applyNotificationChanges(data.changes, appliedChangeIds);
+            } else {
+              fetchNotificationSummary();
+            }
           }
         } catch (err) {
           console.error('Błąd parsowania WS (layout):', err);
@@ -166,7 +210,6 @@ const Layout = () => {
 
     return () => {
       shouldReconnect = false;
-      clearInterval(summaryInterval);
       window.removeEventListener('notifications-updated', onNotificationsUpdated);
       if (reconnectTimer) clearTimeout(reconnectTimer);
       if (socket?.readyState === WebSocket.OPEN) {
@@ -175,7 +218,7 @@ const Layout = () => {
         socket.onopen = () => socket.close();
       }
     };
-  }, [navigate, fetchNotificationSummary]);
+  }, [navigate, fetchNotificationSummary, applyNotificationChanges]);
 
   // --- FUNKCJA NAPRAWIAJĄCA URL AVATARA ---
   const getAvatarUrl = (url) => {
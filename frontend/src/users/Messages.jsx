@@ -1,11 +1,12 @@
 // frontend/src/Messages.jsx
-import React, { useState, useEffect, useRef, useCallback } from 'react';
+import React, { useState, useEffect, useLayoutEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
 import './Messages.css';
 import { FaPaperPlane, FaUserTie, FaEnvelope, FaArrowDown } from 'react-icons/fa';
 import LoadingScreen from './LoadingScreen';
 import { getAuthHeaders } from '../authUtils';
 import { getChatWebSocketUrl } from '../wsUtils';
+import { LOAD_OLDER_THRESHOLD_PX, fetchMessagesPage, mergeMessages } from '../chatUtils';
 
 const Messages = () => {
   const [messages, setMessages] = useState([]);
@@ -18,6 +19,9 @@ const Messages = () => {
   
   const [loading, setLoading] = useState(true);
   const [showScrollButton, setShowScrollButton] = useState(false);
+  // Kursor starszych wiadomości (null - cała historia wczytana)
+  const [beforeCursor, setBeforeCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   // Refy
   const messagesEndRef = useRef(null);       
@@ -30,6 +34,9 @@ const Messages = () => {
   const reconnectTimeoutRef = useRef(null);
   const isMarkingReadRef = useRef(false);
   const shouldReconnectRef = useRef(true);
+  const isLoadingOlderRef = useRef(false);
+  // Wysokość listy przed doczytaniem starszych - po renderze przywracamy pozycję przewinięcia
+  const scrollAnchorRef = useRef(null);
   const MAX_RECONNECT_ATTEMPTS = 10;
   const BASE_RECONNECT_DELAY_MS = 1000;
   const MAX_RECONNECT_DELAY_MS = 30000;
@@ -59,6 +66,34 @@ const Messages = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
 
+  const loadOlderMessages = async () => {
+    const container = messagesContainerRef.current;
+    if (!beforeCursor || isLoadingOlderRef.current || !container) return;
+
+    isLoadingOlderRef.current = true;
+    setLoadingOlder(true);
+    try {
+      const page = await fetchMessagesPage(getAuthHeaders(), { before: beforeCursor });
+      scrollAnchorRef.current = { scrollHeight: container.scrollHeight, scrollTop: container.scrollTop };
+      setMessages(prev => mergeMessages(prev, page.messages));
+      setBeforeCursor(page.beforeCursor);
+    } catch (err) {
+      console.error("Błąd doczytywania starszych wiadomości:", err);
+    } finally {
+      isLoadingOlderRef.current = false;
+      setLoadingOlder(false);
+    }
+  };
+
+  useLayoutEffect(() => {
+    const anchor = scrollAnchorRef.current;
+    const container = messagesContainerRef.current;
+    if (!anchor || !container) return;
+    scrollAnchorRef.current = null;
+    // Starsze wiadomości doszły nad listą - widok zostaje na tej samej wiadomości
+    container.scrollTop = container.scrollHeight - anchor.scrollHeight + anchor.scrollTop;
+  }, [messages]);
+
   const handleScroll = () => {
     if (!messagesContainerRef.current) return;
     
@@ -68,6 +103,10 @@ const Messages = () => {
     
     isUserAtBottomRef.current = isAtBottom;
     setShowScrollButton(!isAtBottom);
+
+    if (scrollTop < LOAD_OLDER_THRESHOLD_PX) {
+      loadOlderMessages();
+    }
   };
 
   const markConversationRead = useCallback(async () => {
@@ -94,22 +133,23 @@ const Messages = () => {
     }
   }, []);
 
-  const fetchData = useCallback(async () => {
+  // Najnowsza strona rozmowy; przy pierwszym wczytaniu ustawia też kursor starszych wiadomości
+  const fetchData = useCallback(async ({ initial = false } = {}) => {
     try {
-      const [msgRes, statusRes] = await Promise.all([
-        axios.get('/api/communication/messages/', getAuthHeaders()),
+      const [page, statusRes] = await Promise.all([
+        fetchMessagesPage(getAuthHeaders()),
         axios.get('/api/users/director-status/', getAuthHeaders())
       ]);
 
-      const sorted = msgRes.data.sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
-
       setMessages(prevMessages => {
-        const isNewMessage = sorted.length > prevMessages.length;
+        const merged = mergeMessages(prevMessages, page.messages);
+        const isNewMessage = merged.length > prevMessages.length;
         if (isNewMessage && isUserAtBottomRef.current) {
           setTimeout(scrollToBottom, 100);
         }
-        return sorted;
+        return merged;
       });
+      if (initial) setBeforeCursor(page.beforeCursor);
 
       // --- ZAPISYWANIE DANYCH DYREKTORA ---
       setIsDirectorOnline(statusRes.data.is_online);
@@ -143,7 +183,7 @@ const Messages = () => {
       }
     };
 
-    fetchData().then(() => {
+    fetchData({ initial: true }).then(() => {
       setTimeout(scrollToBottom, 200);
     });
 
@@ -320,6 +360,7 @@ const Messages = () => {
           ref={messagesContainerRef} 
           onScroll={handleScroll}
         >
+          {loadingOlder && <div className="loading-older">Wczytywanie starszych wiadomości...</div>}
           {messages.length === 0 ? (
             <div className="empty-chat">
               <p>Tu rozpoczyna się Twoja rozmowa z Dyrekcją.</p>
@@ -0,0 +1,17 @@
+import core.image_store
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_is_teacher_user_users_single_teacher'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=core.image_store.get_image_storage, upload_to='avatars/', verbose_name='Zdjęcie profilowe'),
+        ),
+    ]
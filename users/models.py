@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.image_store import get_image_storage
+
 class User(AbstractUser):
     is_director = models.BooleanField(
         default=False, 
@@ -25,7 +27,7 @@ class User(AbstractUser):
         verbose_name="Numer telefonu" # <--- Spolszczenie
     )
 
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True, verbose_name="Zdjęcie profilowe")
+    avatar = models.ImageField(upload_to='avatars/', storage=get_image_storage, null=True, blank=True, verbose_name="Zdjęcie profilowe")
 
     director_password_preview = models.CharField(
         max_length=128,
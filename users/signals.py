@@ -3,9 +3,10 @@ from django.dispatch import receiver
 from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
 from django.conf import settings
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete
 from rest_framework.authtoken.models import Token
 from django.core.cache import cache
+from core.image_store import track_file_field
 from .models import User
 
 @receiver(reset_password_token_created)
@@ -57,25 +58,5 @@ def on_token_delete(sender, instance, **kwargs):
         cache.delete(cache_key)
         print(f"🧹 [SIGNAL] Usunięto status online dla: {user.username}")
 
-# 1. Usuń plik, gdy użytkownik jest usuwany z bazy
-@receiver(post_delete, sender=User)
-def auto_delete_file_on_delete(sender, instance, **kwargs):
-    if instance.avatar:
-        instance.avatar.delete(save=False)
-
-# 2. Usuń STARY plik, gdy wgrywany jest NOWY (lub avatara usunięto)
-@receiver(pre_save, sender=User)
-def auto_delete_file_on_change(sender, instance, **kwargs):
-    if not instance.pk:
-        return False
-
-    try:
-        old_avatar = User.objects.get(pk=instance.pk).avatar
-    except User.DoesNotExist:
-        return False
-
-    new_avatar = instance.avatar
-    
-    # Jeśli stare zdjęcie istnieje, a nowe jest inne (lub go nie ma) -> usuń stare
-    if old_avatar and old_avatar != new_avatar:
-        old_avatar.delete(save=False)
\ No newline at end of file
+# Awatar: plik usuwa się przy ostatnim odwołaniu (usunięcie użytkownika albo podmiana zdjęcia)
+track_file_field(User, 'avatar')
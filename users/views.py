@@ -7,9 +7,16 @@ from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.contrib.auth.models import update_last_login
-from django.db.models import Q
 from users.models import User
-from core.models import Child, SpecialActivity, GalleryItem, FacilityClosure, Payment
+from core.models import Child, FacilityClosure
+from core.notification_counters import (
+    gallery_queryset_for_user,
+    get_notification_counts,
+    payments_queryset_for_user,
+    reset_counter,
+    schedule_queryset_for_user,
+    set_payments_seen_cursor,
+)
 from .permissions import IsDirector
 from .serializers import UserManagementSerializer
 from .utils import generate_unique_username, generate_secure_password
@@ -66,8 +73,7 @@ class CurrentUserView(APIView):
 
         # Specjalna logika: Jeśli frontend wyśle 'avatar': 'DELETE', usuwamy zdjęcie
         if data.get('avatar') == 'DELETE':
-            user.avatar.delete(save=False) # Usuwa plik
-            user.avatar = None # Czyści pole w bazie
+            user.avatar = None # Czyści pole w bazie (plik usuwa core.image_store)
             user.save()
             return Response(UserSerializer(user).data)
 
@@ -134,11 +140,6 @@ class DirectorStatusView(APIView):
 class NotificationSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
-    PAYMENT_SEEN_CACHE_TIMEOUT = 60 * 60 * 24 * 30
-
-    def _payments_seen_cache_key(self, user_id, child_id):
-        return f'notification_payments_seen_user_{int(user_id)}_child_{int(child_id)}'
-
     def _resolve_selected_child(self, user, child_id_raw):
         if not child_id_raw:
             return None
@@ -154,106 +155,16 @@ class NotificationSummaryView(APIView):
 
         return queryset.first()
 
-    def _get_parent_groups(self, user):
-        children = user.child.all()
-        return [child.group for child in children]
-
-    def _schedule_queryset_for_user(self, user):
-        if user.is_director or user.is_teacher:
-            return SpecialActivity.objects.all()
-
-        parent_groups = self._get_parent_groups(user)
-        if not parent_groups:
-            return SpecialActivity.objects.none()
-        return SpecialActivity.objects.filter(groups__in=parent_groups).distinct()
-
-    def _gallery_queryset_for_user(self, user):
-        if user.is_director or user.is_teacher:
-            return GalleryItem.objects.all()
-
-        parent_groups = self._get_parent_groups(user)
-        if not parent_groups:
-            return GalleryItem.objects.filter(target_group__isnull=True)
-
-        return GalleryItem.objects.filter(
-            Q(target_group__isnull=True) | Q(target_group__in=parent_groups)
-        ).distinct()
-
-    def _payments_queryset_for_user(self, user, selected_child=None):
-        if user.is_director:
-            queryset = Payment.objects.all()
-        else:
-            queryset = Payment.objects.filter(child__parents=user)
-
-        if selected_child is not None:
-            queryset = queryset.filter(child=selected_child)
-
-        return queryset
-
-    def _get_payments_seen_cursor(self, user, selected_child=None):
-        if selected_child is None:
-            return int(user.last_seen_payment_id or 0)
-
-        cache_key = self._payments_seen_cache_key(user.id, selected_child.id)
-        cached_value = cache.get(cache_key)
-
-        if cached_value is None:
-            fallback_value = int(user.last_seen_payment_id or 0)
-            cache.set(cache_key, fallback_value, timeout=self.PAYMENT_SEEN_CACHE_TIMEOUT)
-            return fallback_value
-
-        try:
-            return int(cached_value)
-        except (TypeError, ValueError):
-            fallback_value = int(user.last_seen_payment_id or 0)
-            cache.set(cache_key, fallback_value, timeout=self.PAYMENT_SEEN_CACHE_TIMEOUT)
-            return fallback_value
-
-    def _set_payments_seen_cursor(self, user, latest_id, selected_child=None):
-        latest_id = int(latest_id or 0)
-
-        if selected_child is None:
-            # Keep the global cursor monotonic so fallback queries stay stable.
-            current_global = int(user.last_seen_payment_id or 0)
-            next_global = max(current_global, latest_id)
-            if next_global != current_global:
-                user.last_seen_payment_id = next_global
-                user.save(update_fields=['last_seen_payment_id'])
-            return
-
-        cache_key = self._payments_seen_cache_key(user.id, selected_child.id)
-        cache.set(cache_key, latest_id, timeout=self.PAYMENT_SEEN_CACHE_TIMEOUT)
-
-        # Persist fallback cursor across sessions/logins when child-scoped cache is missing.
-        current_global = int(user.last_seen_payment_id or 0)
-        if latest_id > current_global:
-            user.last_seen_payment_id = latest_id
-            user.save(update_fields=['last_seen_payment_id'])
-
     def get(self, request):
         user = request.user
         selected_child_raw = request.query_params.get('child_id')
         selected_child = self._resolve_selected_child(user, selected_child_raw)
 
-        schedule_qs = self._schedule_queryset_for_user(user)
-        gallery_qs = self._gallery_queryset_for_user(user)
-        calendar_qs = FacilityClosure.objects.all()
+        # Odczyt zmaterializowanych liczników (core/notification_counters.py) zamiast czterech COUNT-ów
+        counts = get_notification_counts(user, child=selected_child)
 
         if selected_child_raw and selected_child is None:
-            payments_qs = Payment.objects.none()
-            payments_seen_cursor = 0
-        else:
-            payments_qs = self._payments_queryset_for_user(user, selected_child=selected_child)
-            payments_seen_cursor = self._get_payments_seen_cursor(user, selected_child=selected_child)
-
-        schedule_extra_changes = int(cache.get(f'notification_schedule_extra_{user.id}', 0) or 0)
-
-        counts = {
-            'schedule': schedule_qs.filter(id__gt=user.last_seen_schedule_activity_id).count() + schedule_extra_changes,
-            'gallery': gallery_qs.filter(id__gt=user.last_seen_gallery_item_id).count(),
-            'calendar': calendar_qs.filter(id__gt=user.last_seen_calendar_closure_id).count(),
-            'payments': payments_qs.filter(id__gt=payments_seen_cursor, is_paid=False).count(),
-        }
+            counts['payments'] = 0
 
         return Response(counts)
 
@@ -279,23 +190,22 @@ class MarkNotificationSeenView(NotificationSummaryView):
             return Response({'error': 'Nieprawidłowe child_id.'}, status=status.HTTP_400_BAD_REQUEST)
 
         if section == 'schedule':
-            latest_id = self._schedule_queryset_for_user(user).order_by('-id').values_list('id', flat=True).first() or 0
+            latest_id = schedule_queryset_for_user(user).order_by('-id').values_list('id', flat=True).first() or 0
         elif section == 'gallery':
-            latest_id = self._gallery_queryset_for_user(user).order_by('-id').values_list('id', flat=True).first() or 0
+            latest_id = gallery_queryset_for_user(user).order_by('-id').values_list('id', flat=True).first() or 0
         elif section == 'calendar':
             latest_id = FacilityClosure.objects.order_by('-id').values_list('id', flat=True).first() or 0
         else:
-            latest_id = self._payments_queryset_for_user(user, selected_child=selected_child).filter(is_paid=False).order_by('-id').values_list('id', flat=True).first() or 0
+            latest_id = payments_queryset_for_user(user, child=selected_child).filter(is_paid=False).order_by('-id').values_list('id', flat=True).first() or 0
 
         if section == 'payments':
-            self._set_payments_seen_cursor(user, latest_id, selected_child=selected_child)
+            set_payments_seen_cursor(user, latest_id, child=selected_child)
         else:
             field_name = self.section_to_field[section]
             setattr(user, field_name, int(latest_id))
             user.save(update_fields=[field_name])
 
-        if section == 'schedule':
-            cache.set(f'notification_schedule_extra_{user.id}', 0, timeout=60 * 60 * 24 * 30)
+        reset_counter(user, section, child=selected_child)
 
         return Response({'status': 'ok', 'section': section, 'seen_up_to_id': int(latest_id)})
 